@@ -0,0 +1,161 @@
+"""Micro-benchmarks for hot paths that do not need a Telegram connection."""
+
+from __future__ import annotations
+
+import asyncio
+import random
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+
+from . import reporting
+from .loadgen import build_fake_config
+from .runner import _Dispatcher
+from .storage import DbMedia, DbMessage
+from .timeutils import utc_now
+
+
+@dataclass
+class DispatchResult:
+    targets: int
+    updates: int
+    dispatcher_per_sec: float
+    per_handler_per_sec: float
+
+
+def bench_dispatch(targets: int = 100, updates: int = 200_000, *, seed: int = 0) -> DispatchResult:
+    """Route synthetic updates through the dispatcher and through per-target filters.
+
+    The per-target variant mimics one Telethon handler per chat: each update is
+    checked against every handler's chat filter.
+    """
+    rng = random.Random(seed)
+    chat_ids = [-1_000_000_000_000 - index for index in range(targets)]
+    handled = 0
+
+    async def _handler(_event: object) -> None:
+        nonlocal handled
+        handled += 1
+
+    # A fifth of the traffic comes from chats that are not watched.
+    pool = chat_ids + [-2_000_000_000_000 - index for index in range(max(1, targets // 4))]
+    events = [SimpleNamespace(chat_id=rng.choice(pool)) for _ in range(updates)]
+    dispatcher = _Dispatcher({chat_id: (_handler,) for chat_id in chat_ids})
+    filters = [(frozenset([chat_id]), _handler) for chat_id in chat_ids]
+
+    async def _run_dispatcher() -> float:
+        start = time.perf_counter()
+        for event in events:
+            await dispatcher.dispatch(event)
+        return time.perf_counter() - start
+
+    async def _run_per_handler() -> float:
+        start = time.perf_counter()
+        for event in events:
+            for chats, handler in filters:
+                if event.chat_id in chats:
+                    await handler(event)
+        return time.perf_counter() - start
+
+    dispatcher_seconds = asyncio.run(_run_dispatcher())
+    per_handler_seconds = asyncio.run(_run_per_handler())
+    return DispatchResult(
+        targets=targets,
+        updates=updates,
+        dispatcher_per_sec=updates / dispatcher_seconds if dispatcher_seconds else float("inf"),
+        per_handler_per_sec=updates / per_handler_seconds if per_handler_seconds else float("inf"),
+    )
+
+
+def format_dispatch_result(result: DispatchResult) -> str:
+    return (
+        f"dispatch: {result.targets} targets, {result.updates} updates\n"
+        f"  single dispatcher:   {result.dispatcher_per_sec:,.0f} updates/s\n"
+        f"  per-target handlers: {result.per_handler_per_sec:,.0f} updates/s"
+    )
+
+
+@dataclass
+class ReportRenderResult:
+    messages: int
+    html_bytes: int
+    seconds: float
+
+    @property
+    def per_10k(self) -> float:
+        return self.seconds * 10_000 / self.messages if self.messages else 0.0
+
+
+def bench_report(messages: int = 10_000, *, seed: int = 0) -> ReportRenderResult:
+    """Time `generate_report` on one synthetic report, as the scheduler runs it.
+
+    A fifth of the messages are replies and a tenth carry a small photo, so
+    escaping, reply blocks and inlined (cached) images are all exercised.
+    The time includes streaming the HTML to disk.
+    """
+    rng = random.Random(seed)
+    with tempfile.TemporaryDirectory(prefix="tgwatch-bench-") as tmp:
+        workdir = Path(tmp)
+        config = build_fake_config(
+            workdir, {-1_000_000_000_001: (101, 102, 103)}, {-1_000_000_000_001: -2_000_000_000_001}
+        )
+        target = config.targets[0]
+        photo = workdir / "photo.jpg"
+        photo.write_bytes(rng.randbytes(20_000))
+        until = utc_now()
+        since = until - timedelta(hours=2)
+        sample = [
+            _synthetic_message(index, target.target_chat_id, target.tracked_user_ids, since, photo, rng)
+            for index in range(messages)
+        ]
+        # A one-message report compiles the templates before the timed run.
+        reporting.generate_report(sample[:1], config, since, until, target=target, report_dir=workdir / "warmup")
+        start = time.perf_counter()
+        path = reporting.generate_report(sample, config, since, until, target=target, report_dir=workdir / "report")
+        seconds = time.perf_counter() - start
+        html_bytes = path.stat().st_size
+    return ReportRenderResult(messages=messages, html_bytes=html_bytes, seconds=seconds)
+
+
+def _synthetic_message(
+    index: int,
+    chat_id: int,
+    senders: tuple[int, ...],
+    since: datetime,
+    photo: Path,
+    rng: random.Random,
+) -> DbMessage:
+    media = []
+    if index % 10 == 0:
+        media.append(
+            DbMedia(
+                media_index=0,
+                file_path=str(photo),
+                mime_type="image/jpeg",
+                file_size=photo.stat().st_size,
+                is_reply=False,
+            )
+        )
+    is_reply = index % 5 == 0
+    return DbMessage(
+        chat_id=chat_id,
+        message_id=index + 1,
+        sender_id=rng.choice(senders),
+        date=since + timedelta(seconds=index),
+        text=f"message {index} <with> \"markup\" & " + "x" * rng.randint(10, 300),
+        reply_to_msg_id=index if is_reply else None,
+        replied_sender_id=rng.choice(senders) if is_reply else None,
+        replied_date=since if is_reply else None,
+        replied_text="earlier message" if is_reply else None,
+        media=media,
+    )
+
+
+def format_report_result(result: ReportRenderResult) -> str:
+    return (
+        f"report render: {result.messages} messages, {result.html_bytes / 1024 / 1024:,.1f} MB of HTML\n"
+        f"  generate_report: {result.per_10k * 1000:,.0f} ms per 10k messages"
+    )
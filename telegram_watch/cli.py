@@ -6,15 +6,22 @@ import argparse
 import asyncio
 import logging
 from pathlib import Path
-from typing import Sequence
+from typing import Callable, Sequence
 from rich.console import Console
 
+from .bench import bench_dispatch, bench_report, format_dispatch_result, format_report_result
 from .config import Config, ConfigError, load_config
 from .migration import detect_migration_needed, migrate_config
 from .doctor import run_doctor
 from .gui import run_gui
+from .loadgen import format_load_result, run_load
+from .profiling import PROFILE_MODES, profile_dir, start_profile, stop_profile
+from .recording import load_recording
+from .replay import format_replay_result, parse_speed, replay_recording
 from .runner import run_daemon, run_once, run_reply_cleanup
 from .timeutils import parse_since_spec, utc_now
+from .tracing import format_trace_summary, summarize_trace
+from .workers import run_workers
 
 
 def build_parser() -> argparse.ArgumentParser:
@@ -61,12 +68,38 @@ def build_parser() -> argparse.ArgumentParser:
         action="store_true",
         help="Also push the generated report/messages to the control chat",
     )
+    once_parser.add_argument(
+        "--profile",
+        choices=PROFILE_MODES,
+        help="Write a CPU or memory profile to profiles/ next to the database",
+    )
 
     run_parser = subparsers.add_parser(
         "run",
         help="Run watcher daemon",
         parents=[common],
     )
+    run_parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Split targets across N worker processes (default: 1)",
+    )
+    run_parser.add_argument(
+        "--record",
+        type=Path,
+        help="Append incoming updates to a replayable log (.gz to compress)",
+    )
+    run_parser.add_argument(
+        "--trace",
+        type=Path,
+        help="Append per-message lifecycle spans to a JSON-lines trace file",
+    )
+    run_parser.add_argument(
+        "--profile",
+        choices=PROFILE_MODES,
+        help="Profile CPU or memory from startup (toggle later with /profile)",
+    )
     run_parser.add_argument(
         "--yes-retention",
         action="store_true",
@@ -88,6 +121,117 @@ def build_parser() -> argparse.ArgumentParser:
         help="Skip DB backup before apply (use with caution)",
     )
 
+    bench_parser = subparsers.add_parser(
+        "bench",
+        help="Run offline micro-benchmarks",
+    )
+    bench_parser.add_argument(
+        "--log-level",
+        default="WARNING",
+        choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+        help="Logging verbosity",
+    )
+    bench_parser.add_argument(
+        "--targets",
+        type=int,
+        default=100,
+        help="Number of synthetic target chats (default: 100)",
+    )
+    bench_parser.add_argument(
+        "--updates",
+        type=int,
+        default=200_000,
+        help="Number of synthetic updates to route (default: 200000)",
+    )
+    bench_parser.add_argument(
+        "--report-messages",
+        type=int,
+        default=10_000,
+        help="Messages in the synthetic report render benchmark; 0 skips it (default: 10000)",
+    )
+
+    load_parser = subparsers.add_parser(
+        "loadtest",
+        help="Drive the daemon with synthetic traffic from a fake Telegram client",
+    )
+    load_parser.add_argument(
+        "--log-level",
+        default="WARNING",
+        choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+        help="Logging verbosity",
+    )
+    load_parser.add_argument(
+        "--chats",
+        type=int,
+        default=10,
+        help="Number of fake target chats (default: 10)",
+    )
+    load_parser.add_argument(
+        "--rate",
+        type=float,
+        default=5.0,
+        help="Messages per second per chat (default: 5)",
+    )
+    load_parser.add_argument(
+        "--duration",
+        type=float,
+        default=10.0,
+        help="Seconds to generate traffic for (default: 10)",
+    )
+    load_parser.add_argument(
+        "--media-ratio",
+        type=float,
+        default=0.0,
+        help="Fraction of messages carrying a photo (default: 0)",
+    )
+    load_parser.add_argument(
+        "--latency-ms",
+        type=float,
+        default=0.0,
+        help="Artificial latency added to every fake API call (default: 0)",
+    )
+    load_parser.add_argument(
+        "--flood-every",
+        type=int,
+        default=0,
+        help="Raise a FloodWait on every N-th media download (default: off)",
+    )
+
+    replay_parser = subparsers.add_parser(
+        "replay",
+        help="Replay a log written by `run --record` against a fake Telegram client",
+    )
+    replay_parser.add_argument("recording", type=Path, help="Recorded update log")
+    replay_parser.add_argument(
+        "--log-level",
+        default="WARNING",
+        choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+        help="Logging verbosity",
+    )
+    replay_parser.add_argument(
+        "--speed",
+        default="1x",
+        help="Playback speed, e.g. 10x (default: 1x)",
+    )
+    replay_parser.add_argument(
+        "--latency-ms",
+        type=float,
+        default=0.0,
+        help="Artificial latency added to every fake API call (default: 0)",
+    )
+
+    trace_parser = subparsers.add_parser(
+        "trace",
+        help="Summarize stage latency percentiles from a `run --trace` file",
+    )
+    trace_parser.add_argument("trace_file", type=Path, help="Trace file to summarize")
+    trace_parser.add_argument(
+        "--log-level",
+        default="WARNING",
+        choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+        help="Logging verbosity",
+    )
+
     gui_parser = subparsers.add_parser(
         "gui",
         help="Launch local GUI to edit config",
@@ -133,14 +277,18 @@ def main(argv: Sequence[str] | None = None) -> int:
     elif args.command == "once":
         config = _load_config_or_exit(parser, args.config, command=args.command)
         since = parse_since_spec(args.since, now=utc_now())
-        return asyncio.run(
-            _run_once_command(
-                config,
-                since,
-                since_label=args.since,
-                push=args.push,
-                target_selector=args.target,
-            )
+        return _profiled(
+            config,
+            args.profile,
+            lambda: asyncio.run(
+                _run_once_command(
+                    config,
+                    since,
+                    since_label=args.since,
+                    push=args.push,
+                    target_selector=args.target,
+                )
+            ),
         )
     elif args.command == "run":
         config = _load_config_or_exit(parser, args.config, command=args.command)
@@ -150,7 +298,23 @@ def main(argv: Sequence[str] | None = None) -> int:
         ):
             logging.getLogger(__name__).warning("Run cancelled by user.")
             return 1
-        return asyncio.run(_run_daemon_command(config))
+        if args.workers <= 0:
+            parser.error("--workers must be > 0")
+        if args.workers > 1:
+            if args.record or args.trace or args.profile:
+                parser.error("--record, --trace and --profile cannot be combined with --workers")
+            try:
+                return run_workers(args.config, config, args.workers, log_level=args.log_level)
+            except FileNotFoundError as exc:
+                Console().print(f"[bold red]Run error:[/bold red] {exc}")
+                return 2
+        return _profiled(
+            config,
+            args.profile,
+            lambda: asyncio.run(
+                _run_daemon_command(config, record=args.record, trace=args.trace)
+            ),
+        )
     elif args.command == "cleanup-replies":
         config = _load_config_or_exit(parser, args.config, command=args.command)
         return asyncio.run(
@@ -160,6 +324,50 @@ def main(argv: Sequence[str] | None = None) -> int:
                 backup=not bool(args.no_backup),
             )
         )
+    elif args.command == "bench":
+        if args.targets <= 0 or args.updates <= 0:
+            parser.error("--targets and --updates must be > 0")
+        if args.report_messages < 0:
+            parser.error("--report-messages must be >= 0")
+        print(format_dispatch_result(bench_dispatch(args.targets, args.updates)))
+        if args.report_messages:
+            print(format_report_result(bench_report(args.report_messages)))
+        return 0
+    elif args.command == "loadtest":
+        if args.chats <= 0 or args.rate <= 0 or args.duration <= 0:
+            parser.error("--chats, --rate and --duration must be > 0")
+        if not 0 <= args.media_ratio <= 1:
+            parser.error("--media-ratio must be between 0 and 1")
+        result = asyncio.run(
+            run_load(
+                chats=args.chats,
+                rate=args.rate,
+                duration=args.duration,
+                media_ratio=args.media_ratio,
+                latency=args.latency_ms / 1000,
+                flood_every=max(0, args.flood_every),
+            )
+        )
+        print(format_load_result(result))
+        return 0
+    elif args.command == "replay":
+        try:
+            speed = parse_speed(args.speed)
+            recording = load_recording(args.recording)
+        except (OSError, ValueError) as exc:
+            parser.error(str(exc))
+        result = asyncio.run(
+            replay_recording(recording, speed=speed, latency=args.latency_ms / 1000)
+        )
+        print(format_replay_result(result))
+        return 0
+    elif args.command == "trace":
+        try:
+            summaries = summarize_trace(args.trace_file)
+        except (OSError, ValueError, KeyError) as exc:
+            parser.error(f"Cannot read trace {args.trace_file}: {exc}")
+        print(format_trace_summary(summaries))
+        return 0
     elif args.command == "gui":
         run_gui(args.config, host=args.host, port=args.port)
         return 0
@@ -167,6 +375,17 @@ def main(argv: Sequence[str] | None = None) -> int:
         parser.error(f"Unknown command {args.command}")
 
 
+def _profiled(config: Config, mode: str | None, run: Callable[[], int]) -> int:
+    if mode is None:
+        return run()
+    start_profile(mode, profile_dir(config))
+    try:
+        return run()
+    finally:
+        for path in stop_profile():
+            Console().print(f"Profile written to {path}")
+
+
 def _load_config_or_exit(
     parser: argparse.ArgumentParser, path: Path, *, command: str
 ) -> Config:
@@ -230,8 +449,10 @@ async def _run_once_command(
     return 0
 
 
-async def _run_daemon_command(config):
-    await run_daemon(config)
+async def _run_daemon_command(
+    config, record: Path | None = None, trace: Path | None = None
+):
+    await run_daemon(config, record=record, trace=trace)
     return 0
 
 
@@ -2,7 +2,7 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field, fields, replace
 from pathlib import Path
 from typing import Any, Iterable, Mapping
 from types import MappingProxyType
@@ -18,11 +18,45 @@ class ConfigError(RuntimeError):
     """Raised when a config file is invalid."""
 
 
+def _thaw(value: Any) -> Any:
+    if isinstance(value, MappingProxyType):
+        return {key: _thaw(item) for key, item in value.items()}
+    return value
+
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    return value
+
+
+def _rebuild(cls: type, values: dict[str, Any]) -> Any:
+    return cls(**{name: _freeze(value) for name, value in values.items()})
+
+
+class _PicklableMappings:
+    """Pickle support for configs holding read-only MappingProxyType views.
+
+    Pickle cannot handle MappingProxyType, so the init fields travel as plain
+    dicts and are wrapped again on load; that is how a Config reaches the
+    report worker processes.
+    """
+
+    def __reduce__(self) -> tuple[Any, tuple[type, dict[str, Any]]]:
+        return _rebuild, (
+            type(self),
+            {item.name: _thaw(getattr(self, item.name)) for item in fields(self) if item.init},
+        )
+
+
 DEFAULT_TIME_FORMAT = "%Y.%m.%d %H:%M:%S (%Z)"
 MAX_TARGET_GROUPS = 5
 MAX_USERS_PER_TARGET = 5
 MAX_CONTROL_GROUPS = 5
 CONFIG_VERSION = 1.0
+MEDIA_MODES = ("eager", "deferred")
+DELIVERY_MODES = ("upload", "forward")
+REPORT_BUNDLES = ("none", "gzip", "zip")
 
 
 @dataclass(frozen=True)
@@ -38,17 +72,27 @@ class SenderConfig:
 
 
 @dataclass(frozen=True)
-class TargetGroupConfig:
+class TargetGroupConfig(_PicklableMappings):
     name: str
     target_chat_id: int
     tracked_user_ids: tuple[int, ...]
     tracked_user_aliases: Mapping[int, str]
     summary_interval_minutes: int
     control_group: str | None
+    media_mode: str = "eager"
+    delivery_mode: str = "upload"
+
+    @property
+    def defers_media(self) -> bool:
+        return self.media_mode == "deferred"
+
+    @property
+    def forwards_media(self) -> bool:
+        return self.delivery_mode == "forward"
 
 
 @dataclass(frozen=True)
-class ControlGroupConfig:
+class ControlGroupConfig(_PicklableMappings):
     key: str
     control_chat_id: int
     is_forum: bool
@@ -68,6 +112,8 @@ class ReportingConfig:
     summary_interval_minutes: int
     timezone: ZoneInfo
     retention_days: int
+    templates_dir: Path | None = None
+    bundle: str = "none"
 
 
 @dataclass(frozen=True)
@@ -82,7 +128,35 @@ class NotificationConfig:
 
 
 @dataclass(frozen=True)
-class Config:
+class PerformanceConfig:
+    max_parallel_targets: int = 4
+    deferred_autofetch_max_mb: int = 10
+    summary_stagger_seconds: int = 20
+    stall_threshold_ms: int = 0
+    report_inline_max_kb: int = 1024
+    report_encode_cache_mb: int = 64
+    report_workers: int = 0
+
+
+@dataclass(frozen=True)
+class LimitsConfig:
+    max_target_groups: int = MAX_TARGET_GROUPS
+    max_users_per_target: int = MAX_USERS_PER_TARGET
+    max_control_groups: int = MAX_CONTROL_GROUPS
+
+
+@dataclass(frozen=True)
+class MetricsConfig:
+    port: int | None = None
+    host: str = "127.0.0.1"
+
+    @property
+    def enabled(self) -> bool:
+        return self.port is not None
+
+
+@dataclass(frozen=True)
+class Config(_PicklableMappings):
     config_version: float
     telegram: TelegramConfig
     sender: SenderConfig | None
@@ -96,13 +170,46 @@ class Config:
     reporting: ReportingConfig
     display: DisplayConfig
     notifications: NotificationConfig
+    performance: PerformanceConfig = PerformanceConfig()
+    limits: LimitsConfig = LimitsConfig()
+    metrics: MetricsConfig = MetricsConfig()
+    # Reverse indexes, built once in __post_init__ so lookups stay O(1) no
+    # matter how many targets and tracked users are configured.
+    tracked_users: frozenset[int] = field(init=False, repr=False, compare=False)
+    targets_by_user: Mapping[int, tuple[TargetGroupConfig, ...]] = field(
+        init=False, repr=False, compare=False
+    )
+    alias_by_user: Mapping[int, str] = field(init=False, repr=False, compare=False)
+    tracked_ids_by_control: Mapping[str, frozenset[int]] = field(
+        init=False, repr=False, compare=False
+    )
 
-    @property
-    def tracked_users_set(self) -> set[int]:
-        tracked: set[int] = set()
+    def __post_init__(self) -> None:
+        targets_by_user: dict[int, list[TargetGroupConfig]] = {}
+        alias_by_user: dict[int, str] = {}
         for target in self.targets:
-            tracked.update(target.tracked_user_ids)
-        return tracked
+            for user_id in target.tracked_user_ids:
+                targets_by_user.setdefault(user_id, []).append(target)
+            for user_id, alias in target.tracked_user_aliases.items():
+                alias_by_user.setdefault(user_id, alias)
+        tracked_by_control = {
+            key: frozenset(
+                user_id for target in targets for user_id in target.tracked_user_ids
+            )
+            for key, targets in self.targets_by_control.items()
+        }
+        object.__setattr__(self, "tracked_users", frozenset(targets_by_user))
+        object.__setattr__(
+            self,
+            "targets_by_user",
+            MappingProxyType({key: tuple(value) for key, value in targets_by_user.items()}),
+        )
+        object.__setattr__(self, "alias_by_user", MappingProxyType(alias_by_user))
+        object.__setattr__(self, "tracked_ids_by_control", MappingProxyType(tracked_by_control))
+
+    @property
+    def tracked_users_set(self) -> frozenset[int]:
+        return self.tracked_users
 
     def target_for_chat(self, chat_id: int) -> TargetGroupConfig | None:
         return self.target_by_chat_id.get(chat_id)
@@ -116,6 +223,21 @@ class Config:
     def targets_for_control(self, control_key: str) -> tuple[TargetGroupConfig, ...]:
         return self.targets_by_control.get(control_key, ())
 
+    def tracked_ids_for_control(self, control_key: str) -> frozenset[int]:
+        return self.tracked_ids_by_control.get(control_key, frozenset())
+
+    def target_for_user(
+        self,
+        user_id: int,
+        *,
+        control_key: str | None = None,
+    ) -> TargetGroupConfig | None:
+        """First target tracking `user_id`, optionally limited to one control group."""
+        for target in self.targets_by_user.get(user_id, ()):
+            if control_key is None or target.control_group == control_key:
+                return target
+        return None
+
     def describe_user(
         self,
         user_id: int,
@@ -165,11 +287,7 @@ class Config:
         resolved = self._resolve_target(target=target, chat_id=chat_id)
         if resolved is not None:
             return resolved.tracked_user_aliases.get(user_id)
-        for group in self.targets:
-            alias = group.tracked_user_aliases.get(user_id)
-            if alias:
-                return alias
-        return None
+        return self.alias_by_user.get(user_id)
 
 
 def load_config(path: Path) -> Config:
@@ -190,13 +308,16 @@ def load_config(path: Path) -> Config:
     telegram_cfg = _parse_telegram(data.get("telegram") or {}, base_dir)
     sender_cfg = _parse_sender(data.get("sender"), base_dir, telegram_cfg)
     reporting_cfg = _parse_reporting(data.get("reporting") or {}, base_dir)
-    targets = _parse_targets(data, reporting_cfg)
-    control_groups = _parse_control_groups(data)
+    limits_cfg = parse_limits(data.get("limits") or {})
+    targets = _parse_targets(data, reporting_cfg, limits_cfg)
+    control_groups = _parse_control_groups(data, limits_cfg)
     targets = _assign_control_groups(targets, control_groups)
     _validate_control_topic_maps(targets, control_groups)
     storage_cfg = _parse_storage(data.get("storage") or {}, base_dir)
     display_cfg = _parse_display(data.get("display") or {})
     notifications_cfg = _parse_notifications(data.get("notifications") or {})
+    performance_cfg = _parse_performance(data.get("performance") or {})
+    metrics_cfg = _parse_metrics(data.get("metrics") or {})
 
     target_by_chat: dict[int, TargetGroupConfig] = {}
     target_by_name: dict[str, TargetGroupConfig] = {}
@@ -236,6 +357,9 @@ def load_config(path: Path) -> Config:
         reporting=reporting_cfg,
         display=display_cfg,
         notifications=notifications_cfg,
+        performance=performance_cfg,
+        limits=limits_cfg,
+        metrics=metrics_cfg,
     )
 
 
@@ -290,6 +414,7 @@ def _parse_sender(
 def _parse_targets(
     data: dict[str, Any],
     reporting_cfg: ReportingConfig,
+    limits: LimitsConfig = LimitsConfig(),
 ) -> list[TargetGroupConfig]:
     if "targets" in data and "target" in data:
         raise ConfigError("Use either [target] or [[targets]], not both")
@@ -309,10 +434,14 @@ def _parse_targets(
                     label,
                     require_name=False,
                     default_name=f"group-{idx}",
+                    max_users=limits.max_users_per_target,
                 )
             )
-        if len(targets) > MAX_TARGET_GROUPS:
-            raise ConfigError(f"targets cannot exceed {MAX_TARGET_GROUPS} groups")
+        if len(targets) > limits.max_target_groups:
+            raise ConfigError(
+                f"targets cannot exceed {limits.max_target_groups} groups "
+                "(raise limits.max_target_groups to allow more)"
+            )
         return targets
     raw_target = data.get("target")
     if raw_target is None:
@@ -326,6 +455,7 @@ def _parse_targets(
             "target",
             require_name=False,
             default_name="default",
+            max_users=limits.max_users_per_target,
         )
     ]
     return targets
@@ -338,6 +468,7 @@ def _parse_target_group(
     *,
     require_name: bool,
     default_name: str | None = None,
+    max_users: int = MAX_USERS_PER_TARGET,
 ) -> TargetGroupConfig:
     name = str(raw.get("name") or default_name or "").strip()
     if require_name and not name:
@@ -353,8 +484,11 @@ def _parse_target_group(
         raise ConfigError(f"{label}.tracked_user_ids must be ints") from exc
     if not ids_iter:
         raise ConfigError(f"{label}.tracked_user_ids cannot be empty")
-    if len(ids_iter) > MAX_USERS_PER_TARGET:
-        raise ConfigError(f"{label}.tracked_user_ids cannot exceed {MAX_USERS_PER_TARGET} users")
+    if len(ids_iter) > max_users:
+        raise ConfigError(
+            f"{label}.tracked_user_ids cannot exceed {max_users} users "
+            "(raise limits.max_users_per_target to allow more)"
+        )
     aliases_raw = raw.get("tracked_user_aliases", {})
     if aliases_raw and not isinstance(aliases_raw, dict):
         raise ConfigError(f"{label}.tracked_user_aliases must be a table of id = \"Alias\" entries")
@@ -384,6 +518,14 @@ def _parse_target_group(
         control_group = str(control_group).strip()
         if not control_group:
             control_group = None
+    media_mode = str(raw.get("media_mode", "eager")).strip().lower() or "eager"
+    if media_mode not in MEDIA_MODES:
+        raise ConfigError(f"{label}.media_mode must be one of: {', '.join(MEDIA_MODES)}")
+    delivery_mode = str(raw.get("delivery_mode", "upload")).strip().lower() or "upload"
+    if delivery_mode not in DELIVERY_MODES:
+        raise ConfigError(
+            f"{label}.delivery_mode must be one of: {', '.join(DELIVERY_MODES)}"
+        )
     return TargetGroupConfig(
         name=name or "default",
         target_chat_id=target_chat_id,
@@ -391,10 +533,15 @@ def _parse_target_group(
         tracked_user_aliases=MappingProxyType(aliases),
         summary_interval_minutes=interval,
         control_group=control_group,
+        media_mode=media_mode,
+        delivery_mode=delivery_mode,
     )
 
 
-def _parse_control_groups(data: dict[str, Any]) -> dict[str, ControlGroupConfig]:
+def _parse_control_groups(
+    data: dict[str, Any],
+    limits: LimitsConfig = LimitsConfig(),
+) -> dict[str, ControlGroupConfig]:
     if "control_groups" in data and "control" in data:
         raise ConfigError("Use either [control] or [control_groups], not both")
     if "control_groups" in data:
@@ -409,8 +556,11 @@ def _parse_control_groups(data: dict[str, Any]) -> dict[str, ControlGroupConfig]
             if not isinstance(raw, dict):
                 raise ConfigError(f"control_groups.{name} must be a table")
             parsed[name] = _parse_control_group(raw, key=name, label=f"control_groups.{name}")
-        if len(parsed) > MAX_CONTROL_GROUPS:
-            raise ConfigError(f"control_groups cannot exceed {MAX_CONTROL_GROUPS}")
+        if len(parsed) > limits.max_control_groups:
+            raise ConfigError(
+                f"control_groups cannot exceed {limits.max_control_groups} "
+                "(raise limits.max_control_groups to allow more)"
+            )
         return parsed
     raw_control = data.get("control")
     if raw_control is None:
@@ -499,16 +649,7 @@ def _assign_control_groups(
             raise ConfigError(
                 f"Target group '{target.name}' references unknown control group '{control_key}'."
             )
-        updated.append(
-            TargetGroupConfig(
-                name=target.name,
-                target_chat_id=target.target_chat_id,
-                tracked_user_ids=target.tracked_user_ids,
-                tracked_user_aliases=target.tracked_user_aliases,
-                summary_interval_minutes=target.summary_interval_minutes,
-                control_group=control_key,
-            )
-        )
+        updated.append(replace(target, control_group=control_key))
     return updated
 
 
@@ -563,11 +704,18 @@ def _parse_reporting(raw: dict[str, Any], base_dir: Path) -> ReportingConfig:
         timezone = ZoneInfo(tz_name)
     except Exception as exc:  # pragma: no cover - zoneinfo raises generic exceptions
         raise ConfigError(f"Invalid timezone '{tz_name}'") from exc
+    templates_raw = raw.get("templates_dir")
+    templates_dir = _resolve_path(templates_raw, base_dir) if templates_raw else None
+    bundle = str(raw.get("bundle", "none")).strip().lower() or "none"
+    if bundle not in REPORT_BUNDLES:
+        raise ConfigError(f"reporting.bundle must be one of: {', '.join(REPORT_BUNDLES)}")
     return ReportingConfig(
         reports_dir=reports_dir,
         summary_interval_minutes=summary,
         timezone=timezone,
         retention_days=retention,
+        templates_dir=templates_dir,
+        bundle=bundle,
     )
 
 
@@ -588,6 +736,75 @@ def _parse_notifications(raw: dict[str, Any]) -> NotificationConfig:
     return NotificationConfig(bark_key=bark_key)
 
 
+def parse_limits(raw: dict[str, Any]) -> LimitsConfig:
+    """Parse the optional [limits] table; missing keys keep the defaults."""
+    if not isinstance(raw, dict):
+        raise ConfigError("limits must be a table")
+    values: dict[str, int] = {}
+    for key in ("max_target_groups", "max_users_per_target", "max_control_groups"):
+        value = _require_int(raw.get(key, getattr(LimitsConfig, key)), f"limits.{key}")
+        if value <= 0:
+            raise ConfigError(f"limits.{key} must be > 0")
+        values[key] = value
+    return LimitsConfig(**values)
+
+
+def _parse_metrics(raw: dict[str, Any]) -> MetricsConfig:
+    if not isinstance(raw, dict):
+        raise ConfigError("metrics must be a table")
+    port = raw.get("port")
+    if port is not None:
+        port = _require_int(port, "metrics.port")
+        if not 0 < port < 65536:
+            raise ConfigError("metrics.port must be between 1 and 65535")
+    host = str(raw.get("host", MetricsConfig.host)).strip() or MetricsConfig.host
+    return MetricsConfig(port=port, host=host)
+
+
+def _parse_performance(raw: dict[str, Any]) -> PerformanceConfig:
+    if not isinstance(raw, dict):
+        raise ConfigError("performance must be a table")
+    parallel = raw.get("max_parallel_targets", PerformanceConfig.max_parallel_targets)
+    parallel = _require_int(parallel, "performance.max_parallel_targets")
+    if parallel <= 0:
+        raise ConfigError("performance.max_parallel_targets must be > 0")
+    autofetch = raw.get(
+        "deferred_autofetch_max_mb", PerformanceConfig.deferred_autofetch_max_mb
+    )
+    autofetch = _require_int(autofetch, "performance.deferred_autofetch_max_mb")
+    if autofetch < 0:
+        raise ConfigError("performance.deferred_autofetch_max_mb must be >= 0")
+    stagger = raw.get("summary_stagger_seconds", PerformanceConfig.summary_stagger_seconds)
+    stagger = _require_int(stagger, "performance.summary_stagger_seconds")
+    if stagger < 0:
+        raise ConfigError("performance.summary_stagger_seconds must be >= 0")
+    stall = raw.get("stall_threshold_ms", PerformanceConfig.stall_threshold_ms)
+    stall = _require_int(stall, "performance.stall_threshold_ms")
+    if stall < 0:
+        raise ConfigError("performance.stall_threshold_ms must be >= 0")
+    inline_max = raw.get("report_inline_max_kb", PerformanceConfig.report_inline_max_kb)
+    inline_max = _require_int(inline_max, "performance.report_inline_max_kb")
+    if inline_max < 0:
+        raise ConfigError("performance.report_inline_max_kb must be >= 0")
+    cache_mb = raw.get("report_encode_cache_mb", PerformanceConfig.report_encode_cache_mb)
+    cache_mb = _require_int(cache_mb, "performance.report_encode_cache_mb")
+    if cache_mb < 0:
+        raise ConfigError("performance.report_encode_cache_mb must be >= 0")
+    report_workers = raw.get("report_workers", PerformanceConfig.report_workers)
+    report_workers = _require_int(report_workers, "performance.report_workers")
+    if report_workers < 0:
+        raise ConfigError("performance.report_workers must be >= 0")
+    return PerformanceConfig(
+        max_parallel_targets=parallel,
+        deferred_autofetch_max_mb=autofetch,
+        summary_stagger_seconds=stagger,
+        stall_threshold_ms=stall,
+        report_inline_max_kb=inline_max,
+        report_encode_cache_mb=cache_mb,
+        report_workers=report_workers,
+    )
+
+
 def _parse_bool(value: Any) -> bool:
     if isinstance(value, str):
         return value.strip().lower() in {"1", "true", "yes", "on"}
@@ -0,0 +1,122 @@
+"""Persistent cache of resolved Telegram input peers and usernames."""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from telethon.tl import types
+
+from .storage import (
+    CachedPeer,
+    db_session,
+    delete_cached_username,
+    fetch_cached_peers,
+    fetch_cached_usernames,
+    store_cached_peer,
+    store_cached_username,
+)
+from .timeutils import utc_now
+
+# Usernames can be released and claimed by another account, so a resolution
+# is trusted for a week before it is looked up again.
+USERNAME_TTL = timedelta(days=7)
+
+
+class EntityCache:
+    """Input peers per account and username → user id, backed by SQLite.
+
+    Access hashes are only valid for the account that resolved them, so peers
+    are keyed by (account id, marked peer id). Usernames map to plain user ids
+    and are shared by every account. One instance is shared by the primary and
+    sender clients; each account's rows are loaded on first use. Usernames
+    expire after `username_ttl`.
+    """
+
+    def __init__(self, db_path: Path, *, username_ttl: timedelta = USERNAME_TTL) -> None:
+        self._db_path = db_path
+        self._username_ttl = username_ttl
+        self._peers: dict[int, dict[int, types.TypeInputPeer]] = {}
+        self._usernames: dict[str, tuple[int, datetime]] | None = None
+
+    def get_peer(self, account_id: int, peer_id: int) -> types.TypeInputPeer | None:
+        return self._account_peers(account_id).get(peer_id)
+
+    def put_peer(self, account_id: int, peer_id: int, peer: object) -> None:
+        cached = _to_cached_peer(account_id, peer_id, peer)
+        if cached is None:
+            return
+        peers = self._account_peers(account_id)
+        if peer_id in peers and _to_cached_peer(account_id, peer_id, peers[peer_id]) == cached:
+            return
+        peers[peer_id] = peer
+        with db_session(self._db_path) as conn:
+            store_cached_peer(conn, cached)
+
+    def get_user_id(self, username: str) -> int | None:
+        entry = self._load_usernames().get(_normalize_username(username))
+        if entry is None or entry[1] < utc_now() - self._username_ttl:
+            return None
+        return entry[0]
+
+    def put_user_id(self, username: str, user_id: int) -> None:
+        key = _normalize_username(username)
+        now = utc_now()
+        self._load_usernames()[key] = (user_id, now)
+        with db_session(self._db_path) as conn:
+            store_cached_username(conn, key, user_id, now)
+
+    def forget_user_id(self, username: str) -> None:
+        """Drop a cached username, e.g. when the id it gave turns out to be wrong."""
+        key = _normalize_username(username)
+        if self._load_usernames().pop(key, None) is None:
+            return
+        with db_session(self._db_path) as conn:
+            delete_cached_username(conn, key)
+
+    def _account_peers(self, account_id: int) -> dict[int, types.TypeInputPeer]:
+        peers = self._peers.get(account_id)
+        if peers is None:
+            with db_session(self._db_path) as conn:
+                rows = fetch_cached_peers(conn, account_id)
+            peers = {}
+            for row in rows:
+                peer = _from_cached_peer(row)
+                if peer is not None:
+                    peers[row.peer_id] = peer
+            self._peers[account_id] = peers
+        return peers
+
+    def _load_usernames(self) -> dict[str, int]:
+        if self._usernames is None:
+            with db_session(self._db_path) as conn:
+                self._usernames = fetch_cached_usernames(conn, utc_now() - self._username_ttl)
+        return self._usernames
+
+
+def _normalize_username(username: str) -> str:
+    return username.strip().lstrip("@").lower()
+
+
+def _to_cached_peer(account_id: int, peer_id: int, peer: object) -> CachedPeer | None:
+    if isinstance(peer, types.InputPeerSelf):
+        return CachedPeer(account_id, peer_id, "self", 0, None)
+    if isinstance(peer, types.InputPeerUser):
+        return CachedPeer(account_id, peer_id, "user", peer.user_id, peer.access_hash)
+    if isinstance(peer, types.InputPeerChannel):
+        return CachedPeer(account_id, peer_id, "channel", peer.channel_id, peer.access_hash)
+    if isinstance(peer, types.InputPeerChat):
+        return CachedPeer(account_id, peer_id, "chat", peer.chat_id, None)
+    return None
+
+
+def _from_cached_peer(row: CachedPeer) -> types.TypeInputPeer | None:
+    if row.peer_type == "self":
+        return types.InputPeerSelf()
+    if row.peer_type == "user":
+        return types.InputPeerUser(row.raw_id, row.access_hash or 0)
+    if row.peer_type == "channel":
+        return types.InputPeerChannel(row.raw_id, row.access_hash or 0)
+    if row.peer_type == "chat":
+        return types.InputPeerChat(row.raw_id)
+    return None
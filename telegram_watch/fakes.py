@@ -0,0 +1,278 @@
+"""In-process stand-in for Telethon's `TelegramClient`, for tests and load runs.
+
+Only the surface the runner uses is implemented. Every API call can be given
+artificial latency, and FloodWait errors can be injected per method, so the
+rate limiter and retry paths run exactly as they would against Telegram.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+from collections import Counter, defaultdict, deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+from telethon import errors, utils
+from telethon.tl import types
+
+from .timeutils import utc_now
+
+_EventCallback = Callable[[Any], Awaitable[None]]
+
+
+@dataclass
+class FakeFile:
+    size: int
+    mime_type: str = "image/jpeg"
+    width: int | None = 1280
+    height: int | None = 720
+
+
+@dataclass
+class FakeMessage:
+    """Enough of `telethon.tl.custom.Message` for capture, reports and sends."""
+
+    id: int
+    chat_id: int
+    sender_id: int | None
+    date: datetime
+    message: str = ""
+    file: FakeFile | None = None
+    photo: Any = None
+    document: Any = None
+    reply_to_msg_id: int | None = None
+    reply_to: Any = None
+    is_reply: bool = False
+    grouped_id: int | None = None
+    reply_message: "FakeMessage | None" = None
+
+    @property
+    def raw_text(self) -> str:
+        return self.message
+
+    @property
+    def media(self) -> Any:
+        return self.photo or self.document
+
+    async def get_reply_message(self) -> "FakeMessage | None":
+        return self.reply_message
+
+
+@dataclass
+class FakeEvent:
+    chat_id: int
+    message: FakeMessage
+
+
+@dataclass
+class SentItem:
+    method: str
+    entity: Any
+    payload: Any
+    kwargs: dict[str, Any] = field(default_factory=dict)
+
+
+class FakeTelegramClient:
+    """Async fake of the Telethon client used by `run_once` and `run_daemon`.
+
+    `emit()` delivers a message to the registered handlers the way Telethon
+    does (one task per update) and records it in the chat's history, so
+    `iter_messages` and backfill see it too. Sent messages and files are kept
+    in `sent`; per-method call counts are in `calls`.
+    """
+
+    def __init__(
+        self,
+        *,
+        self_id: int = 1,
+        latency: float = 0.0,
+        session_name: str = "fake",
+    ) -> None:
+        self.self_id = self_id
+        self.latency = latency
+        self.session = SimpleNamespace(filename=session_name)
+        self.flood_sleep_threshold = 60
+        self.calls: Counter[str] = Counter()
+        self.sent: list[SentItem] = []
+        self.history: dict[int, list[FakeMessage]] = defaultdict(list)
+        self._by_id: dict[tuple[int, int], FakeMessage] = {}
+        self.handlers: list[_EventCallback] = []
+        self.started = asyncio.Event()
+        self._flood_waits: dict[str, deque[int]] = defaultdict(deque)
+        self._flood_every: dict[str, tuple[int, int]] = {}
+        self._ids = itertools.count(1)
+        self._disconnected = asyncio.Event()
+        self._tasks: set[asyncio.Task] = set()
+
+    # --- fault injection -------------------------------------------------
+
+    def inject_flood_wait(self, method: str, seconds: int, *, times: int = 1) -> None:
+        """Make the next `times` calls of `method` raise FloodWaitError."""
+        self._flood_waits[method].extend([seconds] * times)
+
+    def flood_wait_every(self, method: str, every: int, seconds: int) -> None:
+        """Make every `every`-th call of `method` raise FloodWaitError."""
+        self._flood_every[method] = (every, seconds)
+
+    async def _call(self, method: str) -> None:
+        self.calls[method] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        pending = self._flood_waits.get(method)
+        if pending:
+            raise errors.FloodWaitError(request=None, capture=pending.popleft())
+        periodic = self._flood_every.get(method)
+        if periodic and self.calls[method] % periodic[0] == 0:
+            raise errors.FloodWaitError(request=None, capture=periodic[1])
+
+    # --- lifecycle -------------------------------------------------------
+
+    async def start(self, **_kwargs: Any) -> "FakeTelegramClient":
+        await self._call("start")
+        return self
+
+    async def connect(self) -> None:
+        await self._call("connect")
+
+    async def disconnect(self) -> None:
+        self._disconnected.set()
+
+    async def run_until_disconnected(self) -> None:
+        self.started.set()
+        await self._disconnected.wait()
+
+    async def get_me(self, input_peer: bool = False) -> Any:
+        await self._call("get_me")
+        if input_peer:
+            return types.InputPeerUser(self.self_id, 0)
+        return SimpleNamespace(id=self.self_id, username="fake")
+
+    async def get_input_entity(self, entity: Any) -> types.TypeInputPeer:
+        await self._call("get_input_entity")
+        if entity == "me" or entity == self.self_id:
+            return types.InputPeerSelf()
+        real_id, peer_type = utils.resolve_id(int(entity))
+        if peer_type is types.PeerChannel:
+            return types.InputPeerChannel(real_id, 0)
+        if peer_type is types.PeerChat:
+            return types.InputPeerChat(real_id)
+        return types.InputPeerUser(real_id, 0)
+
+    # --- updates ---------------------------------------------------------
+
+    def add_event_handler(self, callback: _EventCallback, _event: Any = None) -> None:
+        self.handlers.append(callback)
+
+    def make_message(
+        self,
+        chat_id: int,
+        sender_id: int | None,
+        text: str = "",
+        *,
+        media_size: int | None = None,
+        media_mime: str = "image/jpeg",
+        message_id: int | None = None,
+        reply_to: int | None = None,
+        grouped_id: int | None = None,
+    ) -> FakeMessage:
+        """Build a message for `chat_id`; `reply_to` links to one already emitted there."""
+        message_id = message_id if message_id is not None else next(self._ids)
+        message = FakeMessage(
+            id=message_id,
+            chat_id=chat_id,
+            sender_id=sender_id,
+            date=utc_now(),
+            message=text,
+            grouped_id=grouped_id,
+        )
+        if reply_to is not None:
+            message.is_reply = True
+            message.reply_to_msg_id = reply_to
+            message.reply_message = self._by_id.get((chat_id, reply_to))
+        if media_size is not None:
+            message.file = FakeFile(size=media_size, mime_type=media_mime)
+            message.photo = SimpleNamespace(id=message_id, file_reference=b"", sizes=[])
+        return message
+
+    def emit(self, message: FakeMessage) -> asyncio.Task:
+        """Deliver `message` as a NewMessage update; returns the handler task."""
+        self.history[message.chat_id].append(message)
+        self._by_id[(message.chat_id, message.id)] = message
+        event = FakeEvent(chat_id=message.chat_id, message=message)
+        task = asyncio.create_task(self._dispatch(event))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def drain(self) -> None:
+        """Wait until every emitted update has been handled."""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    async def _dispatch(self, event: FakeEvent) -> None:
+        for handler in list(self.handlers):
+            await handler(event)
+
+    # --- history and media -----------------------------------------------
+
+    async def iter_messages(
+        self, entity: int, *, offset_id: int = 0, limit: int | None = None, **_kwargs: Any
+    ) -> AsyncIterator[FakeMessage]:
+        await self._call("iter_messages")
+        history = self.history.get(int(entity), [])
+        count = 0
+        for message in reversed(history):
+            if offset_id and message.id >= offset_id:
+                continue
+            if limit is not None and count >= limit:
+                return
+            count += 1
+            yield message
+
+    async def get_messages(self, entity: int, ids: Any = None, **_kwargs: Any) -> Any:
+        await self._call("get_messages")
+        chat_id = int(entity)
+        if isinstance(ids, (list, tuple)):
+            return [self._by_id.get((chat_id, int(item))) for item in ids]
+        if ids is not None:
+            return self._by_id.get((chat_id, int(ids)))
+        return list(self.history.get(chat_id, []))
+
+    async def download_media(
+        self, message: FakeMessage, file: Any = None, *, thumb: Any = None, **_kwargs: Any
+    ) -> str | None:
+        await self._call("download_media")
+        if message.file is None or file is None:
+            return None
+        path = Path(str(file)).with_suffix(".jpg")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"\0" * (message.file.size if thumb is None else 64))
+        return str(path)
+
+    # --- sending ---------------------------------------------------------
+
+    async def send_message(self, entity: Any, message: str = "", **kwargs: Any) -> FakeMessage:
+        await self._call("send_message")
+        self.sent.append(SentItem("send_message", entity, message, kwargs))
+        return self._sent_message(message)
+
+    async def send_file(self, entity: Any, file: Any, **kwargs: Any) -> Any:
+        await self._call("send_file")
+        self.sent.append(SentItem("send_file", entity, file, kwargs))
+        if isinstance(file, (list, tuple)):
+            return [self._sent_message(kwargs.get("caption") or "") for _ in file]
+        return self._sent_message(kwargs.get("caption") or "")
+
+    async def __call__(self, request: Any) -> Any:
+        await self._call(type(request).__name__)
+        self.sent.append(SentItem(type(request).__name__, getattr(request, "to_peer", None), request))
+        return SimpleNamespace(updates=[])
+
+    def _sent_message(self, text: str) -> FakeMessage:
+        return FakeMessage(
+            id=next(self._ids), chat_id=self.self_id, sender_id=self.self_id, date=utc_now(), message=text
+        )
@@ -21,10 +21,9 @@ from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
 from .config import (
     ConfigError,
-    MAX_CONTROL_GROUPS,
-    MAX_TARGET_GROUPS,
-    MAX_USERS_PER_TARGET,
+    LimitsConfig,
     load_config,
+    parse_limits,
 )
 from .migration import migrate_config
 
@@ -36,6 +35,9 @@ except ModuleNotFoundError:  # pragma: no cover
 logger = logging.getLogger(__name__)
 
 KEEP_SECRET = "********"
+_PASSTHROUGH_SECTIONS: tuple[str, ...] = ("performance", "limits", "metrics")
+_TARGET_PASSTHROUGH_KEYS: tuple[str, ...] = ("media_mode", "delivery_mode")
+_REPORTING_PASSTHROUGH_KEYS: tuple[str, ...] = ("templates_dir", "bundle")
 
 _TIMEZONE_PRESET_CANDIDATES: tuple[tuple[str, str], ...] = (
     ("UTC", "UTC"),
@@ -2221,12 +2223,13 @@ def _normalize_config(raw: dict[str, Any]) -> dict[str, Any]:
     notifications = raw.get("notifications", {})
 
     api_hash = telegram.get("api_hash")
+    limits = _existing_limits(raw)
     data = {
         "config_version": raw.get("config_version", ""),
         "limits": {
-            "maxTargets": MAX_TARGET_GROUPS,
-            "maxUsersPerTarget": MAX_USERS_PER_TARGET,
-            "maxControlGroups": MAX_CONTROL_GROUPS,
+            "maxTargets": limits.max_target_groups,
+            "maxUsersPerTarget": limits.max_users_per_target,
+            "maxControlGroups": limits.max_control_groups,
         },
         "telegram": {
             "api_id": telegram.get("api_id", ""),
@@ -2377,15 +2380,16 @@ def _validate_payload(payload: dict[str, Any], raw_existing: dict[str, Any]) ->
 
     targets_raw = payload.get("targets", []) or []
     control_raw = payload.get("control_groups", []) or []
+    limits = _existing_limits(raw_existing)
 
     if not targets_raw:
         errors.append("At least one target group is required")
-    if len(targets_raw) > MAX_TARGET_GROUPS:
-        errors.append(f"Targets cannot exceed {MAX_TARGET_GROUPS}")
+    if len(targets_raw) > limits.max_target_groups:
+        errors.append(f"Targets cannot exceed {limits.max_target_groups}")
     if not control_raw:
         errors.append("At least one control group is required")
-    if len(control_raw) > MAX_CONTROL_GROUPS:
-        errors.append(f"Control groups cannot exceed {MAX_CONTROL_GROUPS}")
+    if len(control_raw) > limits.max_control_groups:
+        errors.append(f"Control groups cannot exceed {limits.max_control_groups}")
 
     control_groups: list[dict[str, Any]] = []
     control_keys: list[str] = []
@@ -2491,8 +2495,8 @@ def _validate_payload(payload: dict[str, Any], raw_existing: dict[str, Any]) ->
         tracked_users_raw = raw.get("tracked_users", []) or []
         if not tracked_users_raw:
             errors.append(f"targets[{idx}].tracked_users cannot be empty")
-        if len(tracked_users_raw) > MAX_USERS_PER_TARGET:
-            errors.append(f"targets[{idx}] cannot exceed {MAX_USERS_PER_TARGET} users")
+        if len(tracked_users_raw) > limits.max_users_per_target:
+            errors.append(f"targets[{idx}] cannot exceed {limits.max_users_per_target} users")
         tracked_ids: list[int] = []
         aliases: dict[int, str] = {}
         for uidx, entry in enumerate(tracked_users_raw, start=1):
@@ -2653,6 +2657,7 @@ def _render_toml(config: dict[str, Any], raw_existing: dict[str, Any]) -> str:
             ]
         )
 
+    existing_targets = _existing_targets_by_chat_id(raw_existing)
     for target in config["targets"]:
         lines.extend(
             [
@@ -2667,6 +2672,10 @@ def _render_toml(config: dict[str, Any], raw_existing: dict[str, Any]) -> str:
             lines.append(f"summary_interval_minutes = {target['summary_interval_minutes']}")
         if target.get("control_group"):
             lines.append(f"control_group = {toml_string(target['control_group'])}")
+        raw_target = existing_targets.get(str(target["target_chat_id"]), {})
+        for key in _TARGET_PASSTHROUGH_KEYS:
+            if key in raw_target:
+                lines.append(f"{key} = {toml_scalar(raw_target[key])}")
         aliases = target.get("tracked_user_aliases", {})
         if aliases:
             lines.append("")
@@ -2719,6 +2728,15 @@ def _render_toml(config: dict[str, Any], raw_existing: dict[str, Any]) -> str:
             f"summary_interval_minutes = {reporting['summary_interval_minutes']}",
             f"timezone = {toml_string(reporting['timezone'])}",
             f"retention_days = {reporting['retention_days']}",
+        ]
+    )
+    raw_reporting = raw_existing.get("reporting")
+    if isinstance(raw_reporting, dict):
+        for key in _REPORTING_PASSTHROUGH_KEYS:
+            if key in raw_reporting:
+                lines.append(f"{key} = {toml_scalar(raw_reporting[key])}")
+    lines.extend(
+        [
             "",
             "[display]",
             f"show_ids = {toml_bool(display['show_ids'])}",
@@ -2729,9 +2747,36 @@ def _render_toml(config: dict[str, Any], raw_existing: dict[str, Any]) -> str:
         ]
     )
 
+    # Sections the GUI does not edit are carried over verbatim.
+    for section in _PASSTHROUGH_SECTIONS:
+        raw_section = raw_existing.get(section)
+        if not isinstance(raw_section, dict) or not raw_section:
+            continue
+        lines.extend(["", f"[{section}]"])
+        for key, value in raw_section.items():
+            lines.append(f"{key} = {toml_scalar(value)}")
+
     return "\n".join(lines).strip() + "\n"
 
 
+def _existing_limits(raw_existing: dict[str, Any]) -> LimitsConfig:
+    try:
+        return parse_limits(raw_existing.get("limits") or {})
+    except ConfigError:
+        return LimitsConfig()
+
+
+def _existing_targets_by_chat_id(raw_existing: dict[str, Any]) -> dict[str, dict[str, Any]]:
+    raw_targets = raw_existing.get("targets")
+    if raw_targets is None and isinstance(raw_existing.get("target"), dict):
+        raw_targets = [raw_existing["target"]]
+    indexed: dict[str, dict[str, Any]] = {}
+    for raw in raw_targets or []:
+        if isinstance(raw, dict) and "target_chat_id" in raw:
+            indexed[str(raw["target_chat_id"])] = raw
+    return indexed
+
+
 def toml_string(value: str) -> str:
     value = value.replace("\\", "\\\\").replace('"', "\\\"")
     return f'"{value}"'
@@ -2741,5 +2786,15 @@ def toml_bool(value: bool) -> str:
     return "true" if value else "false"
 
 
+def toml_scalar(value: Any) -> str:
+    if isinstance(value, bool):
+        return toml_bool(value)
+    if isinstance(value, (int, float)):
+        return str(value)
+    if isinstance(value, list):
+        return "[" + ", ".join(toml_scalar(item) for item in value) + "]"
+    return toml_string(str(value))
+
+
 def toml_list(values: list[int]) -> str:
     return "[" + ", ".join(str(value) for value in values) + "]"
@@ -0,0 +1,236 @@
+"""Drive `run_daemon` with synthetic traffic from a fake client."""
+
+from __future__ import annotations
+
+import asyncio
+import random
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import timezone
+from pathlib import Path
+from types import MappingProxyType
+from typing import Mapping, Sequence
+
+from .config import (
+    Config,
+    ControlGroupConfig,
+    DisplayConfig,
+    LimitsConfig,
+    NotificationConfig,
+    ReportingConfig,
+    StorageConfig,
+    TargetGroupConfig,
+    TelegramConfig,
+)
+from .fakes import FakeTelegramClient
+from .metrics import peak_rss_mb, percentile
+from .runner import run_daemon
+from .storage import db_session
+
+_CONTROL_CHAT_ID = -1009999999999
+_FIRST_TARGET_ID = -1001000000000
+_FIRST_USER_ID = 10_000
+
+
+@dataclass
+class LoadResult:
+    chats: int
+    rate: float
+    duration: float
+    sent: int
+    captured: int
+    elapsed: float
+    latency_p50_ms: float
+    latency_p95_ms: float
+    latency_p99_ms: float
+    peak_rss_mb: float | None
+    api_calls: int
+
+    @property
+    def messages_per_sec(self) -> float:
+        return self.captured / self.elapsed if self.elapsed else 0.0
+
+
+async def run_load(
+    *,
+    chats: int = 10,
+    rate: float = 5.0,
+    duration: float = 10.0,
+    users_per_chat: int = 5,
+    media_ratio: float = 0.0,
+    media_kb: int = 64,
+    latency: float = 0.0,
+    flood_every: int = 0,
+    workdir: Path | None = None,
+    seed: int = 0,
+) -> LoadResult:
+    """Run the daemon against `chats` fake chats receiving `rate` messages/sec each.
+
+    Capture latency is measured from the update being emitted to its handler
+    finishing (message and media persisted). With `flood_every`, every N-th
+    media download raises a FloodWait.
+    """
+    if workdir is None:
+        with tempfile.TemporaryDirectory(prefix="tgwatch-load-") as tmp:
+            return await run_load(
+                chats=chats,
+                rate=rate,
+                duration=duration,
+                users_per_chat=users_per_chat,
+                media_ratio=media_ratio,
+                media_kb=media_kb,
+                latency=latency,
+                flood_every=flood_every,
+                workdir=Path(tmp),
+                seed=seed,
+            )
+    rng = random.Random(seed)
+    config = build_load_config(workdir, chats=chats, users_per_chat=users_per_chat)
+    client = FakeTelegramClient(latency=latency)
+    if flood_every:
+        client.flood_wait_every("download_media", flood_every, 0)
+    daemon = asyncio.create_task(run_daemon(config, client_factory=lambda *_: client))
+    started = asyncio.create_task(client.started.wait())
+    await asyncio.wait({daemon, started}, return_when=asyncio.FIRST_COMPLETED)
+    if daemon.done():
+        started.cancel()
+        daemon.result()
+        raise RuntimeError("daemon stopped before it started listening")
+
+    loop = asyncio.get_running_loop()
+    latencies: list[float] = []
+    total = int(chats * rate * duration)
+    sent = 0
+    begin = loop.time()
+    try:
+        while sent < total:
+            due = min(total, int((loop.time() - begin) * chats * rate) + 1)
+            while sent < due:
+                target = config.targets[sent % chats]
+                message = client.make_message(
+                    target.target_chat_id,
+                    rng.choice(target.tracked_user_ids),
+                    f"load message {sent}",
+                    media_size=media_kb * 1024 if rng.random() < media_ratio else None,
+                )
+                emitted_at = time.perf_counter()
+                client.emit(message).add_done_callback(
+                    lambda _task, at=emitted_at: latencies.append(time.perf_counter() - at)
+                )
+                sent += 1
+            await asyncio.sleep(0.005)
+        await client.drain()
+        elapsed = loop.time() - begin
+    finally:
+        await client.disconnect()
+        await daemon
+
+    with db_session(config.storage.db_path) as conn:
+        captured = int(conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0])
+    latencies.sort()
+    return LoadResult(
+        chats=chats,
+        rate=rate,
+        duration=duration,
+        sent=sent,
+        captured=captured,
+        elapsed=elapsed,
+        latency_p50_ms=percentile(latencies, 50) * 1000,
+        latency_p95_ms=percentile(latencies, 95) * 1000,
+        latency_p99_ms=percentile(latencies, 99) * 1000,
+        peak_rss_mb=peak_rss_mb(),
+        api_calls=sum(client.calls.values()),
+    )
+
+
+def build_load_config(workdir: Path, *, chats: int, users_per_chat: int) -> Config:
+    """Config with `chats` targets sharing one control chat, rooted at `workdir`."""
+    targets = {
+        _FIRST_TARGET_ID - index: tuple(
+            _FIRST_USER_ID + index * users_per_chat + offset for offset in range(users_per_chat)
+        )
+        for index in range(chats)
+    }
+    return build_fake_config(workdir, targets, {chat_id: _CONTROL_CHAT_ID for chat_id in targets})
+
+
+def build_fake_config(
+    workdir: Path,
+    targets: Mapping[int, Sequence[int]],
+    controls: Mapping[int, int],
+) -> Config:
+    """Config for fake-client runs: `targets` maps chat id to tracked users and
+    `controls` maps each target chat to its control chat."""
+    control_groups = {
+        f"control-{index}": ControlGroupConfig(
+            key=f"control-{index}",
+            control_chat_id=chat_id,
+            is_forum=False,
+            topic_routing_enabled=False,
+            topic_target_map=MappingProxyType({}),
+        )
+        for index, chat_id in enumerate(sorted(set(controls.values())))
+    }
+    key_by_chat = {group.control_chat_id: key for key, group in control_groups.items()}
+    target_configs = tuple(
+        TargetGroupConfig(
+            name=f"target-{index}",
+            target_chat_id=chat_id,
+            tracked_user_ids=tuple(tracked),
+            tracked_user_aliases=MappingProxyType({}),
+            summary_interval_minutes=24 * 60,
+            control_group=key_by_chat.get(controls.get(chat_id, 0)),
+        )
+        for index, (chat_id, tracked) in enumerate(targets.items())
+    )
+    by_control: dict[str, list[TargetGroupConfig]] = {}
+    for target in target_configs:
+        if target.control_group:
+            by_control.setdefault(target.control_group, []).append(target)
+    return Config(
+        config_version=1.0,
+        telegram=TelegramConfig(
+            api_id=1, api_hash="load-test", session_file=workdir / "load.session"
+        ),
+        sender=None,
+        targets=target_configs,
+        control_groups=MappingProxyType(control_groups),
+        target_by_chat_id=MappingProxyType(
+            {target.target_chat_id: target for target in target_configs}
+        ),
+        target_by_name=MappingProxyType({target.name: target for target in target_configs}),
+        control_by_chat_id=MappingProxyType(
+            {group.control_chat_id: group for group in control_groups.values()}
+        ),
+        targets_by_control=MappingProxyType(
+            {key: tuple(value) for key, value in by_control.items()}
+        ),
+        storage=StorageConfig(db_path=workdir / "load.sqlite3", media_dir=workdir / "media"),
+        reporting=ReportingConfig(
+            reports_dir=workdir / "reports",
+            summary_interval_minutes=24 * 60,
+            timezone=timezone.utc,
+            retention_days=30,
+        ),
+        display=DisplayConfig(show_ids=True, time_format="%Y.%m.%d %H:%M:%S (%Z)"),
+        notifications=NotificationConfig(bark_key=None),
+        limits=LimitsConfig(
+            max_target_groups=max(1, len(target_configs)),
+            max_users_per_target=max((len(t.tracked_user_ids) for t in target_configs), default=1),
+            max_control_groups=max(1, len(control_groups)),
+        ),
+    )
+
+
+def format_load_result(result: LoadResult) -> str:
+    memory = f"{result.peak_rss_mb:,.1f} MB" if result.peak_rss_mb is not None else "n/a"
+    return (
+        f"load: {result.chats} chats x {result.rate:g} msg/s for {result.duration:g}s\n"
+        f"  captured:        {result.captured}/{result.sent} messages in {result.elapsed:.2f}s\n"
+        f"  throughput:      {result.messages_per_sec:,.1f} messages/s\n"
+        f"  capture latency: p50 {result.latency_p50_ms:.1f} ms, "
+        f"p95 {result.latency_p95_ms:.1f} ms, p99 {result.latency_p99_ms:.1f} ms\n"
+        f"  API calls:       {result.api_calls}\n"
+        f"  peak RSS:        {memory}"
+    )
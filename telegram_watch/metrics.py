@@ -0,0 +1,283 @@
+"""Counters and histograms for the daemon, served in Prometheus text format."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import sys
+import time
+from contextlib import contextmanager
+from typing import Iterator, Sequence
+
+try:  # pragma: no cover - not available on Windows
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS: tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: object) -> None:
+        key = _label_key(self.labels, labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: object) -> float:
+        return self._values.get(_label_key(self.labels, labels), 0.0)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}")
+        return lines
+
+    def reset(self) -> None:
+        self._values.clear()
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._counts: dict[tuple[str, ...], list[int]] = {}
+        self._sums: dict[tuple[str, ...], float] = {}
+
+    def observe(self, value: float, **labels: object) -> None:
+        key = _label_key(self.labels, labels)
+        counts = self._counts.setdefault(key, [0] * (len(self.buckets) + 1))
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[index] += 1
+                break
+        else:
+            counts[-1] += 1
+        self._sums[key] = self._sums.get(key, 0.0) + value
+
+    @contextmanager
+    def time(self, **labels: object) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels: object) -> int:
+        return sum(self._counts.get(_label_key(self.labels, labels), ()))
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key in sorted(self._counts):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), self._counts[key]):
+                cumulative += count
+                le = "+Inf" if bound == math.inf else _format_value(bound)
+                labels = _format_labels(self.labels + ("le",), key + (le,))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labels, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(self._sums[key])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+    def reset(self) -> None:
+        self._counts.clear()
+        self._sums.clear()
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: list[Counter | Histogram] = []
+
+    def counter(self, name: str, help_text: str, labels: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, help_text, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help_text: str, labels: Sequence[str] = ()) -> Histogram:
+        metric = Histogram(name, help_text, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        for metric in self._metrics:
+            metric.reset()
+
+
+REGISTRY = Registry()
+UPDATES_RECEIVED = REGISTRY.counter(
+    "tgwatch_updates_received_total", "Updates received per watched chat.", ("chat_id",)
+)
+UPDATES_FILTERED = REGISTRY.counter(
+    "tgwatch_updates_filtered_total",
+    "Target updates ignored because the sender is not tracked.",
+    ("target",),
+)
+CAPTURE_SECONDS = REGISTRY.histogram(
+    "tgwatch_capture_seconds",
+    "Time from receiving a tracked message to storing it, including media.",
+    ("target",),
+)
+MEDIA_BYTES = REGISTRY.counter(
+    "tgwatch_media_downloaded_bytes_total", "Bytes of media and thumbnails downloaded."
+)
+DB_COMMIT_SECONDS = REGISTRY.histogram(
+    "tgwatch_db_commit_seconds", "Time to write and commit a captured message to SQLite."
+)
+SUMMARY_RENDER_SECONDS = REGISTRY.histogram(
+    "tgwatch_summary_render_seconds", "Time to render a summary HTML report.", ("target",)
+)
+SENT = REGISTRY.counter(
+    "tgwatch_sent_total", "Messages, files and forwards sent to control chats.", ("kind",)
+)
+FLOOD_WAIT_SECONDS = REGISTRY.counter(
+    "tgwatch_flood_wait_seconds_total", "FloodWait penalty seconds per method.", ("method",)
+)
+SENDER_FALLBACKS = REGISTRY.counter(
+    "tgwatch_sender_fallbacks_total",
+    "Sends retried with the primary account after the sender account failed.",
+    ("kind",),
+)
+LOOP_LAG_SECONDS = REGISTRY.histogram(
+    "tgwatch_event_loop_lag_seconds", "How late the event loop ran a scheduled wake-up."
+)
+LOOP_STALLS = REGISTRY.counter(
+    "tgwatch_event_loop_stalls_total",
+    "Event-loop stalls over the threshold, by the blocking call site.",
+    ("site",),
+)
+
+
+class MetricsServer:
+    """Minimal HTTP server answering `GET /metrics` from `REGISTRY`.
+
+    It also samples event-loop lag once per `lag_interval` seconds while
+    running, since a blocked loop is the first sign of a stalled daemon.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        *,
+        registry: Registry = REGISTRY,
+        lag_interval: float = 1.0,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self._registry = registry
+        self._lag_interval = lag_interval
+        self._server: asyncio.AbstractServer | None = None
+        self._lag_task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        sockets = self._server.sockets or []
+        if sockets:
+            self.port = int(sockets[0].getsockname()[1])
+        self._lag_task = asyncio.create_task(self._sample_loop_lag())
+        logger.info("Serving metrics on http://%s:%s/metrics", self.host, self.port)
+
+    async def stop(self) -> None:
+        if self._lag_task:
+            self._lag_task.cancel()
+            try:
+                await self._lag_task
+            except asyncio.CancelledError:
+                pass
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request_line = await reader.readline()
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            parts = request_line.decode("latin-1").split()
+            if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+                body = self._registry.render().encode("utf-8")
+                status = "200 OK"
+                content_type = "text/plain; version=0.0.4; charset=utf-8"
+            else:
+                body = b"not found\n"
+                status = "404 Not Found"
+                content_type = "text/plain; charset=utf-8"
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1")
+                + body
+            )
+            await writer.drain()
+        except (ConnectionError, UnicodeDecodeError):
+            pass
+        finally:
+            writer.close()
+
+    async def _sample_loop_lag(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self._lag_interval
+            await asyncio.sleep(self._lag_interval)
+            LOOP_LAG_SECONDS.observe(max(0.0, loop.time() - expected))
+
+
+def percentile(values: Sequence[float], percent: float) -> float:
+    """Nearest-rank percentile of sorted `values`."""
+    if not values:
+        return 0.0
+    rank = max(1, -(-len(values) * percent // 100))
+    return values[int(rank) - 1]
+
+
+def peak_rss_mb() -> float | None:
+    """Peak resident memory of this process in MB, or None where unsupported."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes elsewhere.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _label_key(names: tuple[str, ...], labels: dict[str, object]) -> tuple[str, ...]:
+    return tuple(str(labels.get(name, "")) for name in names)
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
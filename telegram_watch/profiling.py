@@ -0,0 +1,216 @@
+"""Low-overhead CPU and memory profiling for `run` and `once`.
+
+`cpu` samples every thread's stack from a background thread (no tracing hook,
+so the event loop runs at full speed) and writes collapsed stacks that
+flamegraph tools read directly, plus a plain-text top list. `memory` starts
+`tracemalloc` and writes a snapshot and a top-allocations report at each
+interval. One profile can be active per process; the daemon's `/profile`
+command starts and stops it without a restart.
+"""
+
+from __future__ import annotations
+
+import collections
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+from types import FrameType
+
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+PROFILE_MODES = ("cpu", "memory")
+_TOP_LINES = 25
+
+
+def profile_dir(config: Config) -> Path:
+    """Profiles go under `profiles/` in the database's directory (`[storage].db_path`)."""
+    return config.storage.db_path.parent / "profiles"
+
+
+class Profiler:
+    def __init__(
+        self,
+        mode: str,
+        output_dir: Path,
+        *,
+        sample_interval: float = 0.01,
+        dump_interval: float = 300.0,
+    ) -> None:
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode: {mode} (expected cpu or memory)")
+        self.mode = mode
+        self.output_dir = output_dir
+        self.sample_interval = sample_interval
+        self.dump_interval = dump_interval
+        self.samples = 0
+        self.started_at: float | None = None
+        self._stacks: collections.Counter[tuple[str, ...]] = collections.Counter()
+        self._snapshots = 0
+        self._first_snapshot: tracemalloc.Snapshot | None = None
+        self._owns_tracemalloc = False
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._stamp = ""
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> "Profiler":
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.started_at = time.time()
+        self._stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(self.started_at))
+        if self.mode == "memory" and not tracemalloc.is_tracing():
+            tracemalloc.start(10)
+            self._owns_tracemalloc = True
+        self._thread = threading.Thread(
+            target=self._run, name=f"tgwatch-profile-{self.mode}", daemon=True
+        )
+        self._thread.start()
+        logger.info("Started %s profile; dumps go to %s", self.mode, self.output_dir)
+        return self
+
+    def stop(self) -> list[Path]:
+        """Stop profiling and write the final dump; returns the files written."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        paths = self.dump()
+        if self._owns_tracemalloc:
+            tracemalloc.stop()
+            self._owns_tracemalloc = False
+        logger.info("Stopped %s profile: %s", self.mode, ", ".join(str(p) for p in paths))
+        return paths
+
+    def dump(self) -> list[Path]:
+        if self.mode == "cpu":
+            return self._dump_cpu()
+        return self._dump_memory()
+
+    def _run(self) -> None:
+        next_dump = time.monotonic() + self.dump_interval
+        wait = self.sample_interval if self.mode == "cpu" else self.dump_interval
+        while not self._stop.wait(wait):
+            if self.mode == "cpu":
+                self._sample()
+            if time.monotonic() >= next_dump:
+                try:
+                    self.dump()
+                except OSError as exc:
+                    logger.warning("Failed to write %s profile: %s", self.mode, exc)
+                next_dump = time.monotonic() + self.dump_interval
+
+    def _sample(self) -> None:
+        own = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        frames = sys._current_frames()
+        with self._lock:
+            for ident, frame in frames.items():
+                if ident == own:
+                    continue
+                self._stacks[(names.get(ident, str(ident)),) + _stack(frame)] += 1
+            self.samples += 1
+
+    def _dump_cpu(self) -> list[Path]:
+        with self._lock:
+            stacks = dict(self._stacks)
+            samples = self.samples
+        folded = self.output_dir / f"cpu-{self._stamp}.folded"
+        _write_atomic(
+            folded,
+            "".join(f"{';'.join(stack)} {count}\n" for stack, count in sorted(stacks.items())),
+        )
+        own: collections.Counter[str] = collections.Counter()
+        total: collections.Counter[str] = collections.Counter()
+        for stack, count in stacks.items():
+            if len(stack) > 1:
+                own[stack[-1]] += count
+            for frame in set(stack[1:]):
+                total[frame] += count
+        lines = [f"{samples} samples every {self.sample_interval * 1000:g} ms", ""]
+        lines.append(f"{'self':>7} {'total':>7}  function")
+        for frame, count in own.most_common(_TOP_LINES):
+            lines.append(f"{count:>7} {total[frame]:>7}  {frame}")
+        summary = self.output_dir / f"cpu-{self._stamp}.txt"
+        _write_atomic(summary, "\n".join(lines) + "\n")
+        return [folded, summary]
+
+    def _dump_memory(self) -> list[Path]:
+        if not tracemalloc.is_tracing():
+            return []
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            (tracemalloc.Filter(False, tracemalloc.__file__),)
+        )
+        self._snapshots += 1
+        dump_path = self.output_dir / f"memory-{self._stamp}-{self._snapshots:03d}.snapshot"
+        snapshot.dump(str(dump_path))
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [
+            f"snapshot {self._snapshots} at {time.strftime('%Y-%m-%d %H:%M:%S')}: "
+            f"{current / 1024 / 1024:.1f} MB traced, peak {peak / 1024 / 1024:.1f} MB",
+            "top allocations:",
+        ]
+        lines.extend(f"  {stat}" for stat in snapshot.statistics("lineno")[:_TOP_LINES])
+        if self._first_snapshot is None:
+            self._first_snapshot = snapshot
+        else:
+            lines.append("growth since first snapshot:")
+            lines.extend(
+                f"  {stat}"
+                for stat in snapshot.compare_to(self._first_snapshot, "lineno")[:_TOP_LINES]
+            )
+        summary = self.output_dir / f"memory-{self._stamp}.txt"
+        with summary.open("a", encoding="utf-8") as fh:
+            fh.write("\n".join(lines) + "\n\n")
+        return [dump_path, summary]
+
+
+_ACTIVE: Profiler | None = None
+_ACTIVE_LOCK = threading.Lock()
+
+
+def start_profile(mode: str, output_dir: Path, **kwargs: float) -> Profiler:
+    """Start the process-wide profile; raises RuntimeError if one is running."""
+    global _ACTIVE
+    with _ACTIVE_LOCK:
+        if _ACTIVE is not None and _ACTIVE.running:
+            raise RuntimeError(f"A {_ACTIVE.mode} profile is already running")
+        _ACTIVE = Profiler(mode, output_dir, **kwargs).start()
+        return _ACTIVE
+
+
+def stop_profile() -> list[Path]:
+    """Stop the active profile, if any, and return the files it wrote."""
+    global _ACTIVE
+    with _ACTIVE_LOCK:
+        profiler, _ACTIVE = _ACTIVE, None
+    if profiler is None:
+        return []
+    return profiler.stop()
+
+
+def active_profile() -> Profiler | None:
+    return _ACTIVE
+
+
+def _stack(frame: FrameType | None) -> tuple[str, ...]:
+    labels: list[str] = []
+    while frame is not None:
+        code = frame.f_code
+        labels.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    labels.reverse()
+    return tuple(labels)
+
+
+def _write_atomic(path: Path, text: str) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(text, encoding="utf-8")
+    tmp.replace(path)
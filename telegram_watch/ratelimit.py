@@ -0,0 +1,139 @@
+"""Per-account rate limiting for Telegram API calls."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Mapping
+
+logger = logging.getLogger(__name__)
+
+METHOD_CLASSES = ("send_message", "send_file", "get_messages", "download", "other")
+
+# (tokens per second, burst) per method class. Conservative defaults that keep
+# a single account well below Telegram's flood thresholds for group chats.
+DEFAULT_RATES: Mapping[str, tuple[float, int]] = {
+    "send_message": (1.0, 5),
+    "send_file": (0.5, 3),
+    "get_messages": (5.0, 10),
+    "download": (3.0, 6),
+    "other": (5.0, 10),
+}
+
+_MIN_RATE_FACTOR = 1 / 16
+_RECOVERY_FACTOR = 0.02
+
+
+@dataclass
+class MethodStats:
+    calls: int = 0
+    flood_waits: int = 0
+    flood_wait_seconds: float = 0.0
+    waited_seconds: float = 0.0
+
+
+class _TokenBucket:
+    def __init__(self, rate: float, burst: int, now: float) -> None:
+        self.base_rate = rate
+        self.rate = rate
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.updated = now
+
+    def take(self, now: float) -> float:
+        """Consume a token, or return how long until one is available."""
+        elapsed = max(0.0, now - self.updated)
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return 0.0
+        return (1.0 - self.tokens) / self.rate
+
+    def slow_down(self) -> None:
+        self.rate = max(self.base_rate * _MIN_RATE_FACTOR, self.rate / 2)
+        self.tokens = min(self.tokens, 0.0)
+
+    def recover(self) -> None:
+        if self.rate < self.base_rate:
+            self.rate = min(self.base_rate, self.rate + self.base_rate * _RECOVERY_FACTOR)
+
+
+class AccountRateLimiter:
+    """Token buckets per method class plus an account-wide FloodWait pause.
+
+    A FloodWait on any method pauses every caller of the account until the
+    penalty expires and halves that method's rate; successful calls slowly
+    restore it (AIMD), so the limiter settles just below what Telegram accepts.
+    """
+
+    def __init__(
+        self,
+        name: str = "account",
+        *,
+        rates: Mapping[str, tuple[float, int]] | None = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    ) -> None:
+        self.name = name
+        self._clock = clock
+        self._sleep = sleep
+        now = clock()
+        configured = dict(DEFAULT_RATES)
+        configured.update(rates or {})
+        self._buckets = {
+            method: _TokenBucket(rate, burst, now) for method, (rate, burst) in configured.items()
+        }
+        self._stats = {method: MethodStats() for method in configured}
+        self._paused_until = 0.0
+
+    async def acquire(self, method: str) -> None:
+        method = method if method in self._buckets else "other"
+        bucket = self._buckets[method]
+        stats = self._stats[method]
+        while True:
+            now = self._clock()
+            if now < self._paused_until:
+                delay = self._paused_until - now
+            else:
+                delay = bucket.take(now)
+                if delay <= 0:
+                    stats.calls += 1
+                    return
+            stats.waited_seconds += delay
+            await self._sleep(delay)
+
+    def record_flood_wait(self, method: str, seconds: float) -> None:
+        method = method if method in self._buckets else "other"
+        self._paused_until = max(self._paused_until, self._clock() + seconds)
+        self._buckets[method].slow_down()
+        stats = self._stats[method]
+        stats.flood_waits += 1
+        stats.flood_wait_seconds += seconds
+
+    def record_success(self, method: str) -> None:
+        bucket = self._buckets.get(method) or self._buckets["other"]
+        bucket.recover()
+
+    def current_rate(self, method: str) -> float:
+        return (self._buckets.get(method) or self._buckets["other"]).rate
+
+    def stats(self) -> dict[str, MethodStats]:
+        return {method: MethodStats(**vars(stat)) for method, stat in self._stats.items()}
+
+    def log_summary(self) -> None:
+        for method, stat in self._stats.items():
+            if not stat.calls and not stat.flood_waits:
+                continue
+            logger.info(
+                "Rate limiter [%s] %s: %s call(s), %s FloodWait(s) totalling %.0fs, "
+                "%.1fs spent waiting",
+                self.name,
+                method,
+                stat.calls,
+                stat.flood_waits,
+                stat.flood_wait_seconds,
+                stat.waited_seconds,
+            )
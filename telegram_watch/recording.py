@@ -0,0 +1,193 @@
+"""Record the daemon's incoming updates for later replay.
+
+The log is JSON lines (gzip-compressed when the file name ends in `.gz`). Each
+recording session appends a header line describing the watched chats, followed
+by one line per update with its arrival offset in seconds. Message text from target chats is not stored,
+only its length, so a recording can be shared without leaking conversations.
+Control-chat commands are kept verbatim because replay needs them.
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import IO, Any, Awaitable, Callable, Iterator
+
+from .config import Config
+
+RECORDING_VERSION = 1
+_FLUSH_EVERY = 50
+
+
+@dataclass
+class RecordedUpdate:
+    offset: float
+    chat_id: int
+    message_id: int
+    sender_id: int | None
+    text_length: int
+    text: str | None = None
+    reply_to: int | None = None
+    grouped_id: int | None = None
+    media_size: int | None = None
+    media_mime: str | None = None
+
+
+@dataclass
+class Recording:
+    owner_id: int
+    targets: dict[int, tuple[int, ...]]
+    control_chat_ids: tuple[int, ...]
+    target_controls: dict[int, int] = field(default_factory=dict)
+    updates: list[RecordedUpdate] = field(default_factory=list)
+
+    @property
+    def duration(self) -> float:
+        return self.updates[-1].offset if self.updates else 0.0
+
+
+class UpdateRecorder:
+    """Wraps the update handler and appends every update to a log file."""
+
+    def __init__(
+        self,
+        path: Path,
+        config: Config,
+        *,
+        owner_id: int,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.path = path
+        self._clock = clock
+        self._start = clock()
+        self._control_chat_ids = frozenset(config.control_by_chat_id)
+        self._pending = 0
+        self.count = 0
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Append, so restarting `run --record` on the same file keeps earlier
+        # sessions (gzip files simply gain another member).
+        self._fh = _open(path, "at")
+        self._write(
+            {
+                "version": RECORDING_VERSION,
+                "owner_id": owner_id,
+                "targets": [
+                    {
+                        "chat_id": target.target_chat_id,
+                        "tracked": list(target.tracked_user_ids),
+                        "control": config.control_groups[target.control_group].control_chat_id
+                        if target.control_group in config.control_groups
+                        else None,
+                    }
+                    for target in config.targets
+                ],
+                "controls": sorted(self._control_chat_ids),
+            }
+        )
+
+    def wrap(self, handler: Callable[[Any], Awaitable[None]]) -> Callable[[Any], Awaitable[None]]:
+        async def _recording_handler(event: Any) -> None:
+            self.record(event)
+            await handler(event)
+
+        return _recording_handler
+
+    def record(self, event: Any) -> None:
+        message = event.message
+        chat_id = int(getattr(event, "chat_id", None) or getattr(message, "chat_id", 0))
+        text = getattr(message, "raw_text", None) or getattr(message, "message", None) or ""
+        line: dict[str, Any] = {
+            "t": round(self._clock() - self._start, 4),
+            "chat": chat_id,
+            "id": int(message.id),
+            "sender": getattr(message, "sender_id", None),
+            "len": len(text),
+        }
+        if chat_id in self._control_chat_ids:
+            line["text"] = text
+        reply_to = getattr(message, "reply_to_msg_id", None)
+        if reply_to and getattr(message, "is_reply", False):
+            line["reply"] = int(reply_to)
+        grouped_id = getattr(message, "grouped_id", None)
+        if grouped_id:
+            line["group"] = int(grouped_id)
+        file = getattr(message, "file", None) if getattr(message, "media", None) else None
+        if file is not None:
+            line["media"] = [getattr(file, "size", None), getattr(file, "mime_type", None)]
+        self._write(line)
+        self.count += 1
+        self._pending += 1
+        if self._pending >= _FLUSH_EVERY:
+            self._fh.flush()
+            self._pending = 0
+
+    def close(self) -> None:
+        if not self._fh.closed:
+            self._fh.close()
+
+    def _write(self, payload: dict[str, Any]) -> None:
+        self._fh.write(json.dumps(payload, separators=(",", ":")) + "\n")
+
+
+def load_recording(path: Path) -> Recording:
+    """Read a log written by `UpdateRecorder`."""
+    with _open(path, "rt") as fh:
+        lines = _json_lines(fh)
+        try:
+            header = next(lines)
+        except StopIteration:
+            raise ValueError(f"{path} is empty") from None
+        if header.get("version") != RECORDING_VERSION:
+            raise ValueError(f"{path} is not a tgwatch recording (version {header.get('version')})")
+        recording = Recording(owner_id=int(header["owner_id"]), targets={}, control_chat_ids=())
+        _merge_header(recording, header)
+        # Later sessions restart their clock; play them right after the previous one.
+        base = 0.0
+        for line in lines:
+            if "version" in line:
+                _merge_header(recording, line)
+                base = recording.duration
+                continue
+            media = line.get("media") or (None, None)
+            recording.updates.append(
+                RecordedUpdate(
+                    offset=base + float(line["t"]),
+                    chat_id=int(line["chat"]),
+                    message_id=int(line["id"]),
+                    sender_id=line.get("sender"),
+                    text_length=int(line.get("len", 0)),
+                    text=line.get("text"),
+                    reply_to=line.get("reply"),
+                    grouped_id=line.get("group"),
+                    media_size=media[0],
+                    media_mime=media[1],
+                )
+            )
+    return recording
+
+
+def _merge_header(recording: Recording, header: dict[str, Any]) -> None:
+    for item in header["targets"]:
+        chat_id = int(item["chat_id"])
+        recording.targets[chat_id] = tuple(int(uid) for uid in item["tracked"])
+        if item.get("control") is not None:
+            recording.target_controls[chat_id] = int(item["control"])
+    controls = dict.fromkeys(recording.control_chat_ids)
+    controls.update(dict.fromkeys(int(chat_id) for chat_id in header["controls"]))
+    recording.control_chat_ids = tuple(controls)
+
+
+def _open(path: Path, mode: str) -> IO[str]:
+    if path.suffix == ".gz":
+        return gzip.open(path, mode, encoding="utf-8")  # type: ignore[return-value]
+    return path.open(mode[0], encoding="utf-8")
+
+
+def _json_lines(fh: IO[str]) -> Iterator[dict[str, Any]]:
+    for raw in fh:
+        raw = raw.strip()
+        if raw:
+            yield json.loads(raw)
@@ -0,0 +1,148 @@
+"""Replay a recorded update stream through the daemon against a fake client."""
+
+from __future__ import annotations
+
+import asyncio
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from .fakes import FakeTelegramClient
+from .loadgen import build_fake_config
+from .metrics import peak_rss_mb, percentile
+from .recording import Recording
+from .runner import run_daemon
+from .storage import db_session
+
+
+@dataclass
+class ReplayResult:
+    updates: int
+    control_updates: int
+    captured: int
+    recorded_seconds: float
+    speed: float
+    elapsed: float
+    max_schedule_lag_ms: float
+    target_p50_ms: float
+    target_p95_ms: float
+    target_p99_ms: float
+    control_p50_ms: float
+    control_p95_ms: float
+    control_p99_ms: float
+    api_calls: int
+    peak_rss_mb: float | None
+
+
+def parse_speed(spec: str) -> float:
+    """Parse `10x`, `0.5x` or `10` into a positive speed factor."""
+    raw = spec.strip().lower().removesuffix("x")
+    try:
+        speed = float(raw)
+    except ValueError as exc:
+        raise ValueError(f"Invalid speed: {spec}") from exc
+    if speed <= 0:
+        raise ValueError("Speed must be > 0")
+    return speed
+
+
+async def replay_recording(
+    recording: Recording,
+    *,
+    speed: float = 1.0,
+    latency: float = 0.0,
+    workdir: Path | None = None,
+) -> ReplayResult:
+    """Feed `recording` through `run_daemon` with gaps divided by `speed`.
+
+    Text is replaced by filler of the recorded length and media by zero bytes
+    of the recorded size; reply links and album grouping are preserved.
+    """
+    if workdir is None:
+        with tempfile.TemporaryDirectory(prefix="tgwatch-replay-") as tmp:
+            return await replay_recording(
+                recording, speed=speed, latency=latency, workdir=Path(tmp)
+            )
+    config = build_fake_config(workdir, recording.targets, recording.target_controls)
+    client = FakeTelegramClient(self_id=recording.owner_id, latency=latency)
+    daemon = asyncio.create_task(run_daemon(config, client_factory=lambda *_: client))
+    started = asyncio.create_task(client.started.wait())
+    await asyncio.wait({daemon, started}, return_when=asyncio.FIRST_COMPLETED)
+    if daemon.done():
+        started.cancel()
+        daemon.result()
+        raise RuntimeError("daemon stopped before it started listening")
+
+    control_chat_ids = set(recording.control_chat_ids)
+    target_latencies: list[float] = []
+    control_latencies: list[float] = []
+    max_lag = 0.0
+    loop = asyncio.get_running_loop()
+    begin = loop.time()
+    try:
+        for update in recording.updates:
+            delay = update.offset / speed - (loop.time() - begin)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                max_lag = max(max_lag, -delay)
+            is_control = update.chat_id in control_chat_ids
+            message = client.make_message(
+                update.chat_id,
+                update.sender_id,
+                update.text if is_control and update.text is not None else "x" * update.text_length,
+                media_size=update.media_size,
+                media_mime=update.media_mime or "application/octet-stream",
+                message_id=update.message_id,
+                reply_to=update.reply_to,
+                grouped_id=update.grouped_id,
+            )
+            bucket = control_latencies if is_control else target_latencies
+            emitted_at = time.perf_counter()
+            client.emit(message).add_done_callback(
+                lambda _task, at=emitted_at, into=bucket: into.append(time.perf_counter() - at)
+            )
+        await client.drain()
+        elapsed = loop.time() - begin
+    finally:
+        await client.disconnect()
+        await daemon
+
+    with db_session(config.storage.db_path) as conn:
+        captured = int(conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0])
+    target_latencies.sort()
+    control_latencies.sort()
+    return ReplayResult(
+        updates=len(recording.updates),
+        control_updates=len(control_latencies),
+        captured=captured,
+        recorded_seconds=recording.duration,
+        speed=speed,
+        elapsed=elapsed,
+        max_schedule_lag_ms=max_lag * 1000,
+        target_p50_ms=percentile(target_latencies, 50) * 1000,
+        target_p95_ms=percentile(target_latencies, 95) * 1000,
+        target_p99_ms=percentile(target_latencies, 99) * 1000,
+        control_p50_ms=percentile(control_latencies, 50) * 1000,
+        control_p95_ms=percentile(control_latencies, 95) * 1000,
+        control_p99_ms=percentile(control_latencies, 99) * 1000,
+        api_calls=sum(client.calls.values()),
+        peak_rss_mb=peak_rss_mb(),
+    )
+
+
+def format_replay_result(result: ReplayResult) -> str:
+    memory = f"{result.peak_rss_mb:,.1f} MB" if result.peak_rss_mb is not None else "n/a"
+    return (
+        f"replay: {result.updates} updates ({result.control_updates} control), "
+        f"{result.recorded_seconds:.1f}s recorded at {result.speed:g}x\n"
+        f"  wall time:       {result.elapsed:.2f}s (max schedule lag {result.max_schedule_lag_ms:.1f} ms)\n"
+        f"  captured:        {result.captured} tracked messages\n"
+        f"  target latency:  p50 {result.target_p50_ms:.1f} ms, "
+        f"p95 {result.target_p95_ms:.1f} ms, p99 {result.target_p99_ms:.1f} ms\n"
+        f"  control latency: p50 {result.control_p50_ms:.1f} ms, "
+        f"p95 {result.control_p95_ms:.1f} ms, p99 {result.control_p99_ms:.1f} ms\n"
+        f"  API calls:       {result.api_calls}\n"
+        f"  peak RSS:        {memory}"
+    )
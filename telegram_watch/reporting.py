@@ -2,36 +2,48 @@
 
 from __future__ import annotations
 
-from collections import defaultdict
+import asyncio
+import functools
+import gzip
+import hashlib
+import io
+import mimetypes
+import multiprocessing
+import signal
+import zipfile
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass, replace
 from datetime import datetime, timedelta, timezone
 from base64 import b64encode
-from html import escape
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Sequence
+from typing import Any, BinaryIO, Callable, Iterable, Iterator, Mapping, TypeVar
 import os
 
+from jinja2 import ChoiceLoader, Environment, FileSystemLoader
+from markupsafe import Markup
+
 from .config import Config, TargetGroupConfig
 from .storage import DbMessage, DbMedia
 from .links import build_message_link
 from .timeutils import humanize_timedelta, utc_now
 
 
-CSS = """
-body { font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", sans-serif; margin: 2rem; }
-h1 { margin-bottom: 0; }
-.meta { color: #555; margin-bottom: 1rem; }
-.user-section { margin-top: 2rem; }
-.message { border: 1px solid #ddd; border-radius: 8px; padding: 1rem; margin-bottom: 1rem; }
-.timestamp { color: #666; font-size: 0.9rem; }
-.reply { background: #f7f7f7; padding: 0.5rem; border-left: 3px solid #999; margin-top: 0.75rem; }
-.media-gallery { margin-top: 0.75rem; display: flex; flex-wrap: wrap; gap: 0.5rem; }
-.media-gallery img { max-width: 280px; border-radius: 4px; border: 1px solid #ccc; }
-pre { white-space: pre-wrap; }
-"""
+_BUILTIN_TEMPLATES = Path(__file__).with_name("templates")
+REPORT_TEMPLATE = "report.html.j2"
+CSS = (_BUILTIN_TEMPLATES / "report.css").read_text(encoding="utf-8")
+
+
+@dataclass
+class ReportSet:
+    """A combined report plus, when requested, one report per sender."""
+
+    path: Path
+    user_paths: dict[int, Path]
 
 
 def generate_report(
-    messages: Sequence[DbMessage],
+    messages: Iterable[DbMessage],
     config: Config,
     since: datetime,
     until: datetime | None,
@@ -40,7 +52,45 @@ def generate_report(
     report_dir: Path | None = None,
     report_name: str = "index.html",
 ) -> Path:
-    """Generate HTML report and return the file path."""
+    """Generate HTML report and return the file path.
+
+    The report is streamed to disk as it is rendered, so memory use is bounded
+    by the encoding cache rather than by the size of the report.
+    """
+    return generate_reports(
+        messages,
+        config,
+        since,
+        until,
+        target=target,
+        report_dir=report_dir,
+        report_name=report_name,
+    ).path
+
+
+def generate_reports(
+    messages: Iterable[DbMessage],
+    config: Config,
+    since: datetime,
+    until: datetime | None,
+    *,
+    target: TargetGroupConfig | None = None,
+    report_dir: Path | None = None,
+    report_name: str = "index.html",
+    user_report_name: Callable[[int], str] | None = None,
+) -> ReportSet:
+    """Generate the combined report and, with `user_report_name`, one per sender.
+
+    Everything is rendered in one pass: messages are partitioned once, and
+    each sender's timestamps, labels and links are formatted once for both
+    their own report and their section of the combined one. Images reach
+    both through the encoding cache.
+
+    With `reporting.bundle`, each report is written as `.html.gz` or as a
+    `.zip` holding the HTML, its images and the originals they link to as
+    files (see `_BundleMedia`);
+    the returned paths point at those files.
+    """
     if report_dir is None:
         now = utc_now()
         report_dir = (
@@ -49,112 +99,336 @@ def generate_report(
             / now.strftime("%H%M")
         )
     report_dir.mkdir(parents=True, exist_ok=True)
-    html = _render_html(messages, config, since, until, report_dir, target=target)
-    path = report_dir / report_name
-    path.write_text(html, encoding="utf-8")
+    ENCODING_CACHE.resize(config.performance.report_encode_cache_mb * 1024 * 1024)
+    template = template_environment(config.reporting.templates_dir).get_template(REPORT_TEMPLATE)
+    header = _report_header(config, since, until)
+    bundle = config.reporting.bundle
+    media = _BundleMedia(archive=bundle == "zip") if bundle != "none" else None
+    user_paths: dict[int, Path] = {}
+
+    def _sections() -> Iterator[_SectionView]:
+        grouped = _group_by_user(messages)
+        for section in _iter_sections(grouped, config, report_dir, target, media):
+            if user_report_name is None:
+                yield section
+                continue
+            views = list(section.messages)
+            user_paths[section.sender_id] = _write_report(
+                report_dir / user_report_name(section.sender_id),
+                template.generate(header, sections=[replace(section, messages=iter(views))]),
+                bundle,
+                media.files_for(views) if media is not None else None,
+            )
+            yield replace(section, messages=iter(views))
+
+    path = _write_report(
+        report_dir / report_name,
+        template.generate(header, sections=_sections()),
+        bundle,
+        media.files if media is not None else None,
+    )
+    return ReportSet(path=path, user_paths=user_paths)
+
+
+def _write_report(
+    html_path: Path,
+    chunks: Iterable[str],
+    bundle: str = "none",
+    media_files: Mapping[str, Path] | None = None,
+) -> Path:
+    """Write the rendered HTML as-is, gzipped, or zipped with `media_files`.
+
+    `media_files` is read only after the HTML is written, since rendering is
+    what fills it.
+    """
+    if bundle == "gzip":
+        path = html_path.with_name(html_path.name + ".gz")
+    elif bundle == "zip":
+        path = html_path.with_suffix(".zip")
+    else:
+        path = html_path
+    partial = path.with_name(path.name + ".part")
+    try:
+        if bundle == "gzip":
+            with gzip.open(partial, "wt", encoding="utf-8", compresslevel=6) as fh:
+                for chunk in chunks:
+                    fh.write(chunk)
+        elif bundle == "zip":
+            with zipfile.ZipFile(partial, "w", zipfile.ZIP_DEFLATED, compresslevel=6) as archive:
+                with archive.open(html_path.name, "w", force_zip64=True) as raw:
+                    with io.TextIOWrapper(raw, encoding="utf-8") as fh:
+                        for chunk in chunks:
+                            fh.write(chunk)
+                # Images are already compressed; deflating them again gains nothing.
+                for name, source in (media_files or {}).items():
+                    archive.write(source, name, compress_type=zipfile.ZIP_STORED)
+        else:
+            with partial.open("w", encoding="utf-8") as fh:
+                for chunk in chunks:
+                    fh.write(chunk)
+        partial.replace(path)
+    finally:
+        partial.unlink(missing_ok=True)
     return path
 
 
-def _render_html(
-    messages: Sequence[DbMessage],
+T = TypeVar("T")
+
+
+class RenderPool:
+    """Worker processes that render reports off the event loop.
+
+    Rendering is CPU-bound (escaping, timestamp formatting, base64), so in the
+    daemon it would otherwise stall capture for as long as a large report
+    takes. Jobs get pickled arguments (config and message batch) and return
+    paths. Processes start on first use and each keeps its own encoding cache.
+    """
+
+    def __init__(self, workers: int) -> None:
+        if workers <= 0:
+            raise ValueError("workers must be > 0")
+        self.workers = workers
+        self._executor: ProcessPoolExecutor | None = None
+
+    async def run(self, func: Callable[..., T], /, *args: Any, **kwargs: Any) -> T:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_ignore_sigint,
+            )
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+
+def _ignore_sigint() -> None:
+    # Ctrl-C is handled by the parent, which shuts the pool down.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+@functools.lru_cache(maxsize=8)
+def template_environment(templates_dir: Path | None = None) -> Environment:
+    """Jinja environment for reports; files in `templates_dir` override the built-ins.
+
+    Templates are compiled once per process and never re-checked on disk, so
+    edits to a custom template take effect after a restart.
+    """
+    loaders = [FileSystemLoader(str(templates_dir))] if templates_dir else []
+    loaders.append(FileSystemLoader(str(_BUILTIN_TEMPLATES)))
+    return Environment(
+        loader=ChoiceLoader(loaders),
+        autoescape=True,
+        auto_reload=False,
+        trim_blocks=True,
+        lstrip_blocks=True,
+    )
+
+
+def _report_header(config: Config, since: datetime, until: datetime | None) -> dict[str, str]:
+    now = utc_now()
+    tz = config.reporting.timezone
+    return {
+        "since": _format_timestamp(since, tz),
+        "until": _format_timestamp(until or now, tz),
+        "duration": humanize_timedelta((until or now) - since),
+    }
+
+
+@dataclass
+class _MediaView:
+    index: int
+    kind: str = "image"
+    label: str = ""
+    href: str | None = None
+    src: str | None = None
+    data: Iterable[str] | None = None
+
+
+@dataclass
+class _ReplyView:
+    sender: str
+    date: str
+    text: str | None
+    media: list[_MediaView]
+
+
+@dataclass
+class _MessageView:
+    id: int
+    timestamp: str
+    link: str | None
+    text: str | None
+    reply: _ReplyView | None
+    media: list[_MediaView]
+
+
+@dataclass
+class _SectionView:
+    sender_id: int
+    label: str
+    messages: Iterator[_MessageView]
+
+
+def _iter_sections(
+    grouped: dict[int, list[DbMessage]],
     config: Config,
-    since: datetime,
-    until: datetime | None,
     report_dir: Path,
-    *,
-    target: TargetGroupConfig | None = None,
-) -> str:
-    grouped = _group_by_user(messages)
-    until_text = until.isoformat() if until else "now"
-    duration = until - since if until else utc_now() - since
-    tz = config.reporting.timezone
-    since_local = _format_timestamp(since, tz)
-    until_local = _format_timestamp(until or utc_now(), tz)
-    header = f"""
-    <html>
-    <head>
-        <meta charset="utf-8">
-        <title>telegram-watch report</title>
-        <style>{CSS}</style>
-    </head>
-    <body>
-        <h1>telegram-watch report</h1>
-        <div class="meta">Window: {escape(since_local)} → {escape(until_local)} ({escape(humanize_timedelta(duration))})</div>
-    """
-    body_parts = [header]
-    if not grouped:
-        body_parts.append("<p>No tracked messages.</p>")
+    target: TargetGroupConfig | None,
+    media: "_BundleMedia | None" = None,
+) -> Iterator[_SectionView]:
     for sender_id, items in grouped.items():
-        label = config.describe_user(sender_id, target=target)
-        body_parts.append(f'<div class="user-section">')
-        body_parts.append(f"<h2>{escape(label)}</h2>")
-        for msg in items:
-            body_parts.append(_render_message(msg, config, report_dir, target=target))
-        body_parts.append("</div>")
-    body_parts.append("</body></html>")
-    return "\n".join(body_parts)
+        yield _SectionView(
+            sender_id=sender_id,
+            label=config.describe_user(sender_id, target=target),
+            messages=(_message_view(msg, config, report_dir, target, media) for msg in items),
+        )
 
 
-def _render_message(
+def _message_view(
     message: DbMessage,
     config: Config,
     report_dir: Path,
-    *,
-    target: TargetGroupConfig | None = None,
-) -> str:
-    text_html = (
-        f"<pre>{escape(message.text)}</pre>" if message.text is not None else "<em>No text</em>"
-    )
-    reply_block = ""
-    reply_media = [media for media in message.media if media.is_reply]
+    target: TargetGroupConfig | None,
+    bundle: "_BundleMedia | None" = None,
+) -> _MessageView:
+    inline_max = config.performance.report_inline_max_kb * 1024
+    own: list[DbMedia] = []
+    replied: list[DbMedia] = []
+    for media in message.media:
+        (replied if media.is_reply else own).append(media)
+    reply = None
     if message.replied_sender_id:
-        reply_text = (
-            escape(message.replied_text or "")
-            if message.replied_text
-            else "<em>no text</em>"
-        )
-        replied_to = (
-            config.describe_user(int(message.replied_sender_id), target=target)
-            if message.replied_sender_id is not None
-            else "unknown user"
+        reply = _ReplyView(
+            sender=config.describe_user(int(message.replied_sender_id), target=target),
+            date=message.replied_date.isoformat() if message.replied_date else "unknown",
+            text=message.replied_text,
+            media=_media_views(replied, report_dir, inline_max, bundle) if replied else [],
         )
-        reply_block = (
-            '<div class="reply">'
-            f"Reply to {escape(replied_to)} at {escape(message.replied_date.isoformat() if message.replied_date else 'unknown')}"
-            f"<div>{reply_text}</div>"
-            f"{_render_media_gallery(reply_media, report_dir) if reply_media else ''}"
-            "</div>"
-        )
-    regular_media = [media for media in message.media if not media.is_reply]
-    media_block = _render_media_gallery(regular_media, report_dir)
-    local_ts = _format_timestamp(message.date, config.reporting.timezone)
-    msg_link = build_message_link(message.chat_id, message.message_id)
-    msg_label = f"MSG {message.message_id}"
-    if msg_link:
-        msg_label = f'<a href="{escape(msg_link)}" target="_blank">{escape(msg_label)}</a>'
-    return (
-        '<div class="message">'
-        f'<div class="timestamp">{escape(local_ts)} — {msg_label}</div>'
-        f"{text_html}"
-        f"{reply_block}"
-        f"{media_block}"
-        "</div>"
+    return _MessageView(
+        id=message.message_id,
+        timestamp=_format_timestamp(message.date, config.reporting.timezone),
+        link=build_message_link(message.chat_id, message.message_id),
+        text=message.text,
+        reply=reply,
+        media=_media_views(own, report_dir, inline_max, bundle) if own else [],
     )
 
 
-def _render_media_gallery(media_items: list[DbMedia], report_dir: Path) -> str:
-    if not media_items:
-        return ""
-    figures = []
+def _media_views(
+    media_items: list[DbMedia],
+    report_dir: Path,
+    inline_max: int = 0,
+    bundle: "_BundleMedia | None" = None,
+) -> list[_MediaView]:
+    """Gallery entries; images over `inline_max` bytes (0: no cap) are linked, not inlined.
+
+    With `bundle`, images that would be inlined and the originals they link to
+    are added to it and referenced by their path inside the archive instead;
+    a gzip bundle has no archive, so such links are dropped.
+    """
+    views: list[_MediaView] = []
     for media in media_items:
-        abs_path = Path(media.file_path).resolve()
-        data_uri = _media_to_data_uri(abs_path, media.mime_type)
-        if not data_uri:
-            rel_url = escape(os.path.relpath(abs_path, report_dir))
-            figures.append(f'<img src="{rel_url}" alt="media {media.media_index}">')
+        view = _MediaView(index=media.media_index)
+        if media.thumb_path and (thumb := _open_image(Path(media.thumb_path), "image/jpeg")):
+            # The small Telegram thumbnail is inlined and links to the original.
+            _embed(view, thumb, Path(media.thumb_path), bundle)
+            if media.is_deferred:
+                view.kind, view.label = "deferred", media.media_kind or "file"
+            else:
+                view.href = _link(Path(media.file_path).resolve(), report_dir, bundle)
+        elif media.is_deferred:
+            view.kind, view.label = "deferred", media.media_kind or "file"
         else:
-            figures.append(f'<img src="{data_uri}" alt="media {media.media_index}">')
-    return '<div class="media-gallery">' + "".join(figures) + "</div>"
+            abs_path = Path(media.file_path).resolve()
+            image = _open_image(abs_path, media.mime_type)
+            if image is not None and not (inline_max and image.size > inline_max):
+                _embed(view, image, abs_path, bundle)
+            else:
+                if image is not None:
+                    image.fh.close()
+                url = _link(abs_path, report_dir, bundle)
+                if url is None:
+                    view.kind, view.label = "omitted", media.media_kind or "file"
+                elif image is None:
+                    view.src = url
+                else:
+                    view.href = view.src = url
+        views.append(view)
+    return views
+
+
+def _embed(
+    view: _MediaView, image: "_OpenImage", path: Path, bundle: "_BundleMedia | None"
+) -> None:
+    if bundle is None or not bundle.archive:
+        image.fh.close()
+        view.data = _InlineImage(path, image.mime)
+    else:
+        view.src = bundle.add(image, path)
+
+
+def _link(path: Path, report_dir: Path, bundle: "_BundleMedia | None") -> str | None:
+    if bundle is None:
+        return os.path.relpath(path, report_dir)
+    return bundle.link(path)
+
+
+class _BundleMedia:
+    """Files of a bundled report, which cannot refer to anything under `media_dir`.
+
+    In a zip (`archive`), images and the originals they link to are stored
+    under `media/` with names derived from a content hash, so the same photo
+    captured twice (e.g. as a message and as the media of a reply to it) is
+    stored once. A gzip bundle holds only the HTML: images are inlined and
+    links to originals are dropped.
+    """
+
+    def __init__(self, archive: bool = True) -> None:
+        self.archive = archive
+        self.files: dict[str, Path] = {}
+        self._names: dict[tuple[str, int, int], str] = {}
+
+    def add(self, image: "_OpenImage", path: Path) -> str:
+        with image.fh:
+            name = self._names.get(image.key)
+            if name is not None:
+                return name
+            digest = hashlib.sha256()
+            while chunk := image.fh.read(_BASE64_CHUNK):
+                digest.update(chunk)
+        suffix = path.suffix.lower() or mimetypes.guess_extension(image.mime) or ""
+        name = f"media/{digest.hexdigest()[:24]}{suffix}"
+        self._names[image.key] = name
+        self.files.setdefault(name, path)
+        return name
+
+    def link(self, path: Path) -> str | None:
+        """Name under which the file at `path` is stored, or None if it cannot be."""
+        if not self.archive:
+            return None
+        try:
+            fh = path.open("rb")
+            stat = os.fstat(fh.fileno())
+        except OSError:
+            return None
+        mime = _guess_mime(path) or "application/octet-stream"
+        return self.add(_OpenImage(fh, mime, stat.st_size, (str(path), stat.st_mtime_ns, stat.st_size)), path)
+
+    def files_for(self, views: Iterable[_MessageView]) -> dict[str, Path]:
+        """The subset of files referenced by `views`."""
+        files: dict[str, Path] = {}
+        for view in views:
+            items = view.media + (view.reply.media if view.reply else [])
+            for item in items:
+                for name in (item.src, item.href):
+                    if name in self.files:
+                        files[name] = self.files[name]
+        return files
 
 
 def _format_timestamp(dt: datetime, tz: timezone) -> str:
@@ -172,28 +446,107 @@ def _offset_label(offset: timedelta | None) -> str:
     return f"UTC{sign}{hours:02d}:{minutes:02d}"
 
 
-def _media_to_data_uri(path: Path, mime_type: str | None) -> str | None:
-    try:
-        data = path.read_bytes()
-    except OSError:
-        return None
+# Read images in multiples of 3 bytes so each base64 chunk stands alone.
+_BASE64_CHUNK = 3 * 16 * 1024
+
+
+@dataclass
+class _OpenImage:
+    fh: BinaryIO
+    mime: str
+    size: int
+    key: tuple[str, int, int]
+
+
+def _open_image(path: Path, mime_type: str | None) -> _OpenImage | None:
+    """Open `path` for inlining, or return None if it is not a readable image."""
     mime = mime_type or _guess_mime(path)
     if not mime or not mime.startswith("image/"):
         return None
-    encoded = b64encode(data).decode("ascii")
-    return f"data:{mime};base64,{encoded}"
+    try:
+        fh = path.open("rb")
+        stat = os.fstat(fh.fileno())
+    except OSError:
+        return None
+    return _OpenImage(fh, mime, stat.st_size, (str(path), stat.st_mtime_ns, stat.st_size))
+
+
+@dataclass
+class _InlineImage:
+    """An image's data URI, encoded (or served from the cache) each time it is iterated."""
+
+    path: Path
+    mime: str
+
+    def __iter__(self) -> Iterator[str]:
+        image = _open_image(self.path, self.mime)
+        if image is None:
+            return iter(())
+        return ENCODING_CACHE.data_uri(image)
+
+
+class EncodingCache:
+    """LRU of encoded data URIs, bounded by their total size in bytes.
+
+    Keyed by path, mtime and size, so the same photo in a summary, its topic
+    reports and a later `/export` is encoded once. Images too large to share
+    the budget with others are streamed from disk instead.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024) -> None:
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._size = 0
+        # Base64 never needs HTML escaping; as Markup, templates skip rescanning it.
+        self._entries: OrderedDict[tuple[str, int, int], Markup] = OrderedDict()
+
+    def resize(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self._evict()
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._size = 0
+        self.hits = self.misses = 0
+
+    def data_uri(self, image: _OpenImage) -> Iterator[str]:
+        with image.fh:
+            cached = self._entries.get(image.key)
+            if cached is not None:
+                self.hits += 1
+                self._entries.move_to_end(image.key)
+                yield cached
+                return
+            self.misses += 1
+            prefix = f"data:{image.mime};base64,"
+            encoded_size = len(prefix) + (image.size + 2) // 3 * 4
+            if encoded_size > self.max_bytes // 4:
+                yield prefix
+                while chunk := image.fh.read(_BASE64_CHUNK):
+                    yield Markup(b64encode(chunk).decode("ascii"))
+                return
+            uri = Markup(prefix + b64encode(image.fh.read()).decode("ascii"))
+            self._entries[image.key] = uri
+            self._size += len(uri)
+            self._evict()
+            yield uri
+
+    def _evict(self) -> None:
+        while self._size > self.max_bytes and self._entries:
+            _key, uri = self._entries.popitem(last=False)
+            self._size -= len(uri)
+
+
+ENCODING_CACHE = EncodingCache()
 
 
 def _guess_mime(path: Path) -> str | None:
-    try:
-        import mimetypes
-    except ImportError:  # pragma: no cover - stdlib always available
-        return None
     mime, _ = mimetypes.guess_type(str(path))
     return mime
 
 
-def _group_by_user(messages: Sequence[DbMessage]) -> dict[int, list[DbMessage]]:
+def _group_by_user(messages: Iterable[DbMessage]) -> dict[int, list[DbMessage]]:
     grouped: dict[int, list[DbMessage]] = defaultdict(list)
     for msg in messages:
         grouped[msg.sender_id].append(msg)
@@ -3,16 +3,19 @@
 from __future__ import annotations
 
 import asyncio
+import functools
 import logging
+import re
 import shutil
+import time
 import traceback
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta, timezone
 from html import escape
 from pathlib import Path
-from typing import Awaitable, Callable, Sequence, TypeVar
+from typing import Awaitable, Callable, Collection, Mapping, Sequence, TypeVar
 
-from telethon import TelegramClient, events, errors
+from telethon import TelegramClient, events, errors, functions
 from telethon.tl.custom import message as custom_message
 
 from .config import (
@@ -21,25 +24,51 @@ from .config import (
     DEFAULT_TIME_FORMAT,
     TargetGroupConfig,
 )
+from .entities import EntityCache
 from .links import build_message_link
+from . import metrics
+from .metrics import MetricsServer
 from .notifications import send_bark_notification
-from .reporting import generate_report
+from .ratelimit import AccountRateLimiter
+from . import profiling
+from .recording import UpdateRecorder
+from .tracing import TRACER
+from .watchdog import StallWatchdog, task_context
+from .reporting import RenderPool, ReportSet, generate_report, generate_reports
+from .scheduler import Job, Scheduler
 from .storage import (
+    DbMedia,
     DbMessage,
+    OutboxEntry,
     StoredMedia,
     StoredMessage,
     clear_reply_snapshots,
     db_session,
+    enqueue_outbox,
+    fetch_pending_outbox,
     fetch_reply_snapshot_candidates,
     fetch_messages_between,
+    fetch_message_ids_since,
+    fetch_messages_by_id,
     fetch_recent_messages,
     fetch_summary_counts,
+    find_media_paths,
+    mark_media_downloaded,
+    mark_outbox_failed,
+    mark_outbox_sent,
     persist_message,
+    purge_outbox,
+    purge_uploaded_files,
 )
 from .timeutils import parse_since_spec, utc_now
+from .uploads import UploadCache
+from .workers import Shard, shard_config, shard_rates, worker_session_path
 
 logger = logging.getLogger(__name__)
 
+# Builds the client for a session file; the default constructs a TelegramClient.
+ClientFactory = Callable[[Config, Path], TelegramClient]
+
 
 @dataclass
 class ReplyCleanupStats:
@@ -58,6 +87,8 @@ def _role_label(role: str) -> str:
         return "primary account (A)"
     if role == "sender":
         return "sender account (B)"
+    if role.startswith("worker"):
+        return f"primary account (A) for {role}"
     return "account"
 
 
@@ -86,6 +117,26 @@ def _resolve_once_targets(config: Config, selector: str | None) -> tuple[TargetG
 
 async def _start_client(client: TelegramClient, role: str) -> None:
     await client.start(phone=lambda: _phone_prompt(role))
+    # Surface every FloodWait to the account rate limiter instead of letting
+    # Telethon sleep inside a single call while other tasks keep sending.
+    client.flood_sleep_threshold = 0
+
+
+async def login_worker_session(config: Config, session_file: Path, role: str) -> None:
+    """Log the primary account in again into `session_file` and disconnect."""
+    client = _build_client(config, session_file=session_file)
+    await _start_client(client, role)
+    await client.disconnect()
+
+
+async def _disconnect_client(client: TelegramClient) -> None:
+    limiter = getattr(client, _RATE_LIMITER_ATTR, None)
+    if isinstance(limiter, AccountRateLimiter):
+        limiter.log_summary()
+    cache = getattr(client, _UPLOAD_CACHE_ATTR, None)
+    if isinstance(cache, UploadCache):
+        cache.log_summary()
+    await client.disconnect()
 
 
 async def run_once(
@@ -97,51 +148,83 @@ async def run_once(
 ) -> list[Path]:
     """Fetch messages for a window, store them, and return report paths."""
     targets = _resolve_once_targets(config, target_selector)
+    parallelism = config.performance.max_parallel_targets
     client = _build_client(config)
     await _start_client(client, "primary")
     try:
+        windows = await _gather_limited(
+            parallelism,
+            [
+                (lambda target=target: _collect_window(client, config, target, since))
+                for target in targets
+            ],
+        )
         captures: list[tuple[StoredMessage, list[StoredMedia]]] = []
-        for target in targets:
-            captures.extend(await _collect_window(client, config, target, since))
+        for window in windows:
+            captures.extend(window)
+        until = utc_now()
+        stored_by_target: dict[str, list[DbMessage]] = {}
+        with db_session(config.storage.db_path) as conn:
+            for message, media in captures:
+                persist_message(conn, message, media)
+            for target in targets:
+                stored_by_target[target.name] = fetch_messages_between(
+                    conn,
+                    target.tracked_user_ids,
+                    since,
+                    until,
+                    chat_ids=[target.target_chat_id],
+                )
+        if any(target.defers_media for target in targets):
+            fetcher = _MediaFetcher(client, config)
+            for messages in stored_by_target.values():
+                await fetcher.ensure(messages)
     finally:
-        await client.disconnect()
-    until = utc_now()
+        await _disconnect_client(client)
     report_now = utc_now()
     once_report_dir = (
         config.reporting.reports_dir
         / report_now.strftime("%Y-%m-%d")
         / report_now.strftime("%H%M")
     )
-    stored_by_target: dict[str, list[DbMessage]] = {}
-    with db_session(config.storage.db_path) as conn:
-        for message, media in captures:
-            persist_message(conn, message, media)
-        for target in targets:
-            stored_by_target[target.name] = fetch_messages_between(
-                conn,
-                target.tracked_user_ids,
-                since,
-                until,
-                chat_ids=[target.target_chat_id],
-            )
-    report_paths: list[Path] = []
     # Keep per-target filenames when config contains multiple targets,
     # even for `once --target ...`, to avoid same-minute overwrites.
     multi_target_config = len(config.targets) > 1
-    for target in targets:
-        report_name = "index.html"
-        if multi_target_config:
-            report_name = f"index_{target.target_chat_id}.html"
-        report_path = generate_report(
-            stored_by_target.get(target.name, []),
-            config,
-            since,
-            until,
-            target=target,
-            report_dir=once_report_dir,
-            report_name=report_name,
+    render_pool = (
+        RenderPool(min(config.performance.report_workers, len(targets)))
+        if config.performance.report_workers and len(targets) > 1
+        else None
+    )
+    try:
+        rendered = await asyncio.gather(
+            *(
+                _render(
+                    render_pool,
+                    _render_reports,
+                    config,
+                    # Per-user topic reports are only needed when pushing.
+                    config.control_groups[target.control_group or ""] if push else None,
+                    target,
+                    stored_by_target.get(target.name, []),
+                    since,
+                    until,
+                    report_dir=once_report_dir,
+                    report_name=(
+                        f"index_{target.target_chat_id}.html"
+                        if multi_target_config
+                        else "index.html"
+                    ),
+                )
+                for target in targets
+            )
         )
-        report_paths.append(report_path)
+    finally:
+        if render_pool is not None:
+            render_pool.close()
+    report_paths = [reports.path for reports in rendered]
+    user_reports = {
+        target.name: reports.user_paths for target, reports in zip(targets, rendered)
+    }
     if push:
         sender_client = await _start_sender_client(config)
         send_client = sender_client
@@ -150,39 +233,41 @@ async def run_once(
             send_client = _build_client(config)
             await _start_client(send_client, "primary")
         try:
-                await _push_once_reports(
-                    send_client,
-                    config,
-                    targets,
-                    stored_by_target,
-                    since,
-                    until,
-                    report_paths,
+            await _push_once_reports(
+                send_client,
+                config,
+                targets,
+                stored_by_target,
+                since,
+                until,
+                report_paths,
                 bark_context=(f"(since {since_label})" if since_label else None),
+                user_reports=user_reports,
             )
         except Exception:
             if sender_active:
                 logger.warning("Sender account failed; retrying report push with primary account.")
-                await send_client.disconnect()
+                await _disconnect_client(send_client)
                 primary = _build_client(config)
-                await primary.start()
+                await _start_client(primary, "primary")
                 try:
-                        await _push_once_reports(
-                            primary,
-                            config,
-                            targets,
-                            stored_by_target,
-                            since,
-                            until,
-                            report_paths,
+                    await _push_once_reports(
+                        primary,
+                        config,
+                        targets,
+                        stored_by_target,
+                        since,
+                        until,
+                        report_paths,
                         bark_context=(f"(since {since_label})" if since_label else None),
+                        user_reports=user_reports,
                     )
                 finally:
-                    await primary.disconnect()
+                    await _disconnect_client(primary)
                 return report_paths
             raise
         finally:
-            await send_client.disconnect()
+            await _disconnect_client(send_client)
     return report_paths
 
 
@@ -232,7 +317,7 @@ async def run_reply_cleanup(
                         continue
                     to_clear.append((chat_id, message_id))
     finally:
-        await client.disconnect()
+        await _disconnect_client(client)
 
     stats.to_clear = len(to_clear)
     if not apply or not to_clear:
@@ -252,96 +337,212 @@ async def run_reply_cleanup(
     return stats
 
 
-async def run_daemon(config: Config) -> None:
-    _purge_old_reports(
-        config.reporting.reports_dir,
-        config.reporting.retention_days,
+async def run_daemon(
+    config: Config,
+    *,
+    shard: Shard | None = None,
+    client_factory: ClientFactory | None = None,
+    record: Path | None = None,
+    trace: Path | None = None,
+) -> None:
+    """Run watcher daemon.
+
+    With `shard`, only that shard's targets are watched; the primary shard also
+    serves the control chats and delivers the shared outbox. `client_factory`
+    replaces the Telethon client (e.g. with `fakes.FakeTelegramClient`),
+    `record` appends every incoming update to a replayable log, and `trace`
+    appends per-message lifecycle spans (see `tracing`).
+    """
+    shard = shard or Shard(0, 1)
+    local_config = shard_config(config, shard)
+    if shard.is_primary:
+        _purge_old_reports(
+            config.reporting.reports_dir,
+            config.reporting.retention_days,
+        )
+    client = _build_client(
+        config,
+        session_file=worker_session_path(config.telegram.session_file, shard),
+        factory=client_factory,
     )
-    """Run watcher daemon."""
-    client = _build_client(config)
+    if shard.count > 1:
+        setattr(
+            client,
+            _RATE_LIMITER_ATTR,
+            AccountRateLimiter(f"worker{shard.index}", rates=shard_rates(shard.count)),
+        )
     activity_tracker = _ActivityTracker()
-    await _start_client(client, "primary")
-    sender_client = await _start_sender_client(config)
+    await _start_client(client, "primary" if shard.count == 1 else f"worker {shard.index}")
+    sender_client = (
+        await _start_sender_client(config, factory=client_factory) if shard.is_primary else None
+    )
     send_client = sender_client or client
     fallback_client = client if sender_client else None
-    me = await client.get_me()
+    me = await _with_floodwait(client.get_me)
     self_user_id = int(me.id)
     logger.info("Logged in as %s", getattr(me, "username", self_user_id))
-
-    summary_loops: list[_SummaryLoop] = []
-    for target in config.targets:
-        control = config.control_groups[target.control_group or ""]
-        loop = _SummaryLoop(
-            config,
-            target,
-            control,
-            send_client,
-            activity_tracker,
-            fallback_client=fallback_client,
-        )
-        loop.start()
-        summary_loops.append(loop)
-
-    heartbeat_loop = _HeartbeatLoop(config, send_client, activity_tracker, fallback_client=fallback_client)
-    control_handler = _ControlHandler(
-        config,
+    control_chat_ids = list(config.control_by_chat_id.keys()) if shard.is_primary else []
+    await _prewarm_entities(
+        client, [target.target_chat_id for target in local_config.targets] + control_chat_ids
+    )
+    if sender_client is not None:
+        await _prewarm_entities(sender_client, control_chat_ids)
+
+    # The control handler answers for every target (the database is shared),
+    # so it gets the full config and a fetcher that can reach any target.
+    fetcher_config = config if shard.is_primary else local_config
+    media_fetcher = (
+        _MediaFetcher(client, fetcher_config)
+        if any(target.defers_media for target in fetcher_config.targets)
+        else None
+    )
+    outbox = _OutboxWorker(config, send_client, activity_tracker, fallback_client=fallback_client)
+    if shard.is_primary:
+        outbox.start()
+    render_pool = (
+        RenderPool(config.performance.report_workers)
+        if config.performance.report_workers
+        else None
+    )
+    scheduler = _build_scheduler(
+        local_config,
         client,
         send_client,
-        self_user_id,
         activity_tracker,
         fallback_client=fallback_client,
+        media_fetcher=media_fetcher,
+        outbox=outbox,
+        shard=shard,
+        render_pool=render_pool,
     )
-
-    for target in config.targets:
-        target_handler = _TargetHandler(config, client, target)
-        client.add_event_handler(
-            target_handler.handle,
-            events.NewMessage(chats=[target.target_chat_id]),
+    target_handlers = {
+        target.target_chat_id: _TargetHandler(local_config, client, target)
+        for target in local_config.targets
+    }
+    if shard.is_primary:
+        control_handler = _ControlHandler(
+            config,
+            client,
+            send_client,
+            self_user_id,
+            activity_tracker,
+            fallback_client=fallback_client,
+            media_fetcher=media_fetcher,
+            render_pool=render_pool,
+        )
+        dispatcher = _Dispatcher.for_config(config, target_handlers, control_handler)
+    else:
+        dispatcher = _Dispatcher(
+            {chat_id: (handler.handle,) for chat_id, handler in target_handlers.items()}
         )
+    handler: _EventHandler = dispatcher.dispatch
+    recorder = None
+    if record is not None:
+        recorder = UpdateRecorder(record, config, owner_id=self_user_id)
+        handler = recorder.wrap(handler)
+        logger.info("Recording updates to %s", record)
+    if trace is not None:
+        TRACER.open(trace)
+        logger.info("Tracing message lifecycle to %s", trace)
     client.add_event_handler(
-        control_handler.handle,
-        events.NewMessage(chats=list(config.control_by_chat_id.keys())),
+        handler,
+        events.NewMessage(chats=dispatcher.chat_ids),
     )
 
-    heartbeat_loop.start()
+    metrics_server = None
+    if config.metrics.enabled:
+        # Each worker serves its own metrics on consecutive ports.
+        metrics_server = MetricsServer(config.metrics.host, config.metrics.port + shard.index)
+        await metrics_server.start()
+
+    watchdog = None
+    if config.performance.stall_threshold_ms:
+        watchdog = StallWatchdog(config.performance.stall_threshold_ms / 1000)
+        watchdog.start()
+
+    scheduler.start()
     try:
         await client.run_until_disconnected()
     except Exception as exc:
         await _send_error_notification(send_client, config, exc, fallback_client=fallback_client)
         raise
     finally:
-        await heartbeat_loop.stop()
-        for loop in summary_loops:
-            await loop.stop()
+        if recorder is not None:
+            recorder.close()
+            logger.info("Recorded %s update(s) to %s", recorder.count, record)
+        await scheduler.stop()
+        await outbox.stop()
+        if render_pool is not None:
+            await asyncio.to_thread(render_pool.close)
+        if trace is not None:
+            TRACER.close()
+            logger.info("Traced %s span(s) to %s", TRACER.count, trace)
+        if metrics_server is not None:
+            await metrics_server.stop()
+        if watchdog is not None:
+            await watchdog.stop()
         if sender_client:
-            await sender_client.disconnect()
-        await client.disconnect()
+            await _disconnect_client(sender_client)
+        await _disconnect_client(client)
 
 
-def _build_client(config: Config) -> TelegramClient:
-    session_path = config.telegram.session_file
+def _build_client(
+    config: Config,
+    *,
+    session_file: Path | None = None,
+    factory: ClientFactory | None = None,
+) -> TelegramClient:
+    session_path = session_file or config.telegram.session_file
     session_path.parent.mkdir(parents=True, exist_ok=True)
-    return TelegramClient(
-        str(session_path),
-        config.telegram.api_id,
-        config.telegram.api_hash,
-    )
+    if factory is not None:
+        client = factory(config, session_path)
+    else:
+        client = TelegramClient(
+            str(session_path),
+            config.telegram.api_id,
+            config.telegram.api_hash,
+        )
+    _attach_caches(client, config)
+    return client
 
 
-def _build_sender_client(config: Config) -> TelegramClient | None:
+def _build_sender_client(
+    config: Config,
+    *,
+    factory: ClientFactory | None = None,
+) -> TelegramClient | None:
     if config.sender is None:
         return None
-    session_path = config.sender.session_file
-    session_path.parent.mkdir(parents=True, exist_ok=True)
-    return TelegramClient(
-        str(session_path),
-        config.telegram.api_id,
-        config.telegram.api_hash,
+    return _build_client(config, session_file=config.sender.session_file, factory=factory)
+
+
+def _attach_caches(client: TelegramClient, config: Config) -> None:
+    setattr(
+        client,
+        _UPLOAD_CACHE_ATTR,
+        UploadCache(config.storage.db_path, media_dir=config.storage.media_dir),
     )
+    entity_cache = _ENTITY_CACHES.get(config.storage.db_path)
+    if entity_cache is None:
+        entity_cache = _ENTITY_CACHES[config.storage.db_path] = EntityCache(config.storage.db_path)
+    setattr(client, _ENTITY_CACHE_ATTR, entity_cache)
+
+
+async def _prewarm_entities(client: TelegramClient, chat_ids: Sequence[int]) -> None:
+    """Resolve chats up front so steady-state sends need no resolution RPCs."""
+    for chat_id in chat_ids:
+        try:
+            await _resolve_entity(client, chat_id)
+        except (errors.RPCError, ValueError) as exc:
+            logger.warning("Could not resolve chat %s: %s", chat_id, exc)
 
 
-async def _start_sender_client(config: Config) -> TelegramClient | None:
-    sender = _build_sender_client(config)
+async def _start_sender_client(
+    config: Config,
+    *,
+    factory: ClientFactory | None = None,
+) -> TelegramClient | None:
+    sender = _build_sender_client(config, factory=factory)
     if sender is None:
         return None
     try:
@@ -356,26 +557,58 @@ async def _start_sender_client(config: Config) -> TelegramClient | None:
     return sender
 
 
+_HISTORY_CHUNK = 100
+
+
 async def _collect_window(
     client: TelegramClient,
     config: Config,
     target: TargetGroupConfig,
     since: datetime,
+    *,
+    known_ids: set[int] | None = None,
 ) -> list[tuple[StoredMessage, list[StoredMedia]]]:
     tracked = set(target.tracked_user_ids)
     captures: list[tuple[StoredMessage, list[StoredMedia]]] = []
-    async for msg in client.iter_messages(target.target_chat_id):
-        if msg.date is None:
-            continue
-        msg_dt = _ensure_tz(msg.date)
-        if msg_dt < since:
-            break
-        sender_id = getattr(msg, "sender_id", None)
-        if sender_id is None or int(sender_id) not in tracked:
-            continue
-        capture = await _capture_message(client, config, msg, chat_id_default=target.target_chat_id)
-        if capture:
-            captures.append(capture)
+    limiter = _rate_limiter(client)
+    offset_id = 0
+    done = False
+    while not done:
+        done = True
+        seen = 0
+        try:
+            async for msg in client.iter_messages(target.target_chat_id, offset_id=offset_id):
+                # iter_messages pulls history in chunks of 100; charge one
+                # get_messages token per chunk.
+                if limiter is not None and seen % _HISTORY_CHUNK == 0:
+                    await limiter.acquire("get_messages")
+                seen += 1
+                offset_id = int(msg.id)
+                if msg.date is None:
+                    continue
+                msg_dt = _ensure_tz(msg.date)
+                if msg_dt < since:
+                    break
+                sender_id = getattr(msg, "sender_id", None)
+                if sender_id is None or int(sender_id) not in tracked:
+                    continue
+                if known_ids and int(msg.id) in known_ids:
+                    continue
+                capture = await _capture_message(
+                    client, config, msg, chat_id_default=target.target_chat_id
+                )
+                if capture:
+                    captures.append(capture)
+        except errors.FloodWaitError as exc:
+            wait_for = exc.seconds + 1
+            logger.warning("FloodWait while reading history: pausing account for %ss", wait_for)
+            metrics.FLOOD_WAIT_SECONDS.inc(wait_for, method="get_messages")
+            if limiter is None:
+                await asyncio.sleep(wait_for)
+            else:
+                limiter.record_flood_wait("get_messages", wait_for)
+            # Resume below the last message already handled.
+            done = False
     captures.reverse()
     return captures
 
@@ -392,12 +625,17 @@ async def _capture_message(
         return None
     chat_id = int(getattr(message, "chat_id", chat_id_default or 0))
     msg_dt = _ensure_tz(message.date)
-    reply_info = await _get_reply_snapshot(
-        client, config.storage.media_dir, message, chat_id
-    )
-    media_items = await _download_media(
-        client, config.storage.media_dir, message, chat_id
-    )
+    target = config.target_for_chat(chat_id)
+    deferred = bool(target and target.defers_media)
+    with TRACER.bind(chat_id, int(message.id)), TRACER.span("capture"):
+        with TRACER.span("reply_snapshot"):
+            reply_info = await _get_reply_snapshot(
+                client, config.storage.media_dir, message, chat_id, deferred=deferred
+            )
+        with TRACER.span("download_media"):
+            media_items = await _download_media(
+                client, config.storage.media_dir, message, chat_id, deferred=deferred
+            )
     if reply_info and reply_info.media:
         base_index = len(media_items)
         for offset, media in enumerate(reply_info.media, start=base_index):
@@ -446,6 +684,8 @@ async def _get_reply_snapshot(
     media_dir: Path,
     message: custom_message.Message,
     chat_id: int,
+    *,
+    deferred: bool = False,
 ) -> ReplySnapshot | None:
     if not _is_explicit_reply(message):
         return None
@@ -467,6 +707,7 @@ async def _get_reply_snapshot(
         base_name=f"{message.id}_reply_{reply.id}",
         is_reply=True,
         owner_message_id=int(message.id),
+        deferred=deferred,
     )
     return ReplySnapshot(
         sender_id=getattr(reply, "sender_id", None),
@@ -485,12 +726,31 @@ async def _download_media(
     base_name: str | None = None,
     is_reply: bool = False,
     owner_message_id: int | None = None,
+    deferred: bool = False,
 ) -> list[StoredMedia]:
     if not message.media:
         return []
+    metadata = _media_metadata(message)
     target_dir = media_dir / str(chat_id)
-    target_dir.mkdir(parents=True, exist_ok=True)
     file_stub = base_name or f"{message.id}"
+    if deferred:
+        if message.file is None:
+            return []
+        metadata["thumb_path"] = await _download_thumbnail(
+            client, message, target_dir, file_stub
+        )
+        return [
+            StoredMedia(
+                chat_id=chat_id,
+                message_id=owner_message_id or int(message.id),
+                file_path="",
+                media_index=0,
+                is_reply=is_reply,
+                **metadata,
+            )
+        ]
+    target_dir.mkdir(parents=True, exist_ok=True)
+    metadata["thumb_path"] = await _download_thumbnail(client, message, target_dir, file_stub)
     downloaded_path = await _with_floodwait(
         client.download_media,
         message,
@@ -500,28 +760,294 @@ async def _download_media(
         return []
     path = Path(downloaded_path).resolve()
     stat = path.stat()
-    mime = None
-    if message.file:
-        mime = getattr(message.file, "mime_type", None)
+    metadata["file_size"] = stat.st_size
+    metrics.MEDIA_BYTES.inc(stat.st_size)
     return [
         StoredMedia(
             chat_id=chat_id,
             message_id=owner_message_id or int(message.id),
             file_path=str(path),
-            mime_type=mime,
-            file_size=stat.st_size,
             media_index=0,
             is_reply=is_reply,
+            **metadata,
         )
     ]
 
 
+_MEDIA_KINDS = ("photo", "video", "gif", "voice", "audio", "sticker", "document")
+
+
+def _media_metadata(message: custom_message.Message) -> dict[str, object]:
+    """Describe a message's media without downloading it."""
+    file = getattr(message, "file", None)
+    kind = next((name for name in _MEDIA_KINDS if getattr(message, name, None)), None)
+    source = getattr(message, "photo", None) or getattr(message, "document", None)
+    return {
+        "mime_type": getattr(file, "mime_type", None) if file else None,
+        "file_size": getattr(file, "size", None) if file else None,
+        "width": getattr(file, "width", None) if file else None,
+        "height": getattr(file, "height", None) if file else None,
+        "source_message_id": int(message.id),
+        "media_kind": kind,
+        "telegram_media_id": getattr(source, "id", None),
+    }
+
+
+_THUMB_MIN_EDGE = 320
+
+
+def _pick_thumbnail(message: custom_message.Message) -> object | None:
+    """Return the smallest Telegram thumb whose longer edge covers `_THUMB_MIN_EDGE`.
+
+    Stripped/path sizes carry no dimensions and are skipped. For photos, the
+    largest size is the original itself, so picking it would save nothing.
+    """
+    photo = getattr(message, "photo", None)
+    document = getattr(message, "document", None)
+    if photo is not None:
+        sizes = getattr(photo, "sizes", None) or []
+    elif document is not None:
+        sizes = getattr(document, "thumbs", None) or []
+    else:
+        return None
+    candidates: list[tuple[int, object]] = []
+    for size in sizes:
+        width = getattr(size, "w", None)
+        height = getattr(size, "h", None)
+        if not width or not height:
+            continue
+        candidates.append((max(int(width), int(height)), size))
+    if not candidates:
+        return None
+    candidates.sort(key=lambda item: item[0])
+    chosen = next(
+        (size for edge, size in candidates if edge >= _THUMB_MIN_EDGE),
+        candidates[-1][1],
+    )
+    if photo is not None and chosen is candidates[-1][1]:
+        return None
+    return chosen
+
+
+async def _download_thumbnail(
+    client: TelegramClient,
+    message: custom_message.Message,
+    target_dir: Path,
+    file_stub: str,
+) -> str | None:
+    thumb = _pick_thumbnail(message)
+    if thumb is None:
+        return None
+    target_dir.mkdir(parents=True, exist_ok=True)
+    try:
+        downloaded = await _with_floodwait(
+            client.download_media,
+            message,
+            file=target_dir / f"{file_stub}_thumb",
+            thumb=thumb,
+        )
+    except errors.RPCError as exc:
+        logger.warning("Failed to fetch thumbnail for message %s: %s", message.id, exc)
+        return None
+    if not downloaded:
+        return None
+    path = Path(downloaded).resolve()
+    metrics.MEDIA_BYTES.inc(path.stat().st_size)
+    return str(path)
+
+
+class _MediaFetcher:
+    """Download deferred media the first time a report or push needs it.
+
+    Downloads go through a small bounded queue; concurrent requests for the
+    same item share one download, and Telegram media already downloaded for
+    another message (looked up in the database, so across restarts and `once`)
+    reuses the file on disk.
+    """
+
+    def __init__(
+        self,
+        client: TelegramClient,
+        config: Config,
+        *,
+        max_concurrent: int = 2,
+    ) -> None:
+        self.client = client
+        self.config = config
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._inflight: dict[tuple[int, int, int], asyncio.Future[str | None]] = {}
+
+    def autofetch_limit(self) -> int:
+        return self.config.performance.deferred_autofetch_max_mb * 1024 * 1024
+
+    async def ensure(
+        self,
+        messages: Sequence[DbMessage],
+        *,
+        force: bool = False,
+    ) -> int:
+        """Fetch pending media and return how many items were downloaded.
+
+        Without `force`, items larger than the autofetch limit stay deferred
+        until someone asks for them explicitly (`/media`).
+        """
+        limit = self.autofetch_limit()
+        pending: dict[int, list[tuple[DbMessage, DbMedia]]] = {}
+        for message in messages:
+            for media in message.media:
+                if not media.is_deferred:
+                    continue
+                if not force and (media.file_size or 0) > limit:
+                    continue
+                pending.setdefault(message.chat_id, []).append((message, media))
+        fetched = 0
+        for chat_id, items in pending.items():
+            fetched += await self._fetch_chat(chat_id, items)
+        return fetched
+
+    async def _fetch_chat(
+        self,
+        chat_id: int,
+        items: list[tuple[DbMessage, DbMedia]],
+    ) -> int:
+        source_ids = sorted(
+            {media.source_message_id or message.message_id for message, media in items}
+        )
+        sources: dict[int, custom_message.Message] = {}
+        for start in range(0, len(source_ids), 100):
+            batch = source_ids[start : start + 100]
+            found = await _with_floodwait(self.client.get_messages, chat_id, ids=batch)
+            for msg in found or []:
+                if msg is not None:
+                    sources[int(msg.id)] = msg
+        results = await asyncio.gather(
+            *(self._fetch_one(chat_id, message, media, sources) for message, media in items)
+        )
+        return sum(1 for path in results if path)
+
+    async def _fetch_one(
+        self,
+        chat_id: int,
+        message: DbMessage,
+        media: DbMedia,
+        sources: dict[int, custom_message.Message],
+    ) -> str | None:
+        key = (chat_id, message.message_id, media.media_index)
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._download(chat_id, message, media, sources))
+            self._inflight[key] = future
+            future.add_done_callback(lambda _f, key=key: self._inflight.pop(key, None))
+        path = await asyncio.shield(future)
+        if path:
+            media.file_path = path
+        return path
+
+    async def _download(
+        self,
+        chat_id: int,
+        message: DbMessage,
+        media: DbMedia,
+        sources: dict[int, custom_message.Message],
+    ) -> str | None:
+        path = self._cached_path(media.telegram_media_id)
+        if path is None:
+            source_id = media.source_message_id or message.message_id
+            source = sources.get(source_id)
+            if source is None or not source.media:
+                logger.warning(
+                    "Deferred media source %s in chat %s is no longer available.",
+                    source_id,
+                    chat_id,
+                )
+                return None
+            base_name = (
+                f"{message.message_id}_reply_{source_id}"
+                if media.is_reply
+                else f"{message.message_id}"
+            )
+            target_dir = self.config.storage.media_dir / str(chat_id)
+            target_dir.mkdir(parents=True, exist_ok=True)
+            async with self._semaphore:
+                downloaded = await _with_floodwait(
+                    self.client.download_media,
+                    source,
+                    file=target_dir / base_name,
+                )
+            if not downloaded:
+                return None
+            path = str(Path(downloaded).resolve())
+        file_size = Path(path).stat().st_size
+        with db_session(self.config.storage.db_path) as conn:
+            mark_media_downloaded(
+                conn,
+                chat_id,
+                message.message_id,
+                media.media_index,
+                path,
+                file_size,
+            )
+        media.file_size = file_size
+        return path
+
+    def _cached_path(self, media_id: int | None) -> str | None:
+        if media_id is None:
+            return None
+        with db_session(self.config.storage.db_path) as conn:
+            paths = find_media_paths(conn, media_id)
+        return next((path for path in paths if Path(path).exists()), None)
+
+
 def _ensure_tz(dt: datetime) -> datetime:
     if dt.tzinfo:
         return dt.astimezone(timezone.utc)
     return dt.replace(tzinfo=timezone.utc)
 
 
+_EventHandler = Callable[[events.NewMessage.Event], Awaitable[None]]
+
+
+class _Dispatcher:
+    """One NewMessage handler for every watched chat, routed by chat id.
+
+    Registering a handler per target makes Telethon run every handler's chat
+    filter on each update; a single handler with a dict lookup keeps routing
+    cost constant however many targets are configured.
+    """
+
+    def __init__(self, routes: dict[int, tuple[_EventHandler, ...]]) -> None:
+        self._routes = routes
+
+    @classmethod
+    def for_config(
+        cls,
+        config: Config,
+        target_handlers: dict[int, "_TargetHandler"],
+        control_handler: "_ControlHandler",
+    ) -> "_Dispatcher":
+        routes: dict[int, tuple[_EventHandler, ...]] = {
+            chat_id: (handler.handle,) for chat_id, handler in target_handlers.items()
+        }
+        for chat_id in config.control_by_chat_id:
+            routes[chat_id] = routes.get(chat_id, ()) + (control_handler.handle,)
+        return cls(routes)
+
+    @property
+    def chat_ids(self) -> list[int]:
+        return list(self._routes)
+
+    async def dispatch(self, event: events.NewMessage.Event) -> None:
+        chat_id = getattr(event, "chat_id", None)
+        if chat_id is None:
+            return
+        metrics.UPDATES_RECEIVED.inc(chat_id=chat_id)
+        message_id = getattr(getattr(event, "message", None), "id", "?")
+        label = f"update chat {chat_id} message {message_id}"
+        with task_context(label):
+            for handler in self._routes.get(int(chat_id), ()):
+                await handler(event)
+
+
 class _TargetHandler:
     def __init__(self, config: Config, client: TelegramClient, target: TargetGroupConfig):
         self.config = config
@@ -533,7 +1059,9 @@ class _TargetHandler:
         msg = event.message
         sender_id = getattr(msg, "sender_id", None)
         if sender_id is None or int(sender_id) not in self._tracked:
+            metrics.UPDATES_FILTERED.inc(target=self.target.name)
             return
+        started = time.perf_counter()
         capture = await _capture_message(
             self.client,
             self.config,
@@ -543,8 +1071,12 @@ class _TargetHandler:
         if not capture:
             return
         message, media = capture
-        with db_session(self.config.storage.db_path) as conn:
-            persist_message(conn, message, media)
+        with metrics.DB_COMMIT_SECONDS.time(), TRACER.span(
+            "persist", [(message.chat_id, message.message_id)]
+        ):
+            with db_session(self.config.storage.db_path) as conn:
+                persist_message(conn, message, media)
+        metrics.CAPTURE_SECONDS.observe(time.perf_counter() - started, target=self.target.name)
         logger.info(
             "Captured message %s from %s",
             message.message_id,
@@ -562,6 +1094,8 @@ class _ControlHandler:
         tracker: "_ActivityTracker",
         *,
         fallback_client: TelegramClient | None = None,
+        media_fetcher: _MediaFetcher | None = None,
+        render_pool: RenderPool | None = None,
     ):
         self.config = config
         self.client = client
@@ -569,6 +1103,9 @@ class _ControlHandler:
         self.owner_id = owner_id
         self._tracker = tracker
         self._fallback_client = fallback_client
+        self._media_fetcher = media_fetcher
+        self._render_pool = render_pool
+        self._profile_timer: asyncio.Task | None = None
 
     async def handle(self, event: events.NewMessage.Event) -> None:
         if int(getattr(event.message, "sender_id", 0)) != self.owner_id:
@@ -603,6 +1140,12 @@ class _ControlHandler:
         if command == "/export":
             await self._cmd_export(event, parts[1:], control, targets)
             return
+        if command == "/media":
+            await self._cmd_media(event, parts[1:], control, targets)
+            return
+        if command == "/profile":
+            await self._cmd_profile(event, parts[1:])
+            return
         await _reply(event, "Unknown command. Use /help", client=self.send_client, fallback_client=self._fallback_client)
 
     async def _cmd_last(
@@ -621,12 +1164,13 @@ class _ControlHandler:
             )
             return
         try:
-            user_id = await self._resolve_user(args[0])
+            user_id = await self._resolve_user(
+                args[0], self.config.tracked_ids_for_control(control.key)
+            )
         except ValueError as exc:
             await _reply(event, f"Cannot resolve user: {exc}", client=self.send_client, fallback_client=self._fallback_client)
             return
-        tracked_ids = _tracked_ids_for_targets(targets)
-        if user_id not in tracked_ids:
+        if user_id not in self.config.tracked_ids_for_control(control.key):
             await _reply(
                 event,
                 f"User {user_id} not in tracked list for this control group.",
@@ -648,7 +1192,7 @@ class _ControlHandler:
         if not messages:
             await _reply(event, "No messages stored yet.", client=self.send_client, fallback_client=self._fallback_client)
             return
-        target = _target_for_user(targets, user_id)
+        target = self.config.target_for_user(user_id, control_key=control.key)
         label = self.config.describe_user(user_id, target=target)
         lines = [f"Last {len(messages)} messages for {label}:"]
         for msg in messages:
@@ -674,7 +1218,7 @@ class _ControlHandler:
         with db_session(self.config.storage.db_path) as conn:
             counts = fetch_summary_counts(
                 conn,
-                _tracked_ids_for_targets(targets),
+                self.config.tracked_ids_for_control(control.key),
                 since,
                 chat_ids=chat_ids,
             )
@@ -684,7 +1228,7 @@ class _ControlHandler:
         target_names = ", ".join(target.name for target in targets)
         lines = [f"Summary since {since.isoformat()} (targets: {target_names})"]
         for user_id in sorted(counts):
-            target = _target_for_user(targets, user_id)
+            target = self.config.target_for_user(user_id, control_key=control.key)
             label = self.config.describe_user(user_id, target=target)
             lines.append(f"- {label}: {counts[user_id]} message(s)")
         await _reply(event, "\n".join(lines), client=self.send_client, fallback_client=self._fallback_client)
@@ -706,39 +1250,158 @@ class _ControlHandler:
             return
         until = utc_now()
         with db_session(self.config.storage.db_path) as conn:
-            for target in targets:
-                messages = fetch_messages_between(
+            batches = [
+                fetch_messages_between(
                     conn,
                     target.tracked_user_ids,
                     since,
                     until,
                     chat_ids=[target.target_chat_id],
                 )
-                report = generate_report(messages, self.config, since, until, target=target)
-                await _send_report_bundle(
-                    self.send_client,
+                for target in targets
+            ]
+        if self._media_fetcher is not None:
+            for target, messages in zip(targets, batches):
+                if target.defers_media:
+                    await self._media_fetcher.ensure(messages)
+        # With a render pool, every target's report renders at once.
+        rendered = await asyncio.gather(
+            *(
+                _render(
+                    self._render_pool,
+                    _render_reports,
                     self.config,
                     control,
                     target,
                     messages,
                     since,
                     until,
-                    report,
-                    tracker=self._tracker,
-                    fallback_client=self._fallback_client,
+                    report_name=f"index_{target.target_chat_id}.html",
                 )
+                for target, messages in zip(targets, batches)
+            )
+        )
+        for target, messages, reports in zip(targets, batches, rendered):
+            await _send_report_bundle(
+                self.send_client,
+                self.config,
+                control,
+                target,
+                messages,
+                since,
+                until,
+                reports.path,
+                tracker=self._tracker,
+                fallback_client=self._fallback_client,
+                user_reports=reports.user_paths,
+            )
+
+    async def _cmd_media(
+        self,
+        event: events.NewMessage.Event,
+        args: Sequence[str],
+        control: ControlGroupConfig,
+        targets: Sequence[TargetGroupConfig],
+    ) -> None:
+        if not args or not args[0].isdigit():
+            await _reply(event, "Usage: /media <message_id>", client=self.send_client, fallback_client=self._fallback_client)
+            return
+        message_id = int(args[0])
+        chat_ids = [target.target_chat_id for target in targets]
+        with db_session(self.config.storage.db_path) as conn:
+            messages = fetch_messages_by_id(conn, message_id, chat_ids=chat_ids)
+        messages = [message for message in messages if message.media]
+        if not messages:
+            await _reply(event, "No stored media for that message.", client=self.send_client, fallback_client=self._fallback_client)
+            return
+        if self._media_fetcher is not None:
+            await self._media_fetcher.ensure(messages, force=True)
+        for message in messages:
+            target = self.config.target_for_chat(message.chat_id)
+            if target is None:
+                continue
+            await _send_media_for_message(
+                self.send_client,
+                control.control_chat_id,
+                message,
+                self.config,
+                target,
+                reply_to=_topic_reply_id_for_message(control, target.target_chat_id, message),
+                fallback_client=self._fallback_client,
+            )
+
+    async def _cmd_profile(self, event: events.NewMessage.Event, args: Sequence[str]) -> None:
+        reply = functools.partial(
+            _reply, event, client=self.send_client, fallback_client=self._fallback_client
+        )
+        if not args:
+            active = profiling.active_profile()
+            if active is None:
+                await reply("No profile running. Usage: /profile <cpu|memory> [minutes] | stop")
+            else:
+                await reply(f"{active.mode} profile running; dumps go to {active.output_dir}")
+            return
+        if args[0] == "stop":
+            if self._profile_timer is not None:
+                self._profile_timer.cancel()
+                self._profile_timer = None
+            await reply(await _stop_profile_summary())
+            return
+        if args[0] not in profiling.PROFILE_MODES or (len(args) > 1 and not args[1].isdigit()):
+            await reply("Usage: /profile <cpu|memory> [minutes] | stop")
+            return
+        try:
+            profiler = profiling.start_profile(args[0], profiling.profile_dir(self.config))
+        except RuntimeError as exc:
+            await reply(f"{exc}; send /profile stop first.")
+            return
+        message = f"Started {profiler.mode} profile; dumps go to {profiler.output_dir}"
+        if len(args) > 1:
+            minutes = max(1, int(args[1]))
+            self._profile_timer = asyncio.create_task(self._stop_profile_after(event, minutes))
+            message += f" (stops after {minutes} min)"
+        await reply(message)
+
+    async def _stop_profile_after(self, event: events.NewMessage.Event, minutes: int) -> None:
+        await asyncio.sleep(minutes * 60)
+        self._profile_timer = None
+        await _reply(
+            event,
+            await _stop_profile_summary(),
+            client=self.send_client,
+            fallback_client=self._fallback_client,
+        )
 
-    async def _resolve_user(self, arg: str) -> int:
+    async def _resolve_user(self, arg: str, tracked: Collection[int] = ()) -> int:
+        """Resolve a user id or @username; a cached id outside `tracked` is looked up again."""
         arg = arg.strip()
         if arg.lstrip("-").isdigit():
             return int(arg)
+        cache = getattr(self.client, _ENTITY_CACHE_ATTR, None)
+        if isinstance(cache, EntityCache):
+            cached = cache.get_user_id(arg)
+            if cached is not None and (not tracked or cached in tracked):
+                return cached
+            if cached is not None:
+                # The username may have moved to another account since it was cached.
+                cache.forget_user_id(arg)
         entity = await _with_floodwait(self.client.get_entity, arg)
         user_id = getattr(entity, "id", None)
         if user_id is None:
             raise ValueError("Cannot resolve user")
+        if isinstance(cache, EntityCache):
+            cache.put_user_id(arg, int(user_id))
         return int(user_id)
 
 
+async def _stop_profile_summary() -> str:
+    # Writing the final dump can take a moment with a large tracemalloc snapshot.
+    paths = await asyncio.to_thread(profiling.stop_profile)
+    if not paths:
+        return "No profile running."
+    return "Profile written:\n" + "\n".join(str(path) for path in paths)
+
+
 def _format_message_line(msg: DbMessage) -> str:
     text = msg.text or "<no text>"
     text = text.replace("\n", " ")
@@ -747,33 +1410,18 @@ def _format_message_line(msg: DbMessage) -> str:
     return f"{msg.date.isoformat()} — {text}"
 
 
-def _tracked_ids_for_targets(targets: Sequence[TargetGroupConfig]) -> tuple[int, ...]:
-    tracked: list[int] = []
-    for target in targets:
-        tracked.extend(target.tracked_user_ids)
-    return tuple(sorted(set(tracked)))
-
-
-def _target_for_user(
-    targets: Sequence[TargetGroupConfig],
-    user_id: int,
-) -> TargetGroupConfig | None:
-    for target in targets:
-        if user_id in target.tracked_user_ids:
-            return target
-    return None
-
-
 _HELP_TEXT = (
     "Commands:\n"
     "/help - show this help\n"
     "/last <user_id|username> [N] - last N tracked messages\n"
     "/since <Nh|Nm|ISO> - summary counts from window\n"
-    "/export <Nh|Nm|ISO> - generate report for window"
+    "/export <Nh|Nm|ISO> - generate report for window\n"
+    "/media <message_id> - fetch and send media kept deferred\n"
+    "/profile <cpu|memory> [minutes] | stop - profile the running daemon"
 )
 
 
-class _SummaryLoop:
+class _SummaryJob:
     def __init__(
         self,
         config: Config,
@@ -783,53 +1431,21 @@ class _SummaryLoop:
         tracker: "_ActivityTracker",
         *,
         fallback_client: TelegramClient | None = None,
+        media_fetcher: _MediaFetcher | None = None,
+        outbox: "_OutboxWorker | None" = None,
+        render_pool: RenderPool | None = None,
     ):
         self.config = config
         self.target = target
         self.control = control
         self.client = client
-        self._stop = asyncio.Event()
-        self._task: asyncio.Task | None = None
-        self._last_summary = utc_now()
         self._tracker = tracker
         self._fallback_client = fallback_client
+        self._media_fetcher = media_fetcher
+        self._outbox = outbox
+        self._render_pool = render_pool
 
-    def start(self) -> None:
-        self._task = asyncio.create_task(self._run())
-
-    async def stop(self) -> None:
-        self._stop.set()
-        if self._task:
-            self._task.cancel()
-            try:
-                await self._task
-            except asyncio.CancelledError:
-                pass
-
-    async def _run(self) -> None:
-        interval = self.target.summary_interval_minutes * 60
-        while not self._stop.is_set():
-            try:
-                await asyncio.wait_for(self._stop.wait(), timeout=interval)
-            except asyncio.TimeoutError:
-                try:
-                    await self._send_summary()
-                except asyncio.CancelledError:
-                    raise
-                except Exception:
-                    logger.exception(
-                        "Summary send failed for target '%s' (chat_id=%s); "
-                        "will continue next interval.",
-                        self.target.name,
-                        self.target.target_chat_id,
-                    )
-            except asyncio.CancelledError:
-                break
-
-    async def _send_summary(self) -> None:
-        now = utc_now()
-        since = self._last_summary
-        self._last_summary = now
+    async def run(self, since: datetime, now: datetime) -> None:
         with db_session(self.config.storage.db_path) as conn:
             messages = fetch_messages_between(
                 conn,
@@ -841,18 +1457,22 @@ class _SummaryLoop:
         if not messages:
             logger.info("No tracked messages since last summary.")
             return
-        report = generate_report(
-            messages,
-            self.config,
-            since,
-            now,
-            target=self.target,
-            report_name=f"index_{self.target.target_chat_id}.html",
-        )
-        _purge_old_reports(
-            self.config.reporting.reports_dir,
-            self.config.reporting.retention_days,
-        )
+        if self._media_fetcher is not None and self.target.defers_media:
+            await self._media_fetcher.ensure(messages)
+        with metrics.SUMMARY_RENDER_SECONDS.time(target=self.target.name), TRACER.span(
+            "render", [(message.chat_id, message.message_id) for message in messages]
+        ):
+            reports = await _render(
+                self._render_pool,
+                _render_reports,
+                self.config,
+                self.control,
+                self.target,
+                messages,
+                since,
+                now,
+                report_name=f"index_{self.target.target_chat_id}.html",
+            )
         await _send_report_bundle(
             self.client,
             self.config,
@@ -861,15 +1481,17 @@ class _SummaryLoop:
             messages,
             since,
             now,
-            report,
+            reports.path,
             tracker=self._tracker,
             bark_context=f"({_format_interval_label(self.target.summary_interval_minutes)})",
             fallback_client=self._fallback_client,
+            outbox=self._outbox,
+            user_reports=reports.user_paths,
         )
 
 
-class _HeartbeatLoop:
-    _CHECK_INTERVAL = 300  # seconds
+class _HeartbeatJob:
+    CHECK_INTERVAL = 300  # seconds
     _IDLE_SECONDS = 2 * 60 * 60
 
     def __init__(
@@ -883,9 +1505,136 @@ class _HeartbeatLoop:
         self.config = config
         self.client = client
         self.tracker = tracker
+        self._fallback_client = fallback_client
+
+    async def run(self, _since: datetime, now: datetime) -> None:
+        if not self.tracker.should_send_heartbeat(now, self._IDLE_SECONDS):
+            return
+        try:
+            for control in self.config.control_groups.values():
+                await _send_message_with_fallback(
+                    self.client,
+                    self._fallback_client,
+                    control.control_chat_id,
+                    "Watcher is still running",
+                )
+            self.tracker.mark_heartbeat(now)
+            await send_bark_notification(
+                self.config.notifications,
+                "Watcher heartbeat",
+                "Watcher is still running",
+            )
+        except Exception as exc:  # pragma: no cover
+            logger.warning("Failed to send heartbeat: %s", exc)
+
+
+_BACKFILL_INTERVAL = timedelta(hours=1)
+_RETENTION_INTERVAL = timedelta(days=1)
+
+
+def _build_scheduler(
+    config: Config,
+    client: TelegramClient,
+    send_client: TelegramClient,
+    tracker: "_ActivityTracker",
+    *,
+    fallback_client: TelegramClient | None,
+    media_fetcher: _MediaFetcher | None,
+    outbox: "_OutboxWorker | None",
+    shard: Shard | None = None,
+    render_pool: RenderPool | None = None,
+) -> Scheduler:
+    shard = shard or Shard(0, 1)
+    stagger = timedelta(seconds=config.performance.summary_stagger_seconds)
+
+    async def _backfill(since: datetime, _until: datetime) -> None:
+        await _backfill_targets(client, config, since)
+
+    async def _retention(_since: datetime, now: datetime) -> None:
+        _purge_old_reports(config.reporting.reports_dir, config.reporting.retention_days)
+        cutoff = now - timedelta(days=config.reporting.retention_days)
+        with db_session(config.storage.db_path) as conn:
+            purge_outbox(conn, cutoff)
+            purge_uploaded_files(conn, cutoff)
+
+    heartbeat = _HeartbeatJob(config, send_client, tracker, fallback_client=fallback_client)
+    # Backfill runs first so a catch-up summary sees messages missed while offline.
+    # Every shard backfills its own targets, so each needs its own job row.
+    backfill_name = "backfill" if shard.count == 1 else f"backfill:{shard.index}"
+    jobs = [Job(backfill_name, _BACKFILL_INTERVAL, _backfill, priority=0)]
+    if shard.is_primary:
+        jobs += [
+            Job("retention", _RETENTION_INTERVAL, _retention, priority=2),
+            Job(
+                "heartbeat",
+                timedelta(seconds=_HeartbeatJob.CHECK_INTERVAL),
+                heartbeat.run,
+                align=False,
+                priority=2,
+            ),
+        ]
+    for index, target in enumerate(config.targets):
+        control = config.control_groups[target.control_group or ""]
+        summary = _SummaryJob(
+            config,
+            target,
+            control,
+            send_client,
+            tracker,
+            fallback_client=fallback_client,
+            media_fetcher=media_fetcher,
+            outbox=outbox,
+            render_pool=render_pool,
+        )
+        interval = timedelta(minutes=target.summary_interval_minutes)
+        offset = timedelta(seconds=(stagger * index).total_seconds() % interval.total_seconds())
+        jobs.append(Job(f"summary:{target.target_chat_id}", interval, summary.run, offset=offset))
+    return Scheduler(config.storage.db_path, jobs, timezone=config.reporting.timezone)
+
+
+async def _backfill_targets(client: TelegramClient, config: Config, since: datetime) -> None:
+    """Capture tracked messages posted since `since` that live updates missed."""
+    for target in config.targets:
+        with db_session(config.storage.db_path) as conn:
+            known = fetch_message_ids_since(conn, target.target_chat_id, since)
+        captures = await _collect_window(client, config, target, since, known_ids=known)
+        if not captures:
+            continue
+        with db_session(config.storage.db_path) as conn:
+            for message, media in captures:
+                persist_message(conn, message, media)
+        logger.info("Backfilled %s message(s) for %s", len(captures), target.name)
+
+
+class _OutboxWorker:
+    """Delivers queued control-chat output in order, retrying with backoff.
+
+    Summary loops persist their planned deliveries here and move on, so a
+    network drop, long FloodWait or crash delays delivery instead of losing the
+    rest of the window. Pending entries resume on the next start; an entry that
+    fails holds back later entries for the same control chat to keep order.
+    """
+
+    _POLL_SECONDS = 30.0
+    _MAX_ATTEMPTS = 8
+    _BASE_RETRY_SECONDS = 15
+    _MAX_RETRY_SECONDS = 3600
+
+    def __init__(
+        self,
+        config: Config,
+        client: TelegramClient,
+        tracker: "_ActivityTracker | None" = None,
+        *,
+        fallback_client: TelegramClient | None = None,
+    ):
+        self.config = config
+        self.client = client
+        self._tracker = tracker
+        self._fallback_client = fallback_client
+        self._wake = asyncio.Event()
         self._stop = asyncio.Event()
         self._task: asyncio.Task | None = None
-        self._fallback_client = fallback_client
 
     def start(self) -> None:
         self._task = asyncio.create_task(self._run())
@@ -899,37 +1648,174 @@ class _HeartbeatLoop:
             except asyncio.CancelledError:
                 pass
 
+    async def enqueue(
+        self,
+        control_chat_id: int,
+        steps: Sequence[_TextStep | _AlbumStep | _ForwardStep],
+        *,
+        key_prefix: str,
+        notify: tuple[str, str] | None = None,
+    ) -> int:
+        """Persist `steps`; `notify` is a Bark (title, body) sent once the last one is delivered."""
+        entries = [
+            _outbox_entry(step, control_chat_id, f"{key_prefix}:{index}")
+            for index, step in enumerate(steps)
+        ]
+        if notify and entries:
+            entries[-1].payload["notify"] = list(notify)
+        with db_session(self.config.storage.db_path) as conn:
+            added = enqueue_outbox(conn, entries, utc_now())
+        logger.info("Queued %s control-chat delivery step(s) for %s", added, key_prefix)
+        self._wake.set()
+        return added
+
     async def _run(self) -> None:
+        retention = timedelta(days=self.config.reporting.retention_days)
+        with db_session(self.config.storage.db_path) as conn:
+            purge_outbox(conn, utc_now() - retention)
         while not self._stop.is_set():
+            self._wake.clear()
             try:
-                await asyncio.wait_for(
-                    self._stop.wait(), timeout=self._CHECK_INTERVAL
-                )
-            except asyncio.TimeoutError:
-                await self._maybe_send_heartbeat()
+                delay = await self.drain()
             except asyncio.CancelledError:
-                break
+                raise
+            except Exception:
+                logger.exception("Outbox delivery pass failed")
+                delay = self._POLL_SECONDS
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
 
-    async def _maybe_send_heartbeat(self) -> None:
+    async def drain(self) -> float:
+        """Send every due entry; return seconds until the next one is due."""
         now = utc_now()
-        if not self.tracker.should_send_heartbeat(now, self._IDLE_SECONDS):
-            return
-        try:
-            for control in self.config.control_groups.values():
-                await _send_message_with_fallback(
+        with db_session(self.config.storage.db_path) as conn:
+            pending = fetch_pending_outbox(conn)
+        blocked: set[int] = set()
+        next_due = self._POLL_SECONDS
+        for entry in pending:
+            if entry.control_chat_id in blocked:
+                continue
+            if entry.next_attempt_at is not None and entry.next_attempt_at > now:
+                blocked.add(entry.control_chat_id)
+                next_due = min(next_due, (entry.next_attempt_at - now).total_seconds())
+                continue
+            with task_context(f"outbox {entry.idempotency_key}"):
+                retry_at = await self._deliver(entry)
+            if retry_at is not None:
+                blocked.add(entry.control_chat_id)
+                next_due = min(next_due, (retry_at - utc_now()).total_seconds())
+        return max(1.0, next_due)
+
+    async def _deliver(self, entry: OutboxEntry) -> datetime | None:
+        """Send one entry; return when to retry it if it should be retried."""
+        assert entry.id is not None
+        step = _outbox_step(entry)
+        error: str | None = None
+        if isinstance(step, _AlbumStep):
+            present = [
+                (path, caption)
+                for path, caption in zip(step.files, step.captions)
+                if path.exists()
+            ]
+            if not present:
+                error = "files no longer on disk"
+            step.files = [path for path, _caption in present]
+            step.captions = [caption for _path, caption in present]
+        retry_at: datetime | None = None
+        if error is None:
+            try:
+                await _execute_delivery_plan(
                     self.client,
-                    self._fallback_client,
-                    control.control_chat_id,
-                    "Watcher is still running",
+                    entry.control_chat_id,
+                    _DeliveryPlan(steps=[step]),
+                    fallback_client=self._fallback_client,
                 )
-            self.tracker.mark_heartbeat(now)
-            await send_bark_notification(
-                self.config.notifications,
-                "Watcher heartbeat",
-                "Watcher is still running",
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                error = str(exc) or type(exc).__name__
+                attempts = entry.attempts + 1
+                if attempts < self._MAX_ATTEMPTS:
+                    delay = min(
+                        self._MAX_RETRY_SECONDS,
+                        self._BASE_RETRY_SECONDS * 2 ** (attempts - 1),
+                    )
+                    retry_at = utc_now() + timedelta(seconds=delay)
+        with db_session(self.config.storage.db_path) as conn:
+            if error is None:
+                mark_outbox_sent(conn, entry.id, utc_now())
+            else:
+                mark_outbox_failed(conn, entry.id, error, retry_at=retry_at)
+        if error is None:
+            if self._tracker:
+                self._tracker.mark_activity()
+            if notify := entry.payload.get("notify"):
+                title, body = notify
+                await send_bark_notification(self.config.notifications, title, body)
+        elif retry_at is None:
+            logger.error(
+                "Giving up on control-chat delivery %s: %s", entry.idempotency_key, error
             )
-        except Exception as exc:  # pragma: no cover
-            logger.warning("Failed to send heartbeat: %s", exc)
+        else:
+            logger.warning(
+                "Control-chat delivery %s failed (%s); retrying at %s",
+                entry.idempotency_key,
+                error,
+                retry_at.isoformat(),
+            )
+        return retry_at
+
+
+def _outbox_entry(
+    step: _TextStep | _AlbumStep | _ForwardStep,
+    control_chat_id: int,
+    key: str,
+) -> OutboxEntry:
+    if isinstance(step, _TextStep):
+        kind = "text"
+        payload: dict[str, object] = {"text": step.text}
+    elif isinstance(step, _AlbumStep):
+        kind = "album"
+        payload = {"files": [str(path) for path in step.files], "captions": step.captions}
+    else:
+        kind = "forward"
+        payload = {
+            "source_chat_id": step.source_chat_id,
+            "message_ids": step.message_ids,
+            "fallback": [[str(path), caption, album] for path, caption, album in step.fallback],
+        }
+    if step.trace:
+        payload["trace"] = [list(item) for item in step.trace]
+    return OutboxEntry(
+        idempotency_key=key,
+        control_chat_id=control_chat_id,
+        reply_to=step.reply_to,
+        kind=kind,
+        payload=payload,
+    )
+
+
+def _outbox_step(entry: OutboxEntry) -> _TextStep | _AlbumStep | _ForwardStep:
+    payload = entry.payload
+    trace = [(int(chat_id), int(message_id)) for chat_id, message_id in payload.get("trace", ())]
+    if entry.kind == "text":
+        return _TextStep(entry.reply_to, payload["text"], trace=trace)
+    if entry.kind == "album":
+        return _AlbumStep(
+            reply_to=entry.reply_to,
+            files=[Path(path) for path in payload["files"]],
+            captions=list(payload["captions"]),
+            trace=trace,
+        )
+    return _ForwardStep(
+        reply_to=entry.reply_to,
+        source_chat_id=int(payload["source_chat_id"]),
+        message_ids=[int(message_id) for message_id in payload["message_ids"]],
+        fallback=[(Path(path), caption, album) for path, caption, album in payload["fallback"]],
+        trace=trace,
+    )
 
 
 class _ActivityTracker:
@@ -964,22 +1850,37 @@ async def _push_once_reports(
     *,
     bark_context: str | None = None,
     fallback_client: TelegramClient | None = None,
+    user_reports: Mapping[str, Mapping[int, Path]] | None = None,
 ) -> None:
+    # Bundles for the same control chat stay sequential so their message
+    # streams do not interleave; different control chats are pushed in parallel.
+    by_control: dict[int, list[tuple[TargetGroupConfig, Path]]] = {}
     for target, report_path in zip(targets, report_paths):
         control = config.control_groups[target.control_group or ""]
-        messages = stored_by_target.get(target.name, [])
-        await _send_report_bundle(
-            client,
-            config,
-            control,
-            target,
-            messages,
-            since,
-            until,
-            report_path,
-            bark_context=bark_context,
-            fallback_client=fallback_client,
-        )
+        by_control.setdefault(control.control_chat_id, []).append((target, report_path))
+
+    async def _push_control(items: list[tuple[TargetGroupConfig, Path]]) -> None:
+        for target, report_path in items:
+            control = config.control_groups[target.control_group or ""]
+            messages = stored_by_target.get(target.name, [])
+            await _send_report_bundle(
+                client,
+                config,
+                control,
+                target,
+                messages,
+                since,
+                until,
+                report_path,
+                bark_context=bark_context,
+                fallback_client=fallback_client,
+                user_reports=(user_reports or {}).get(target.name),
+            )
+
+    await _gather_limited(
+        config.performance.max_parallel_targets,
+        [(lambda items=items: _push_control(items)) for items in by_control.values()],
+    )
 
 
 T = TypeVar("T")
@@ -997,52 +1898,39 @@ async def _send_report_bundle(
     tracker: "_ActivityTracker | None" = None,
     bark_context: str | None = None,
     fallback_client: TelegramClient | None = None,
+    outbox: "_OutboxWorker | None" = None,
+    user_reports: Mapping[int, Path] | None = None,
 ) -> None:
-    control_chat_id = control.control_chat_id
-    if _topic_routing_enabled(control):
-        await _send_topic_reports(
-            client,
-            config,
-            control,
-            target,
-            messages,
-            since,
-            until,
-            report_path.parent,
-            fallback_client=fallback_client,
-        )
-        await _send_messages_to_control(
-            client,
-            config,
-            control,
-            target,
-            messages,
-            fallback_client=fallback_client,
-        )
-    else:
-        caption = _format_report_caption("Report", len(messages), since, until, config)
-        await _send_file_with_fallback(
-            client,
-            fallback_client,
-            control_chat_id,
-            report_path,
-            caption=caption,
+    plan = _plan_report_bundle(
+        config, control, target, messages, since, until, report_path, user_reports
+    )
+    title = "Report Ready"
+    if bark_context:
+        title = f"{title} {bark_context}"
+    body = _format_user_counts(messages, config, target) or f"{len(messages)} messages"
+    if plan.naive_calls:
+        logger.info(
+            "Delivering %s message(s) for %s in %s API call(s) (%s without batching)",
+            len(messages),
+            target.name,
+            len(plan.steps),
+            plan.naive_calls,
         )
-        await _send_messages_to_control(
-            client,
-            config,
-            control,
-            target,
-            messages,
-            fallback_client=fallback_client,
+    if outbox is not None:
+        # The outbox sends the notification once the bundle is delivered.
+        window = f"{int(since.timestamp())}-{int((until or utc_now()).timestamp())}"
+        await outbox.enqueue(
+            control.control_chat_id,
+            plan.steps,
+            key_prefix=f"{target.target_chat_id}:{window}",
+            notify=(title, body),
         )
+        return
+    await _execute_delivery_plan(
+        client, control.control_chat_id, plan, fallback_client=fallback_client
+    )
     if tracker:
         tracker.mark_activity()
-    counts_text = _format_user_counts(messages, config, target)
-    title = "Report Ready"
-    if bark_context:
-        title = f"{title} {bark_context}"
-    body = counts_text or f"{len(messages)} messages"
     await send_bark_notification(
         config.notifications,
         title,
@@ -1050,35 +1938,27 @@ async def _send_report_bundle(
     )
 
 
-async def _send_messages_to_control(
-    client: TelegramClient,
+def _plan_report_bundle(
     config: Config,
     control: ControlGroupConfig,
     target: TargetGroupConfig,
     messages: Sequence[DbMessage],
-    *,
-    fallback_client: TelegramClient | None = None,
-) -> None:
-    for message in messages:
-        reply_to = _topic_reply_id_for_message(control, target.target_chat_id, message)
-        text = _format_control_message(message, config, target)
-        await _send_message_with_fallback(
-            client,
-            fallback_client,
-            control.control_chat_id,
-            text,
-            parse_mode="html",
-            reply_to=reply_to,
-        )
-        await _send_media_for_message(
-            client,
-            control.control_chat_id,
-            message,
-            config,
-            target,
-            reply_to=reply_to,
-            fallback_client=fallback_client,
+    since: datetime,
+    until: datetime | None,
+    report_path: Path,
+    user_reports: Mapping[int, Path] | None = None,
+) -> _DeliveryPlan:
+    if _topic_routing_enabled(control):
+        report_steps = _plan_topic_reports(
+            config, control, target, messages, since, until, report_path.parent, user_reports
         )
+    else:
+        caption = _format_report_caption("Report", len(messages), since, until, config)
+        report_steps = [_AlbumStep(reply_to=None, files=[report_path], captions=[caption])]
+    plan = _plan_control_delivery(config, control, target, messages)
+    plan.steps[:0] = report_steps
+    plan.naive_calls += len(report_steps)
+    return plan
 
 
 async def _send_media_for_message(
@@ -1091,10 +1971,239 @@ async def _send_media_for_message(
     *,
     fallback_client: TelegramClient | None = None,
 ) -> None:
-    if not message.media:
-        return
+    plan = _DeliveryPlan()
+    batch = _TopicBatch(reply_to, forward_from=_forward_source(target))
+    batch.add_media(message, config, target)
+    batch.flush(plan.steps)
+    await _execute_delivery_plan(client, control_chat_id, plan, fallback_client=fallback_client)
+
+
+# Telegram limits: 4096 characters per text message, 10 items per album,
+# 100 messages per forward request.
+_MAX_MESSAGE_CHARS = 4096
+_MAX_ALBUM_SIZE = 10
+_MAX_FORWARD_IDS = 100
+_TEXT_SEPARATOR = "\n\n"
+
+_MediaItem = tuple[Path, str, str | None]
+
+
+@dataclass
+class _TextStep:
+    reply_to: int | None
+    text: str
+    trace: list[tuple[int, int]] = field(default_factory=list)
+
+
+@dataclass
+class _AlbumStep:
+    reply_to: int | None
+    files: list[Path]
+    captions: list[str]
+    trace: list[tuple[int, int]] = field(default_factory=list)
+
+
+@dataclass
+class _ForwardStep:
+    reply_to: int | None
+    source_chat_id: int
+    message_ids: list[int]
+    fallback: list[_MediaItem]
+    trace: list[tuple[int, int]] = field(default_factory=list)
+
+
+@dataclass
+class _DeliveryPlan:
+    steps: list[_TextStep | _AlbumStep | _ForwardStep] = field(default_factory=list)
+    naive_calls: int = 0
+
+
+class _TopicBatch:
+    """Text and media waiting to be flushed into one topic (or the main chat).
+
+    With `forward_from` set, media is copied from the source chat by message id
+    and the local files are kept only as a fallback.
+    """
+
+    def __init__(self, reply_to: int | None, *, forward_from: int | None = None) -> None:
+        self.reply_to = reply_to
+        self.forward_from = forward_from
+        self.texts: list[str] = []
+        self.length = 0
+        self.media: list[_MediaItem] = []
+        self.forwards: dict[int, list[_MediaItem]] = {}
+        # (chat_id, message_id) of every message in the batch, for tracing.
+        self.keys: list[tuple[int, int]] = []
+
+    def fits(self, text: str) -> bool:
+        if not self.texts:
+            return True
+        return self.length + len(_TEXT_SEPARATOR) + len(text) <= _MAX_MESSAGE_CHARS
+
+    def add_text(self, text: str) -> None:
+        if self.texts:
+            self.length += len(_TEXT_SEPARATOR)
+        self.texts.append(text)
+        self.length += len(text)
+
+    def add_media(self, message: DbMessage, config: Config, target: TargetGroupConfig) -> int:
+        """Queue the message's media and return how many uploads it would take unbatched."""
+        uploads = 0
+        for media in message.media:
+            items = _media_items(message, config, target, [media])
+            uploads += len(items)
+            source_id = _forward_source_id(message, media)
+            if self.forward_from is not None and source_id is not None:
+                self.forwards.setdefault(source_id, []).extend(items)
+            else:
+                self.media.extend(items)
+        return uploads
+
+    def flush(self, steps: list[_TextStep | _AlbumStep | _ForwardStep]) -> None:
+        first = len(steps)
+        if self.texts:
+            steps.append(_TextStep(self.reply_to, _TEXT_SEPARATOR.join(self.texts)))
+        if self.forwards and self.forward_from is not None:
+            source_ids = list(self.forwards)
+            for start in range(0, len(source_ids), _MAX_FORWARD_IDS):
+                chunk = source_ids[start : start + _MAX_FORWARD_IDS]
+                steps.append(
+                    _ForwardStep(
+                        reply_to=self.reply_to,
+                        source_chat_id=self.forward_from,
+                        message_ids=chunk,
+                        fallback=[item for source_id in chunk for item in self.forwards[source_id]],
+                    )
+                )
+        steps.extend(_album_steps(self.reply_to, self.media))
+        for step in steps[first:]:
+            step.trace = list(self.keys)
+        self.texts = []
+        self.length = 0
+        self.media = []
+        self.forwards = {}
+        self.keys = []
+
+
+def _plan_control_delivery(
+    config: Config,
+    control: ControlGroupConfig,
+    target: TargetGroupConfig,
+    messages: Sequence[DbMessage],
+) -> _DeliveryPlan:
+    """Pack control-chat output into as few API calls as Telegram allows.
+
+    Consecutive message texts for the same topic are merged up to the
+    4096-character limit (longer texts are split first); the media they announce follows right after, grouped
+    into albums (or forwarded in one request for `delivery_mode = "forward"`).
+    Topics are independent threads, so each keeps its own batch and per-topic
+    message order is preserved.
+    """
+    plan = _DeliveryPlan()
+    batches: dict[int | None, _TopicBatch] = {}
+    forward_from = _forward_source(target)
+    for message in messages:
+        reply_to = _topic_reply_id_for_message(control, target.target_chat_id, message)
+        text = _format_control_message(message, config, target)
+        batch = batches.get(reply_to)
+        if batch is None:
+            batch = batches[reply_to] = _TopicBatch(reply_to, forward_from=forward_from)
+        key = (message.chat_id, message.message_id)
+        for piece in _split_text(text):
+            if not batch.fits(piece):
+                batch.flush(plan.steps)
+            batch.add_text(piece)
+            if key not in batch.keys[-1:]:
+                batch.keys.append(key)
+        plan.naive_calls += 1 + batch.add_media(message, config, target)
+    for batch in batches.values():
+        batch.flush(plan.steps)
+    return plan
+
+
+_HTML_TAG = re.compile(r"<(/?)([a-zA-Z]+)[^>]*>")
+
+
+def _split_text(text: str, limit: int = _MAX_MESSAGE_CHARS) -> list[str]:
+    """Split HTML `text` into pieces of at most `limit` characters.
+
+    Cuts prefer a line break in the second half of the piece; otherwise the line
+    is cut mid-way, but never inside a tag or an entity such as `&amp;`. Tags
+    still open at a cut (e.g. a long `<blockquote>`) are closed at the end of
+    the piece and reopened at the start of the next, so each piece is valid HTML.
+    """
+    pieces: list[str] = []
+    while len(text) > limit:
+        reserve = 0
+        while True:
+            cut = _text_cut(text, limit - reserve)
+            open_tags = _open_tags(text[:cut])
+            closing = "".join(f"</{name}>" for name, _tag in reversed(open_tags))
+            if len(closing) <= reserve:
+                break
+            reserve = len(closing)
+        pieces.append(text[:cut] + closing)
+        text = "".join(tag for _name, tag in open_tags) + text[cut:].lstrip("\n")
+    if text or not pieces:
+        pieces.append(text)
+    return pieces
+
+
+def _text_cut(text: str, limit: int) -> int:
+    cut = text.rfind("\n", 0, limit + 1)
+    if cut >= limit // 2:
+        return cut
+    cut = limit
+    head = text[:cut]
+    for start, end in (("<", ">"), ("&", ";")):
+        opened = head.rfind(start)
+        if opened > head.rfind(end):
+            # A tag opening the piece is kept whole rather than cut to nothing.
+            cut = min(cut, opened) if opened > 0 else text.index(end, opened) + 1
+    return cut
+
+
+def _open_tags(html: str) -> list[tuple[str, str]]:
+    """(name, opening tag) of every tag left open at the end of `html`."""
+    stack: list[tuple[str, str]] = []
+    for match in _HTML_TAG.finditer(html):
+        name = match.group(2).lower()
+        if not match.group(1):
+            stack.append((name, match.group(0)))
+            continue
+        for index in range(len(stack) - 1, -1, -1):
+            if stack[index][0] == name:
+                del stack[index:]
+                break
+    return stack
+
+
+def _forward_source(target: TargetGroupConfig) -> int | None:
+    return target.target_chat_id if target.forwards_media else None
+
+
+def _forward_source_id(message: DbMessage, media: DbMedia) -> int | None:
+    """Id of the target-chat message that carries `media`, if it is known."""
+    if media.is_reply:
+        return media.source_message_id
+    return message.message_id
+
+
+def _media_items(
+    message: DbMessage,
+    config: Config,
+    target: TargetGroupConfig,
+    media_list: Sequence[DbMedia] | None = None,
+) -> list[_MediaItem]:
+    """Return (path, caption, album class) for each downloaded media file."""
+    items: list[_MediaItem] = []
+    media_list = message.media if media_list is None else media_list
+    if not media_list:
+        return items
     sender_label = config.format_user_label(message.sender_id, target=target)
-    for media in message.media:
+    for media in media_list:
+        if media.is_deferred:
+            continue
         file_path = Path(media.file_path)
         if not file_path.exists():
             logger.warning("Media file missing on disk: %s", file_path)
@@ -1111,14 +2220,160 @@ async def _send_media_for_message(
             )
         else:
             caption = f"Media for {sender_label} — message #{message.message_id}"
+        items.append((file_path, caption, _album_class(media)))
+    return items
+
+
+def _album_class(media: DbMedia) -> str | None:
+    """Telegram only groups photos/videos, audio, or documents together.
+
+    Returns None for media that must be sent on its own (GIFs, stickers, voice notes).
+    """
+    kind = media.media_kind
+    mime = (media.mime_type or "").lower()
+    if kind is None:
+        if mime in ("image/gif", "image/webp"):
+            return None
+        if mime.startswith(("image/", "video/")):
+            return "visual"
+        if mime.startswith("audio/ogg"):
+            return None
+        if mime.startswith("audio/"):
+            return "audio"
+        return "document"
+    if kind in ("photo", "video"):
+        return "visual"
+    if kind in ("audio", "document"):
+        return kind
+    return None
+
+
+def _chunk_albums(items: Sequence[_MediaItem]) -> list[list[_MediaItem]]:
+    """Split media into sendable albums, keeping order as far as classes allow."""
+    albums: list[list[_MediaItem]] = []
+    current: list[_MediaItem] = []
+    for item in items:
+        album_class = item[2]
+        if current and (
+            album_class is None
+            or current[0][2] != album_class
+            or len(current) >= _MAX_ALBUM_SIZE
+        ):
+            albums.append(current)
+            current = []
+        current.append(item)
+        if album_class is None:
+            albums.append(current)
+            current = []
+    if current:
+        albums.append(current)
+    return albums
+
+
+def _album_steps(reply_to: int | None, items: Sequence[_MediaItem]) -> list[_AlbumStep]:
+    return [
+        _AlbumStep(
+            reply_to=reply_to,
+            files=[path for path, _caption, _kind in album],
+            captions=[caption for _path, caption, _kind in album],
+        )
+        for album in _chunk_albums(items)
+    ]
+
+
+async def _execute_delivery_plan(
+    client: TelegramClient,
+    control_chat_id: int,
+    plan: _DeliveryPlan,
+    *,
+    fallback_client: TelegramClient | None = None,
+) -> None:
+    for step in plan.steps:
+        with TRACER.span("deliver", step.trace):
+            await _execute_delivery_step(
+                client, control_chat_id, step, fallback_client=fallback_client
+            )
+
+
+async def _execute_delivery_step(
+    client: TelegramClient,
+    control_chat_id: int,
+    step: _TextStep | _AlbumStep | _ForwardStep,
+    *,
+    fallback_client: TelegramClient | None = None,
+) -> None:
+    if isinstance(step, _TextStep):
+        await _send_message_with_fallback(
+            client,
+            fallback_client,
+            control_chat_id,
+            step.text,
+            parse_mode="html",
+            reply_to=step.reply_to,
+        )
+    elif isinstance(step, _ForwardStep):
+        try:
+            await _forward_with_fallback(
+                client,
+                fallback_client,
+                control_chat_id,
+                step.source_chat_id,
+                step.message_ids,
+                reply_to=step.reply_to,
+            )
+            return
+        except (errors.RPCError, ValueError) as exc:
+            logger.warning(
+                "Forwarding from %s failed (%s); re-uploading %s file(s).",
+                step.source_chat_id,
+                exc,
+                len(step.fallback),
+            )
+        for album_step in _album_steps(step.reply_to, step.fallback):
+            await _send_album_step(
+                client, control_chat_id, album_step, fallback_client=fallback_client
+            )
+    else:
+        await _send_album_step(client, control_chat_id, step, fallback_client=fallback_client)
+
+
+async def _send_album_step(
+    client: TelegramClient,
+    control_chat_id: int,
+    step: _AlbumStep,
+    *,
+    fallback_client: TelegramClient | None = None,
+) -> None:
+    if len(step.files) == 1:
         await _send_file_with_fallback(
             client,
             fallback_client,
             control_chat_id,
-            file_path,
-            caption=caption,
-            reply_to=reply_to,
+            step.files[0],
+            caption=step.captions[0],
+            reply_to=step.reply_to,
         )
+        return
+    try:
+        await _send_file_with_fallback(
+            client,
+            fallback_client,
+            control_chat_id,
+            step.files,
+            caption=step.captions,
+            reply_to=step.reply_to,
+        )
+    except errors.RPCError as exc:
+        logger.warning("Album upload rejected (%s); sending files one by one.", exc)
+        for file_path, caption in zip(step.files, step.captions):
+            await _send_file_with_fallback(
+                client,
+                fallback_client,
+                control_chat_id,
+                file_path,
+                caption=caption,
+                reply_to=step.reply_to,
+            )
 
 
 def _format_control_message(
@@ -1141,12 +2396,25 @@ def _format_control_message(
     body_text = escape(message.text) if message.text else "<i>no text</i>"
     lines.append(f"<b>Content:</b> {body_text}")
     quote_blocks: list[str] = []
-    regular_media = sum(1 for media in message.media if not media.is_reply)
-    reply_media = sum(1 for media in message.media if media.is_reply)
+    forwarding = target.forwards_media
+    ready_media = [
+        media
+        for media in message.media
+        if not media.is_deferred
+        or (forwarding and _forward_source_id(message, media) is not None)
+    ]
+    deferred_media = [media for media in message.media if media not in ready_media]
+    regular_media = sum(1 for media in ready_media if not media.is_reply)
+    reply_media = sum(1 for media in ready_media if media.is_reply)
     if regular_media:
         lines.append(f"Attachments: {regular_media} file(s) to follow.")
     if reply_media:
         lines.append(f"Reply attachments: {reply_media} file(s) to follow.")
+    if deferred_media:
+        described = ", ".join(escape(_describe_deferred_media(media)) for media in deferred_media)
+        lines.append(
+            f"Not downloaded: {described} — send /media {message.message_id} to fetch."
+        )
     if message.replied_sender_id:
         reply_label = config.format_user_label(message.replied_sender_id, target=target)
         reply_line = f"↩ Reply to {escape(reply_label)}"
@@ -1160,6 +2428,22 @@ def _format_control_message(
     return "\n".join(lines)
 
 
+def _describe_deferred_media(media: DbMedia) -> str:
+    kind = media.media_kind or "file"
+    if media.file_size:
+        return f"{kind} {_format_bytes(media.file_size)}"
+    return kind
+
+
+def _format_bytes(size: int) -> str:
+    value = float(size)
+    for unit in ("B", "KB", "MB"):
+        if value < 1024:
+            return f"{value:.0f} {unit}" if unit == "B" else f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} GB"
+
+
 def _topic_reply_id_for_message(
     control: ControlGroupConfig,
     target_chat_id: int,
@@ -1177,6 +2461,55 @@ def _topic_routing_enabled(control: ControlGroupConfig) -> bool:
     return bool(control.is_forum and control.topic_routing_enabled)
 
 
+def _topic_report_name(target: TargetGroupConfig, user_id: int) -> str:
+    return f"index_{target.target_chat_id}_{user_id}.html"
+
+
+def _render_reports(
+    config: Config,
+    control: ControlGroupConfig | None,
+    target: TargetGroupConfig,
+    messages: Sequence[DbMessage],
+    since: datetime,
+    until: datetime | None,
+    *,
+    report_dir: Path | None = None,
+    report_name: str = "index.html",
+) -> ReportSet:
+    """Render the target's report, plus its per-user topic reports in the same pass
+    when `control` routes reports to topics."""
+    if control is None or not _topic_routing_enabled(control):
+        path = generate_report(
+            messages,
+            config,
+            since,
+            until,
+            target=target,
+            report_dir=report_dir,
+            report_name=report_name,
+        )
+        return ReportSet(path=path, user_paths={})
+    return generate_reports(
+        messages,
+        config,
+        since,
+        until,
+        target=target,
+        report_dir=report_dir,
+        report_name=report_name,
+        user_report_name=functools.partial(_topic_report_name, target),
+    )
+
+
+async def _render(
+    pool: RenderPool | None, func: Callable[..., T], /, *args: object, **kwargs: object
+) -> T:
+    """Run a report renderer in `pool`, or inline when there is none."""
+    if pool is None:
+        return func(*args, **kwargs)
+    return await pool.run(func, *args, **kwargs)
+
+
 def _topic_reply_id_for_user(
     control: ControlGroupConfig, target_chat_id: int, user_id: int
 ) -> int | None:
@@ -1186,8 +2519,7 @@ def _topic_reply_id_for_user(
     return topic_id
 
 
-async def _send_topic_reports(
-    client: TelegramClient,
+def _plan_topic_reports(
     config: Config,
     control: ControlGroupConfig,
     target: TargetGroupConfig,
@@ -1195,34 +2527,30 @@ async def _send_topic_reports(
     since: datetime,
     until: datetime | None,
     report_dir: Path,
-    *,
-    fallback_client: TelegramClient | None = None,
-) -> None:
+    user_reports: Mapping[int, Path] | None = None,
+) -> list[_AlbumStep]:
+    """One report per user for their topic; reuses `user_reports` rendered with the main report."""
     grouped: dict[int, list[DbMessage]] = {}
     for message in messages:
         grouped.setdefault(message.sender_id, []).append(message)
+    steps: list[_AlbumStep] = []
     for user_id, items in grouped.items():
         label = config.format_user_label(user_id, target=target)
-        report_name = f"index_{target.target_chat_id}_{user_id}.html"
-        report_path = generate_report(
-            items,
-            config,
-            since,
-            until,
-            target=target,
-            report_dir=report_dir,
-            report_name=report_name,
-        )
+        report_path = (user_reports or {}).get(user_id)
+        if report_path is None:
+            report_path = generate_report(
+                items,
+                config,
+                since,
+                until,
+                target=target,
+                report_dir=report_dir,
+                report_name=_topic_report_name(target, user_id),
+            )
         caption = _format_report_caption(label, len(items), since, until, config)
         reply_to = _topic_reply_id_for_user(control, target.target_chat_id, user_id)
-        await _send_file_with_fallback(
-            client,
-            fallback_client,
-            control.control_chat_id,
-            report_path,
-            caption=caption,
-            reply_to=reply_to,
-        )
+        steps.append(_AlbumStep(reply_to=reply_to, files=[report_path], captions=[caption]))
+    return steps
 
 
 def _format_user_counts(
@@ -1314,18 +2642,107 @@ def _format_interval_label(minutes: int) -> str:
     return f"{minutes}M"
 
 
+async def _gather_limited(
+    limit: int,
+    factories: Sequence[Callable[[], Awaitable[T]]],
+) -> list[T]:
+    """Run coroutine factories with at most `limit` in flight, preserving order."""
+    semaphore = asyncio.Semaphore(max(1, limit))
+
+    async def _bounded(factory: Callable[[], Awaitable[T]]) -> T:
+        async with semaphore:
+            return await factory()
+
+    tasks = [asyncio.ensure_future(_bounded(factory)) for factory in factories]
+    try:
+        return list(await asyncio.gather(*tasks))
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+_RATE_LIMITER_ATTR = "_tgwatch_rate_limiter"
+_UPLOAD_CACHE_ATTR = "_tgwatch_upload_cache"
+_ENTITY_CACHE_ATTR = "_tgwatch_entity_cache"
+# Shared by every client using the same database (primary and sender).
+_ENTITY_CACHES: dict[Path, EntityCache] = {}
+
+_METHOD_CLASSES = {
+    "send_message": "send_message",
+    "edit_message": "send_message",
+    "send_file": "send_file",
+    "get_messages": "get_messages",
+    "iter_messages": "get_messages",
+    "get_reply_message": "get_messages",
+    "download_media": "download",
+}
+
+
+def _method_class(name: str) -> str:
+    return _METHOD_CLASSES.get(name, "other")
+
+
+def _rate_limiter(client: object) -> AccountRateLimiter | None:
+    """Return the limiter shared by every task using `client`'s account."""
+    limiter = getattr(client, _RATE_LIMITER_ATTR, None)
+    if isinstance(limiter, AccountRateLimiter):
+        return limiter
+    session = getattr(client, "session", None)
+    name = str(getattr(session, "filename", "") or type(client).__name__)
+    limiter = AccountRateLimiter(Path(name).stem)
+    try:
+        setattr(client, _RATE_LIMITER_ATTR, limiter)
+    except AttributeError:
+        return None
+    return limiter
+
+
+def _limiter_for(func: Callable[..., Awaitable[T]]) -> AccountRateLimiter | None:
+    owner = getattr(func, "__self__", None)
+    if owner is None:
+        return None
+    if isinstance(owner, custom_message.Message):
+        owner = getattr(owner, "_client", None)
+        if owner is None:
+            return None
+    return _rate_limiter(owner)
+
+
 async def _with_floodwait(
     func: Callable[..., Awaitable[T]],
     *args,
     **kwargs,
+) -> T:
+    method = _method_class(getattr(func, "__name__", ""))
+    return await _call_limited(_limiter_for(func), method, func, *args, **kwargs)
+
+
+async def _call_limited(
+    limiter: AccountRateLimiter | None,
+    method: str,
+    func: Callable[..., Awaitable[T]],
+    *args,
+    **kwargs,
 ) -> T:
     while True:
+        if limiter is not None:
+            await limiter.acquire(method)
         try:
-            return await func(*args, **kwargs)
+            result = await func(*args, **kwargs)
         except errors.FloodWaitError as exc:
             wait_for = exc.seconds + 1
-            logger.warning("FloodWait: sleeping for %ss", wait_for)
+            logger.warning("FloodWait on %s: pausing account for %ss", method, wait_for)
+            metrics.FLOOD_WAIT_SECONDS.inc(wait_for, method=method)
+            if limiter is not None:
+                limiter.record_flood_wait(method, wait_for)
+                continue
             await asyncio.sleep(wait_for)
+            continue
+        if limiter is not None:
+            limiter.record_success(method)
+        return result
 
 
 async def _send_with_backoff(
@@ -1336,16 +2753,53 @@ async def _send_with_backoff(
 ) -> None:
     target = await _resolve_entity(client, entity)
     await _with_floodwait(client.send_message, target, message, **kwargs)
+    metrics.SENT.inc(kind="message")
 
 
 async def _send_file_with_backoff(
     client: TelegramClient,
     entity: int | str,
-    file_path: Path,
+    file_path: Path | Sequence[Path],
     **kwargs,
 ) -> None:
     target = await _resolve_entity(client, entity)
-    await _with_floodwait(client.send_file, target, file=file_path, **kwargs)
+    cache = getattr(client, _UPLOAD_CACHE_ATTR, None)
+    paths = [file_path] if isinstance(file_path, Path) else list(file_path)
+    if not isinstance(cache, UploadCache) or not all(cache.accepts(path) for path in paths):
+        await _with_floodwait(client.send_file, target, file=file_path, **kwargs)
+        metrics.SENT.inc(len(paths), kind="file")
+        return
+    account_id = await _get_self_id(client)
+    digests = [await cache.digest(path) for path in paths]
+    handles = [cache.lookup(account_id, digest) for digest in digests]
+    files = [handle or path for handle, path in zip(handles, paths)]
+    try:
+        sent = await _with_floodwait(
+            client.send_file,
+            target,
+            file=files[0] if isinstance(file_path, Path) else files,
+            **kwargs,
+        )
+    except errors.RPCError as exc:
+        if not any(handles):
+            raise
+        # Stored handles can go stale (expired file reference, deleted media);
+        # drop them and upload the bytes again.
+        logger.info("Cached upload rejected (%s); re-uploading.", exc)
+        for digest, handle in zip(digests, handles):
+            if handle is not None:
+                cache.forget(account_id, digest)
+        handles = [None] * len(paths)
+        sent = await _with_floodwait(client.send_file, target, file=file_path, **kwargs)
+    sent_messages = sent if isinstance(sent, list) else [sent]
+    metrics.SENT.inc(len(paths), kind="file")
+    for path, digest, handle, sent_message in zip(paths, digests, handles, sent_messages):
+        size = path.stat().st_size
+        if handle is not None:
+            cache.record_reuse(size)
+            continue
+        cache.record_upload(size)
+        cache.remember(account_id, digest, sent_message, size)
 
 
 async def _send_message_with_fallback(
@@ -1362,6 +2816,7 @@ async def _send_message_with_fallback(
         if fallback_client is None or fallback_client is client:
             raise
         logger.warning("Sender failed to send message; retrying with primary: %s", exc)
+        metrics.SENDER_FALLBACKS.inc(kind="message")
     await _send_with_backoff(fallback_client, entity, message, **kwargs)
 
 
@@ -1369,7 +2824,7 @@ async def _send_file_with_fallback(
     client: TelegramClient,
     fallback_client: TelegramClient | None,
     entity: int | str,
-    file_path: Path,
+    file_path: Path | Sequence[Path],
     **kwargs,
 ) -> None:
     try:
@@ -1379,9 +2834,52 @@ async def _send_file_with_fallback(
         if fallback_client is None or fallback_client is client:
             raise
         logger.warning("Sender failed to send file; retrying with primary: %s", exc)
+        metrics.SENDER_FALLBACKS.inc(kind="file")
     await _send_file_with_backoff(fallback_client, entity, file_path, **kwargs)
 
 
+async def _forward_with_backoff(
+    client: TelegramClient,
+    entity: int | str,
+    source_chat_id: int,
+    message_ids: Sequence[int],
+    *,
+    reply_to: int | None = None,
+) -> None:
+    to_peer = await _resolve_entity(client, entity)
+    from_peer = await _resolve_entity(client, source_chat_id)
+    # The raw request is needed for top_msg_id (forum topics); drop_author turns
+    # the forward into a copy so it reads like an uploaded attachment.
+    request = functions.messages.ForwardMessagesRequest(
+        from_peer=from_peer,
+        id=list(message_ids),
+        to_peer=to_peer,
+        drop_author=True,
+        top_msg_id=reply_to,
+    )
+    await _call_limited(_rate_limiter(client), "send_file", client, request)
+    metrics.SENT.inc(len(message_ids), kind="forward")
+
+
+async def _forward_with_fallback(
+    client: TelegramClient,
+    fallback_client: TelegramClient | None,
+    entity: int | str,
+    source_chat_id: int,
+    message_ids: Sequence[int],
+    **kwargs,
+) -> None:
+    try:
+        await _forward_with_backoff(client, entity, source_chat_id, message_ids, **kwargs)
+        return
+    except Exception as exc:
+        if fallback_client is None or fallback_client is client:
+            raise
+        logger.warning("Sender failed to forward media; retrying with primary: %s", exc)
+        metrics.SENDER_FALLBACKS.inc(kind="forward")
+    await _forward_with_backoff(fallback_client, entity, source_chat_id, message_ids, **kwargs)
+
+
 async def _resolve_entity(
     client: TelegramClient,
     entity: int | str,
@@ -1390,6 +2888,13 @@ async def _resolve_entity(
         self_id = await _get_self_id(client)
         if entity == self_id:
             return await _with_floodwait(client.get_input_entity, "me")
+        cache = getattr(client, _ENTITY_CACHE_ATTR, None)
+        if isinstance(cache, EntityCache):
+            peer = cache.get_peer(self_id, entity)
+            if peer is None:
+                peer = await _with_floodwait(client.get_input_entity, entity)
+                cache.put_peer(self_id, entity, peer)
+            return peer
     return await _with_floodwait(client.get_input_entity, entity)
 
 
@@ -1397,8 +2902,9 @@ async def _get_self_id(client: TelegramClient) -> int:
     cached = getattr(client, "_tgwatch_self_id", None)
     if cached is not None:
         return cached
-    me = await _with_floodwait(client.get_me)
-    cached = int(getattr(me, "id"))
+    # input_peer=True is answered from Telethon's own cache once logged in.
+    me = await _with_floodwait(client.get_me, input_peer=True)
+    cached = int(getattr(me, "user_id", None) or getattr(me, "id"))
     setattr(client, "_tgwatch_self_id", cached)
     return cached
 
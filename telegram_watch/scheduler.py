@@ -0,0 +1,133 @@
+"""Single scheduler for the daemon's periodic jobs."""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta, tzinfo
+from pathlib import Path
+from typing import Awaitable, Callable
+
+from .storage import db_session, fetch_schedule, store_schedule
+from .timeutils import utc_now
+from .watchdog import task_context
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Job:
+    """A periodic job.
+
+    `run(since, until)` receives the end of the job's last successful run (or
+    the first time it was scheduled) and the current time, so a job that was
+    missed during downtime covers the whole gap in one call.
+    """
+
+    name: str
+    interval: timedelta
+    run: Callable[[datetime, datetime], Awaitable[None]]
+    align: bool = True
+    offset: timedelta = timedelta(0)
+    priority: int = 1
+
+
+class Scheduler:
+    """Drives every job from one task using a heap of next-run times.
+
+    Next-run and last-run timestamps are persisted, so intervals survive
+    restarts. Aligned jobs fire on wall-clock boundaries of their interval
+    (counted from local midnight) plus a per-job offset used to stagger jobs
+    that share an interval. Jobs overdue at startup run once immediately, in
+    priority order.
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        jobs: list[Job],
+        *,
+        timezone: tzinfo,
+        clock: Callable[[], datetime] = utc_now,
+    ) -> None:
+        self._db_path = db_path
+        self._jobs = {job.name: job for job in jobs}
+        self._timezone = timezone
+        self._clock = clock
+        self._last_run: dict[str, datetime] = {}
+        self._heap: list[tuple[datetime, int, str]] = []
+        self._stop = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def load(self) -> None:
+        now = self._clock()
+        with db_session(self._db_path) as conn:
+            state = fetch_schedule(conn)
+            for job in self._jobs.values():
+                last_run, next_run = state.get(job.name, (None, None))
+                if last_run is None:
+                    last_run = now
+                if next_run is None:
+                    next_run = self.next_run_after(job, now)
+                    store_schedule(conn, job.name, last_run, next_run)
+                self._last_run[job.name] = last_run
+                heapq.heappush(self._heap, (max(next_run, now), job.priority, job.name))
+
+    def next_run_after(self, job: Job, moment: datetime) -> datetime:
+        if not job.align:
+            return moment + job.interval + job.offset
+        local = moment.astimezone(self._timezone)
+        midnight = local.replace(hour=0, minute=0, second=0, microsecond=0)
+        interval = job.interval.total_seconds()
+        elapsed = (local - midnight).total_seconds() - job.offset.total_seconds()
+        slots = int(elapsed // interval) + 1
+        candidate = midnight + timedelta(seconds=slots * interval) + job.offset
+        return candidate.astimezone(moment.tzinfo)
+
+    def start(self) -> None:
+        self.load()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self) -> None:
+        while not self._stop.is_set() and self._heap:
+            due_at = self._heap[0][0]
+            delay = (due_at - self._clock()).total_seconds()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._stop.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self.run_due()
+
+    async def run_due(self) -> None:
+        """Run every job whose next-run time has passed."""
+        while self._heap and self._heap[0][0] <= self._clock():
+            _due_at, _priority, name = heapq.heappop(self._heap)
+            job = self._jobs[name]
+            now = self._clock()
+            since = self._last_run[name]
+            try:
+                with task_context(f"job {name}"):
+                    await job.run(since, now)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Scheduled job '%s' failed; will retry next run.", name)
+            else:
+                self._last_run[name] = now
+            next_run = self.next_run_after(job, now)
+            with db_session(self._db_path) as conn:
+                store_schedule(conn, name, self._last_run[name], next_run)
+            heapq.heappush(self._heap, (next_run, job.priority, name))
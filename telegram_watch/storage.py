@@ -6,8 +6,9 @@ from contextlib import contextmanager
 from dataclasses import dataclass
 from datetime import datetime, timezone
 from pathlib import Path
+import json
 import sqlite3
-from typing import Iterable, Iterator, Sequence
+from typing import Any, Iterable, Iterator, Sequence
 
 
 @dataclass
@@ -19,6 +20,12 @@ class StoredMedia:
     file_size: int | None
     media_index: int
     is_reply: bool = False
+    source_message_id: int | None = None
+    media_kind: str | None = None
+    width: int | None = None
+    height: int | None = None
+    telegram_media_id: int | None = None
+    thumb_path: str | None = None
 
 
 @dataclass
@@ -41,6 +48,17 @@ class DbMedia:
     mime_type: str | None
     file_size: int | None
     is_reply: bool
+    source_message_id: int | None = None
+    media_kind: str | None = None
+    width: int | None = None
+    height: int | None = None
+    telegram_media_id: int | None = None
+    thumb_path: str | None = None
+
+    @property
+    def is_deferred(self) -> bool:
+        """True while only metadata is stored and the bytes are not on disk yet."""
+        return not self.file_path
 
 
 @dataclass
@@ -57,6 +75,46 @@ class DbMessage:
     media: list[DbMedia]
 
 
+@dataclass
+class UploadedFile:
+    """A file already on Telegram's servers, reusable by the same account."""
+
+    account_id: int
+    sha256: str
+    kind: str
+    media_id: int
+    access_hash: int
+    file_reference: bytes | None
+    file_size: int | None
+
+
+@dataclass
+class CachedPeer:
+    """An input peer as resolved by one account (access hashes are per account)."""
+
+    account_id: int
+    peer_id: int
+    peer_type: str
+    raw_id: int
+    access_hash: int | None
+
+
+@dataclass
+class OutboxEntry:
+    """One planned control-chat delivery with its rendered payload."""
+
+    idempotency_key: str
+    control_chat_id: int
+    reply_to: int | None
+    kind: str
+    payload: dict[str, Any]
+    id: int | None = None
+    status: str = "pending"
+    attempts: int = 0
+    next_attempt_at: datetime | None = None
+    last_error: str | None = None
+
+
 def connect(db_path: Path) -> sqlite3.Connection:
     db_path.parent.mkdir(parents=True, exist_ok=True)
     conn = sqlite3.connect(db_path)
@@ -97,9 +155,62 @@ def ensure_schema(conn: sqlite3.Connection) -> None:
             ON messages(sender_id, date);
         CREATE INDEX IF NOT EXISTS idx_messages_date
             ON messages(date);
+
+        CREATE TABLE IF NOT EXISTS uploaded_files (
+            account_id INTEGER NOT NULL,
+            sha256 TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            media_id INTEGER NOT NULL,
+            access_hash INTEGER NOT NULL,
+            file_reference BLOB,
+            file_size INTEGER,
+            stored_at TEXT,
+            PRIMARY KEY (account_id, sha256)
+        );
+
+        CREATE TABLE IF NOT EXISTS entity_cache (
+            account_id INTEGER NOT NULL,
+            peer_id INTEGER NOT NULL,
+            peer_type TEXT NOT NULL,
+            raw_id INTEGER NOT NULL,
+            access_hash INTEGER,
+            PRIMARY KEY (account_id, peer_id)
+        );
+
+        CREATE TABLE IF NOT EXISTS username_cache (
+            username TEXT PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            resolved_at TEXT
+        );
+
+        CREATE TABLE IF NOT EXISTS outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            idempotency_key TEXT NOT NULL UNIQUE,
+            control_chat_id INTEGER NOT NULL,
+            reply_to INTEGER,
+            kind TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at TEXT NOT NULL,
+            last_error TEXT,
+            created_at TEXT NOT NULL,
+            sent_at TEXT
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_outbox_status
+            ON outbox(status, id);
+
+        CREATE TABLE IF NOT EXISTS schedule (
+            job TEXT PRIMARY KEY,
+            last_run_at TEXT,
+            next_run_at TEXT
+        );
         """
     )
     _ensure_media_columns(conn)
+    _ensure_uploaded_file_columns(conn)
+    _ensure_username_cache_columns(conn)
 
 
 def _ensure_media_columns(conn: sqlite3.Connection) -> None:
@@ -109,6 +220,40 @@ def _ensure_media_columns(conn: sqlite3.Connection) -> None:
     }
     if "is_reply" not in columns:
         conn.execute("ALTER TABLE media ADD COLUMN is_reply INTEGER NOT NULL DEFAULT 0")
+    for name, ddl in _EXTRA_MEDIA_COLUMNS:
+        if name not in columns:
+            conn.execute(f"ALTER TABLE media ADD COLUMN {name} {ddl}")
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_media_telegram_media_id ON media(telegram_media_id)"
+    )
+
+
+def _ensure_uploaded_file_columns(conn: sqlite3.Connection) -> None:
+    columns = {
+        row["name"]
+        for row in conn.execute("PRAGMA table_info(uploaded_files)").fetchall()
+    }
+    if "stored_at" not in columns:
+        conn.execute("ALTER TABLE uploaded_files ADD COLUMN stored_at TEXT")
+
+
+def _ensure_username_cache_columns(conn: sqlite3.Connection) -> None:
+    columns = {
+        row["name"]
+        for row in conn.execute("PRAGMA table_info(username_cache)").fetchall()
+    }
+    if "resolved_at" not in columns:
+        conn.execute("ALTER TABLE username_cache ADD COLUMN resolved_at TEXT")
+
+
+_EXTRA_MEDIA_COLUMNS: tuple[tuple[str, str], ...] = (
+    ("source_message_id", "INTEGER"),
+    ("media_kind", "TEXT"),
+    ("width", "INTEGER"),
+    ("height", "INTEGER"),
+    ("telegram_media_id", "INTEGER"),
+    ("thumb_path", "TEXT"),
+)
 
 
 def persist_message(
@@ -145,16 +290,38 @@ def persist_message(
             """,
             values,
         )
+        # Re-captures (`once`, backfill) see deferred media again with an empty
+        # path; keep paths that were already downloaded instead of resetting them.
         conn.execute(
-            "DELETE FROM media WHERE chat_id = ? AND message_id = ?",
-            (message.chat_id, message.message_id),
+            f"""
+            DELETE FROM media
+            WHERE chat_id = ? AND message_id = ?
+              AND media_index NOT IN ({",".join("?" for _ in media_items)})
+            """,
+            (message.chat_id, message.message_id, *(media.media_index for media in media_items)),
         )
         for media in media_items:
             conn.execute(
                 """
                 INSERT INTO media (
-                    chat_id, message_id, media_index, file_path, mime_type, file_size, is_reply
-                ) VALUES (?, ?, ?, ?, ?, ?, ?)
+                    chat_id, message_id, media_index, file_path, mime_type, file_size, is_reply,
+                    source_message_id, media_kind, width, height, telegram_media_id, thumb_path
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(chat_id, message_id, media_index) DO UPDATE SET
+                    file_path=COALESCE(NULLIF(excluded.file_path, ''), media.file_path),
+                    mime_type=excluded.mime_type,
+                    file_size=CASE
+                        WHEN excluded.file_path = '' AND media.file_path != ''
+                        THEN media.file_size
+                        ELSE excluded.file_size
+                    END,
+                    is_reply=excluded.is_reply,
+                    source_message_id=excluded.source_message_id,
+                    media_kind=excluded.media_kind,
+                    width=excluded.width,
+                    height=excluded.height,
+                    telegram_media_id=excluded.telegram_media_id,
+                    thumb_path=COALESCE(NULLIF(excluded.thumb_path, ''), media.thumb_path)
                 """,
                 (
                     media.chat_id,
@@ -164,10 +331,337 @@ def persist_message(
                     media.mime_type,
                     media.file_size,
                     1 if media.is_reply else 0,
+                    media.source_message_id,
+                    media.media_kind,
+                    media.width,
+                    media.height,
+                    media.telegram_media_id,
+                    media.thumb_path,
                 ),
             )
 
 
+def find_media_paths(conn: sqlite3.Connection, telegram_media_id: int) -> list[str]:
+    """Local files already downloaded for the Telegram photo/document `telegram_media_id`."""
+    rows = conn.execute(
+        """
+        SELECT DISTINCT file_path
+        FROM media
+        WHERE telegram_media_id = ? AND file_path != ''
+        """,
+        (telegram_media_id,),
+    ).fetchall()
+    return [row["file_path"] for row in rows]
+
+
+def mark_media_downloaded(
+    conn: sqlite3.Connection,
+    chat_id: int,
+    message_id: int,
+    media_index: int,
+    file_path: str,
+    file_size: int | None,
+) -> None:
+    """Record the local path of a deferred media item once its bytes are fetched."""
+    with conn:
+        conn.execute(
+            """
+            UPDATE media
+            SET file_path = ?, file_size = COALESCE(?, file_size)
+            WHERE chat_id = ? AND message_id = ? AND media_index = ?
+            """,
+            (file_path, file_size, chat_id, message_id, media_index),
+        )
+
+
+def fetch_uploaded_file(
+    conn: sqlite3.Connection,
+    account_id: int,
+    sha256: str,
+) -> UploadedFile | None:
+    row = conn.execute(
+        "SELECT * FROM uploaded_files WHERE account_id = ? AND sha256 = ?",
+        (account_id, sha256),
+    ).fetchone()
+    if row is None:
+        return None
+    return UploadedFile(
+        account_id=row["account_id"],
+        sha256=row["sha256"],
+        kind=row["kind"],
+        media_id=row["media_id"],
+        access_hash=row["access_hash"],
+        file_reference=row["file_reference"],
+        file_size=row["file_size"],
+    )
+
+
+def store_uploaded_file(
+    conn: sqlite3.Connection,
+    record: UploadedFile,
+    now: datetime,
+) -> None:
+    with conn:
+        conn.execute(
+            """
+            INSERT OR REPLACE INTO uploaded_files (
+                account_id, sha256, kind, media_id, access_hash, file_reference, file_size,
+                stored_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                record.account_id,
+                record.sha256,
+                record.kind,
+                record.media_id,
+                record.access_hash,
+                record.file_reference,
+                record.file_size,
+                _serialize_dt(now),
+            ),
+        )
+
+
+def delete_uploaded_file(conn: sqlite3.Connection, account_id: int, sha256: str) -> None:
+    with conn:
+        conn.execute(
+            "DELETE FROM uploaded_files WHERE account_id = ? AND sha256 = ?",
+            (account_id, sha256),
+        )
+
+
+def purge_uploaded_files(conn: sqlite3.Connection, before: datetime) -> int:
+    """Delete upload handles recorded before `before`; their media is past retention too."""
+    with conn:
+        cursor = conn.execute(
+            "DELETE FROM uploaded_files WHERE stored_at IS NULL OR stored_at < ?",
+            (_serialize_dt(before),),
+        )
+    return cursor.rowcount
+
+
+def fetch_cached_peers(conn: sqlite3.Connection, account_id: int) -> list[CachedPeer]:
+    rows = conn.execute(
+        "SELECT * FROM entity_cache WHERE account_id = ?",
+        (account_id,),
+    ).fetchall()
+    return [
+        CachedPeer(
+            account_id=row["account_id"],
+            peer_id=row["peer_id"],
+            peer_type=row["peer_type"],
+            raw_id=row["raw_id"],
+            access_hash=row["access_hash"],
+        )
+        for row in rows
+    ]
+
+
+def store_cached_peer(conn: sqlite3.Connection, peer: CachedPeer) -> None:
+    with conn:
+        conn.execute(
+            """
+            INSERT OR REPLACE INTO entity_cache (
+                account_id, peer_id, peer_type, raw_id, access_hash
+            ) VALUES (?, ?, ?, ?, ?)
+            """,
+            (peer.account_id, peer.peer_id, peer.peer_type, peer.raw_id, peer.access_hash),
+        )
+
+
+def fetch_cached_usernames(
+    conn: sqlite3.Connection, since: datetime
+) -> dict[str, tuple[int, datetime]]:
+    """Usernames resolved at or after `since`, with the id and time they resolved to.
+
+    Rows from before resolution times were recorded count as expired.
+    """
+    rows = conn.execute(
+        "SELECT username, user_id, resolved_at FROM username_cache WHERE resolved_at >= ?",
+        (_serialize_dt(since),),
+    ).fetchall()
+    return {
+        row["username"]: (row["user_id"], _deserialize_dt(row["resolved_at"])) for row in rows
+    }
+
+
+def store_cached_username(
+    conn: sqlite3.Connection, username: str, user_id: int, now: datetime
+) -> None:
+    with conn:
+        conn.execute(
+            """
+            INSERT OR REPLACE INTO username_cache (username, user_id, resolved_at)
+            VALUES (?, ?, ?)
+            """,
+            (username, user_id, _serialize_dt(now)),
+        )
+
+
+def delete_cached_username(conn: sqlite3.Connection, username: str) -> None:
+    with conn:
+        conn.execute("DELETE FROM username_cache WHERE username = ?", (username,))
+
+
+def enqueue_outbox(
+    conn: sqlite3.Connection,
+    entries: Sequence[OutboxEntry],
+    now: datetime,
+) -> int:
+    """Insert entries atomically; keys already queued are ignored. Returns rows added."""
+    added = 0
+    with conn:
+        for entry in entries:
+            cursor = conn.execute(
+                """
+                INSERT OR IGNORE INTO outbox (
+                    idempotency_key, control_chat_id, reply_to, kind, payload,
+                    next_attempt_at, created_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    entry.idempotency_key,
+                    entry.control_chat_id,
+                    entry.reply_to,
+                    entry.kind,
+                    json.dumps(entry.payload),
+                    _serialize_dt(now),
+                    _serialize_dt(now),
+                ),
+            )
+            added += cursor.rowcount
+    return added
+
+
+def fetch_pending_outbox(conn: sqlite3.Connection, *, limit: int = 500) -> list[OutboxEntry]:
+    rows = conn.execute(
+        "SELECT * FROM outbox WHERE status = 'pending' ORDER BY id ASC LIMIT ?",
+        (limit,),
+    ).fetchall()
+    return [
+        OutboxEntry(
+            id=row["id"],
+            idempotency_key=row["idempotency_key"],
+            control_chat_id=row["control_chat_id"],
+            reply_to=row["reply_to"],
+            kind=row["kind"],
+            payload=json.loads(row["payload"]),
+            status=row["status"],
+            attempts=row["attempts"],
+            next_attempt_at=_deserialize_dt(row["next_attempt_at"]),
+            last_error=row["last_error"],
+        )
+        for row in rows
+    ]
+
+
+def mark_outbox_sent(conn: sqlite3.Connection, entry_id: int, when: datetime) -> None:
+    with conn:
+        conn.execute(
+            "UPDATE outbox SET status = 'sent', sent_at = ?, attempts = attempts + 1 WHERE id = ?",
+            (_serialize_dt(when), entry_id),
+        )
+
+
+def mark_outbox_failed(
+    conn: sqlite3.Connection,
+    entry_id: int,
+    error: str,
+    *,
+    retry_at: datetime | None,
+) -> None:
+    """Record a failed attempt; `retry_at=None` gives up on the entry."""
+    with conn:
+        if retry_at is None:
+            conn.execute(
+                """
+                UPDATE outbox SET status = 'failed', last_error = ?, attempts = attempts + 1
+                WHERE id = ?
+                """,
+                (error, entry_id),
+            )
+        else:
+            conn.execute(
+                """
+                UPDATE outbox SET last_error = ?, attempts = attempts + 1, next_attempt_at = ?
+                WHERE id = ?
+                """,
+                (error, _serialize_dt(retry_at), entry_id),
+            )
+
+
+def purge_outbox(conn: sqlite3.Connection, before: datetime) -> int:
+    """Delete delivered or abandoned entries created before `before`."""
+    with conn:
+        cursor = conn.execute(
+            "DELETE FROM outbox WHERE status != 'pending' AND created_at < ?",
+            (_serialize_dt(before),),
+        )
+    return cursor.rowcount
+
+
+def fetch_schedule(
+    conn: sqlite3.Connection,
+) -> dict[str, tuple[datetime | None, datetime | None]]:
+    rows = conn.execute("SELECT job, last_run_at, next_run_at FROM schedule").fetchall()
+    return {
+        row["job"]: (
+            _deserialize_dt(row["last_run_at"]) if row["last_run_at"] else None,
+            _deserialize_dt(row["next_run_at"]) if row["next_run_at"] else None,
+        )
+        for row in rows
+    }
+
+
+def store_schedule(
+    conn: sqlite3.Connection,
+    job: str,
+    last_run_at: datetime | None,
+    next_run_at: datetime | None,
+) -> None:
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO schedule (job, last_run_at, next_run_at) VALUES (?, ?, ?)",
+            (
+                job,
+                _serialize_dt(last_run_at) if last_run_at else None,
+                _serialize_dt(next_run_at) if next_run_at else None,
+            ),
+        )
+
+
+def fetch_message_ids_since(
+    conn: sqlite3.Connection,
+    chat_id: int,
+    since: datetime,
+) -> set[int]:
+    rows = conn.execute(
+        "SELECT message_id FROM messages WHERE chat_id = ? AND date >= ?",
+        (chat_id, _serialize_dt(since)),
+    ).fetchall()
+    return {row["message_id"] for row in rows}
+
+
+def fetch_messages_by_id(
+    conn: sqlite3.Connection,
+    message_id: int,
+    *,
+    chat_ids: Iterable[int] | None = None,
+) -> list[DbMessage]:
+    params: list[object] = [message_id]
+    query = "SELECT * FROM messages WHERE message_id = ?"
+    if chat_ids:
+        chat_ids = tuple(chat_ids)
+        placeholders = ",".join("?" for _ in chat_ids)
+        query += f" AND chat_id IN ({placeholders})"
+        params.extend(chat_ids)
+    query += " ORDER BY chat_id ASC"
+    rows = conn.execute(query, params).fetchall()
+    messages = [_row_to_db_message(row) for row in rows]
+    _attach_media(conn, messages)
+    return messages
+
+
 def fetch_messages_between(
     conn: sqlite3.Connection,
     sender_ids: Iterable[int],
@@ -352,6 +846,12 @@ def _attach_media(conn: sqlite3.Connection, messages: list[DbMessage]) -> None:
             mime_type=row["mime_type"],
             file_size=row["file_size"],
             is_reply=bool(row["is_reply"]),
+            source_message_id=row["source_message_id"],
+            media_kind=row["media_kind"],
+            width=row["width"],
+            height=row["height"],
+            telegram_media_id=row["telegram_media_id"],
+            thumb_path=row["thumb_path"],
         )
         media_by_key.setdefault(key, []).append(media)
     for message in messages:
@@ -0,0 +1,181 @@
+"""Per-message lifecycle spans, written as JSON lines for `tgwatch trace`.
+
+Each line is one span: the stage name, its wall-clock start, its duration in
+milliseconds and the `(chat_id, message_id)` keys it worked on. Capture stages
+cover one message; rendering and control-chat delivery cover every message in
+the batch, so a message's end-to-end latency is the time from its first span
+starting to its last `deliver` span ending.
+
+Tracing is off unless `TRACER.open()` has been called; a disabled span is a
+shared no-op context manager.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import json
+import time
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, Any, ContextManager, Iterable, Iterator, Sequence
+
+from .metrics import percentile
+
+TraceKey = tuple[int, int]
+
+_FLUSH_EVERY = 100
+_NULL = nullcontext()
+_CURRENT: contextvars.ContextVar[tuple[TraceKey, ...]] = contextvars.ContextVar(
+    "tgwatch_trace_keys", default=()
+)
+
+
+class Tracer:
+    def __init__(self) -> None:
+        self.path: Path | None = None
+        self.count = 0
+        self._fh: IO[str] | None = None
+        self._pending = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._fh is not None
+
+    def open(self, path: Path) -> None:
+        self.close()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.count = 0
+        self._fh = path.open("a", encoding="utf-8")
+
+    def close(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+    def bind(self, chat_id: int, message_id: int) -> ContextManager[None]:
+        """Make nested spans in this task default to one message's key."""
+        if self._fh is None:
+            return _NULL
+        return self._bind(((int(chat_id), int(message_id)),))
+
+    def span(self, stage: str, keys: Iterable[TraceKey] | None = None) -> ContextManager[None]:
+        """Time the enclosed block as `stage` for `keys` (or the bound message)."""
+        if self._fh is None:
+            return _NULL
+        return self._span(stage, tuple(keys) if keys is not None else _CURRENT.get())
+
+    @contextmanager
+    def _bind(self, keys: tuple[TraceKey, ...]) -> Iterator[None]:
+        token = _CURRENT.set(keys)
+        try:
+            yield
+        finally:
+            _CURRENT.reset(token)
+
+    @contextmanager
+    def _span(self, stage: str, keys: tuple[TraceKey, ...]) -> Iterator[None]:
+        wall = time.time()
+        start = time.perf_counter()
+        error = False
+        try:
+            yield
+        except BaseException:
+            error = True
+            raise
+        finally:
+            self._write(stage, wall, (time.perf_counter() - start) * 1000, keys, error)
+
+    def _write(
+        self,
+        stage: str,
+        wall: float,
+        duration_ms: float,
+        keys: tuple[TraceKey, ...],
+        error: bool,
+    ) -> None:
+        if self._fh is None:
+            return
+        line: dict[str, Any] = {
+            "stage": stage,
+            "start": round(wall, 6),
+            "ms": round(duration_ms, 3),
+            "keys": [list(key) for key in keys],
+        }
+        if error:
+            line["error"] = True
+        self._fh.write(json.dumps(line, separators=(",", ":")) + "\n")
+        self.count += 1
+        self._pending += 1
+        if self._pending >= _FLUSH_EVERY:
+            self._fh.flush()
+            self._pending = 0
+
+
+TRACER = Tracer()
+
+
+@dataclass
+class StageSummary:
+    stage: str
+    count: int
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+
+
+def summarize_trace(path: Path) -> list[StageSummary]:
+    """Latency percentiles per stage, plus `end_to_end` for delivered messages."""
+    durations: dict[str, list[float]] = {}
+    first_start: dict[TraceKey, float] = {}
+    delivered_at: dict[TraceKey, float] = {}
+    with path.open("r", encoding="utf-8") as fh:
+        for raw in fh:
+            raw = raw.strip()
+            if not raw:
+                continue
+            span = json.loads(raw)
+            stage = str(span["stage"])
+            start = float(span["start"])
+            duration = float(span["ms"])
+            durations.setdefault(stage, []).append(duration)
+            for chat_id, message_id in span.get("keys", ()):
+                key = (int(chat_id), int(message_id))
+                if key not in first_start or start < first_start[key]:
+                    first_start[key] = start
+                if stage == "deliver":
+                    end = start + duration / 1000
+                    delivered_at[key] = max(end, delivered_at.get(key, end))
+    end_to_end = [
+        (end - first_start[key]) * 1000 for key, end in delivered_at.items() if key in first_start
+    ]
+    if end_to_end:
+        durations["end_to_end"] = end_to_end
+    return [_stage_summary(stage, values) for stage, values in durations.items()]
+
+
+def format_trace_summary(summaries: Sequence[StageSummary]) -> str:
+    if not summaries:
+        return "trace: no spans recorded"
+    width = max(len(summary.stage) for summary in summaries)
+    lines = [f"{'stage':<{width}}  {'count':>7}  {'p50 ms':>9}  {'p95 ms':>9}  {'p99 ms':>9}  {'max ms':>9}"]
+    for summary in summaries:
+        lines.append(
+            f"{summary.stage:<{width}}  {summary.count:>7}  {summary.p50_ms:>9.1f}  "
+            f"{summary.p95_ms:>9.1f}  {summary.p99_ms:>9.1f}  {summary.max_ms:>9.1f}"
+        )
+    return "\n".join(lines)
+
+
+def _stage_summary(stage: str, values: list[float]) -> StageSummary:
+    values.sort()
+    return StageSummary(
+        stage=stage,
+        count=len(values),
+        p50_ms=percentile(values, 50),
+        p95_ms=percentile(values, 95),
+        p99_ms=percentile(values, 99),
+        max_ms=values[-1],
+    )
@@ -0,0 +1,152 @@
+"""Reuse files already uploaded to Telegram instead of sending the bytes again."""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+
+from telethon.tl import types
+
+from .storage import (
+    UploadedFile,
+    db_session,
+    delete_uploaded_file,
+    fetch_uploaded_file,
+    store_uploaded_file,
+)
+from .timeutils import utc_now
+
+logger = logging.getLogger(__name__)
+
+_HASH_CHUNK = 1024 * 1024
+
+
+@dataclass
+class UploadStats:
+    uploads: int = 0
+    reuses: int = 0
+    bytes_uploaded: int = 0
+    bytes_saved: int = 0
+
+
+class UploadCache:
+    """Maps file content to the photo/document Telegram created for it.
+
+    Handles come from messages we already sent, so they are only valid for the
+    account that sent them; entries are keyed by (account id, sha256) and
+    persisted in SQLite so they survive restarts. Telegram may expire a stored
+    file reference, in which case the caller drops the entry and uploads again.
+
+    Only files under `media_dir` (captured media, re-sent by summaries, topic
+    reports and `/export`) are cached; one-off uploads such as report documents
+    are sent as-is. In-memory lookups are LRUs of `max_entries` items.
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        *,
+        media_dir: Path | None = None,
+        max_entries: int = 4096,
+    ) -> None:
+        self._db_path = db_path
+        self._media_dir = media_dir.resolve() if media_dir is not None else None
+        self._max_entries = max_entries
+        self._handles: OrderedDict[tuple[int, str], UploadedFile] = OrderedDict()
+        self._digests: OrderedDict[tuple[str, int, int], str] = OrderedDict()
+        self.stats = UploadStats()
+
+    def accepts(self, path: Path) -> bool:
+        """True if `path` is worth hashing and recording (no `media_dir`: any file)."""
+        return self._media_dir is None or path.resolve().is_relative_to(self._media_dir)
+
+    async def digest(self, path: Path) -> str:
+        stat = path.stat()
+        key = (str(path), stat.st_size, stat.st_mtime_ns)
+        cached = self._digests.get(key)
+        if cached is None:
+            cached = await asyncio.to_thread(_sha256_file, path)
+        self._put(self._digests, key, cached)
+        return cached
+
+    def lookup(self, account_id: int, sha256: str) -> types.TypeInputMedia | None:
+        record = self._handles.get((account_id, sha256))
+        if record is None:
+            with db_session(self._db_path) as conn:
+                record = fetch_uploaded_file(conn, account_id, sha256)
+            if record is None:
+                return None
+        self._put(self._handles, (account_id, sha256), record)
+        return _input_media(record)
+
+    def remember(self, account_id: int, sha256: str, sent_message: object, file_size: int) -> None:
+        photo = getattr(sent_message, "photo", None)
+        document = getattr(sent_message, "document", None)
+        source = photo if photo is not None else document
+        if source is None or getattr(source, "access_hash", None) is None:
+            return
+        record = UploadedFile(
+            account_id=account_id,
+            sha256=sha256,
+            kind="photo" if photo is not None else "document",
+            media_id=int(source.id),
+            access_hash=int(source.access_hash),
+            file_reference=bytes(getattr(source, "file_reference", b"") or b""),
+            file_size=file_size,
+        )
+        self._put(self._handles, (account_id, sha256), record)
+        with db_session(self._db_path) as conn:
+            store_uploaded_file(conn, record, utc_now())
+
+    def forget(self, account_id: int, sha256: str) -> None:
+        self._handles.pop((account_id, sha256), None)
+        with db_session(self._db_path) as conn:
+            delete_uploaded_file(conn, account_id, sha256)
+
+    def _put(self, entries: OrderedDict, key: object, value: object) -> None:
+        entries[key] = value
+        entries.move_to_end(key)
+        while len(entries) > self._max_entries:
+            entries.popitem(last=False)
+
+    def record_upload(self, size: int) -> None:
+        self.stats.uploads += 1
+        self.stats.bytes_uploaded += size
+
+    def record_reuse(self, size: int) -> None:
+        self.stats.reuses += 1
+        self.stats.bytes_saved += size
+
+    def log_summary(self) -> None:
+        if not self.stats.uploads and not self.stats.reuses:
+            return
+        logger.info(
+            "Uploads: %s file(s), %s byte(s) sent; %s reuse(s) saved %s byte(s)",
+            self.stats.uploads,
+            self.stats.bytes_uploaded,
+            self.stats.reuses,
+            self.stats.bytes_saved,
+        )
+
+
+def _input_media(record: UploadedFile) -> types.TypeInputMedia:
+    file_reference = record.file_reference or b""
+    if record.kind == "photo":
+        return types.InputMediaPhoto(
+            types.InputPhoto(record.media_id, record.access_hash, file_reference)
+        )
+    return types.InputMediaDocument(
+        types.InputDocument(record.media_id, record.access_hash, file_reference)
+    )
+
+
+def _sha256_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as handle:
+        for chunk in iter(lambda: handle.read(_HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
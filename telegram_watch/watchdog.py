@@ -0,0 +1,178 @@
+"""Detect event-loop stalls and name the blocking call.
+
+A task on the loop stamps a heartbeat every few milliseconds; a separate
+thread checks the stamp. When the loop has not run for longer than the
+threshold, the thread grabs the loop thread's current stack (which is, by
+definition, the synchronous code blocking it), logs it together with what the
+running task was doing, and counts the stall against the innermost
+telegram-watch frame in `metrics.LOOP_STALLS`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import inspect
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from contextlib import contextmanager, nullcontext
+from types import FrameType
+from typing import ContextManager, Iterator
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+_PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Labels keyed by the frame of each labelled task's coroutine. They are written
+# on the loop thread; the watchdog thread only matches them against the frames
+# of the blocked stack, so it never calls into asyncio from another thread.
+_FRAME_CONTEXT: dict[FrameType, str] = {}
+_NULL = nullcontext()
+_running = 0
+
+
+def task_context(label: str) -> ContextManager[None]:
+    """Describe what the current task is doing, for stall reports.
+
+    A no-op unless a watchdog is running, so hot paths can always call it.
+    """
+    if not _running:
+        return _NULL
+    return _task_context(label)
+
+
+@contextmanager
+def _task_context(label: str) -> Iterator[None]:
+    task = asyncio.current_task()
+    frame = getattr(task.get_coro(), "cr_frame", None) if task is not None else None
+    if frame is None:
+        yield
+        return
+    previous = _FRAME_CONTEXT.get(frame)
+    _FRAME_CONTEXT[frame] = label
+    try:
+        yield
+    finally:
+        if previous is None:
+            _FRAME_CONTEXT.pop(frame, None)
+        else:
+            _FRAME_CONTEXT[frame] = previous
+
+
+class StallWatchdog:
+    def __init__(
+        self,
+        threshold: float = 0.5,
+        *,
+        tick_interval: float = 0.05,
+    ) -> None:
+        self.threshold = threshold
+        self.tick_interval = tick_interval
+        self.stalls = 0
+        self._last_tick = time.monotonic()
+        self._loop_thread: int | None = None
+        self._tick_task: asyncio.Task | None = None
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+
+    def start(self) -> None:
+        global _running
+        _running += 1
+        self._loop_thread = threading.get_ident()
+        self._last_tick = time.monotonic()
+        self._tick_task = asyncio.create_task(self._tick())
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name="tgwatch-watchdog", daemon=True)
+        self._thread.start()
+
+    async def stop(self) -> None:
+        global _running
+        if self._thread is None:
+            return
+        _running -= 1
+        self._stop.set()
+        if self._tick_task:
+            self._tick_task.cancel()
+            try:
+                await self._tick_task
+            except asyncio.CancelledError:
+                pass
+        await asyncio.to_thread(self._thread.join)
+        self._thread = None
+
+    async def _tick(self) -> None:
+        while True:
+            self._last_tick = time.monotonic()
+            await asyncio.sleep(self.tick_interval)
+
+    def _watch(self) -> None:
+        # The budget covers the heartbeat's own sleep, so only lag beyond it counts.
+        budget = self.threshold + self.tick_interval
+        reported: float | None = None
+        while not self._stop.wait(min(self.tick_interval, self.threshold / 2)):
+            last_tick = self._last_tick
+            blocked = time.monotonic() - last_tick
+            if blocked <= budget:
+                if reported is not None:
+                    logger.warning(
+                        "Event loop was blocked for %.0f ms", (time.monotonic() - reported) * 1000
+                    )
+                    reported = None
+                continue
+            if reported is None:
+                # One report per stall: it continues until the next heartbeat.
+                reported = last_tick
+                self._report(blocked)
+
+    def _report(self, blocked: float) -> None:
+        frame = sys._current_frames().get(self._loop_thread or 0)
+        if frame is None:
+            return
+        site = call_site(frame)
+        context = running_context(frame)
+        self.stalls += 1
+        metrics.LOOP_STALLS.inc(site=site)
+        logger.warning(
+            "Event loop blocked for %.0f ms at %s (%s)\n%s",
+            blocked * 1000,
+            site,
+            context,
+            "".join(traceback.format_stack(frame)).rstrip(),
+        )
+
+
+def running_context(frame: FrameType) -> str:
+    """What the task blocked at `frame` was doing, from its stack alone."""
+    outermost: FrameType | None = None
+    current: FrameType | None = frame
+    while current is not None:
+        label = _FRAME_CONTEXT.get(current)
+        if label:
+            return label
+        if current.f_code.co_flags & inspect.CO_COROUTINE:
+            outermost = current
+        current = current.f_back
+    if outermost is None:
+        return "loop callback"
+    return f"task {outermost.f_code.co_qualname}"
+
+
+def call_site(frame: FrameType) -> str:
+    """Innermost telegram-watch frame of the stack, else the innermost frame."""
+    innermost = frame
+    current: FrameType | None = frame
+    while current is not None:
+        filename = os.path.abspath(current.f_code.co_filename)
+        if filename.startswith(_PACKAGE_DIR) and filename != os.path.abspath(__file__):
+            return _label(current)
+        current = current.f_back
+    return _label(innermost)
+
+
+def _label(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{frame.f_lineno} {code.co_name}"
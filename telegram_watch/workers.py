@@ -0,0 +1,205 @@
+"""Multi-process sharding for `tgwatch run --workers N`."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+import signal
+from dataclasses import dataclass, replace
+from multiprocessing.connection import wait
+from pathlib import Path
+from types import MappingProxyType
+from typing import Callable, Mapping, Sequence
+
+from .config import Config, TargetGroupConfig, load_config
+from .ratelimit import DEFAULT_RATES
+from .storage import db_session
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Shard:
+    """Position of one worker process among `count` workers.
+
+    Worker 0 is the primary: besides its share of targets it owns the control
+    chats (commands, outbox delivery, heartbeat, retention). Other workers only
+    capture and summarize their targets; their deliveries go through the shared
+    SQLite outbox, which the primary drains.
+    """
+
+    index: int
+    count: int
+
+    @property
+    def is_primary(self) -> bool:
+        return self.index == 0
+
+
+def partition_targets(
+    targets: Sequence[TargetGroupConfig], count: int
+) -> list[tuple[TargetGroupConfig, ...]]:
+    """Split targets over `count` shards, balancing by tracked user count.
+
+    Deterministic for a given config, so every worker computes the same split
+    without coordination. Each shard keeps the targets in config order.
+    """
+    if count <= 0:
+        raise ValueError("count must be > 0")
+    loads = [0] * count
+    assigned: dict[int, int] = {}
+    ordered = sorted(
+        range(len(targets)), key=lambda index: (-len(targets[index].tracked_user_ids), index)
+    )
+    for index in ordered:
+        shard = min(range(count), key=lambda item: (loads[item], item))
+        assigned[index] = shard
+        loads[shard] += len(targets[index].tracked_user_ids)
+    return [
+        tuple(target for index, target in enumerate(targets) if assigned[index] == shard)
+        for shard in range(count)
+    ]
+
+
+def shard_config(config: Config, shard: Shard) -> Config:
+    """Return `config` narrowed to the targets owned by `shard`."""
+    if shard.count <= 1:
+        return config
+    targets = partition_targets(config.targets, shard.count)[shard.index]
+    by_control: dict[str, list[TargetGroupConfig]] = {}
+    for target in targets:
+        if target.control_group:
+            by_control.setdefault(target.control_group, []).append(target)
+    return replace(
+        config,
+        targets=targets,
+        target_by_chat_id=MappingProxyType({target.target_chat_id: target for target in targets}),
+        target_by_name=MappingProxyType({target.name: target for target in targets}),
+        targets_by_control=MappingProxyType(
+            {key: tuple(value) for key, value in by_control.items()}
+        ),
+    )
+
+
+def worker_session_path(session_file: Path, shard: Shard) -> Path:
+    """Session file used by `shard`; the primary keeps the configured one."""
+    if shard.index == 0:
+        return session_file
+    return session_file.with_name(f"{session_file.stem}.worker{shard.index}{session_file.suffix}")
+
+
+def prepare_worker_sessions(
+    config: Config,
+    count: int,
+    *,
+    login: Callable[[Config, Path, str], None] | None = None,
+) -> list[Path]:
+    """Make sure every extra worker has its own logged-in session file.
+
+    Each worker connects as a separate authorization of the account: sharing
+    one auth key between processes makes Telegram reject connections with
+    AUTH_KEY_DUPLICATED. Missing worker sessions are logged in here, in the
+    supervisor, because spawned workers have no terminal to prompt on.
+    """
+    source = config.telegram.session_file
+    if not source.exists():
+        raise FileNotFoundError(
+            f"Session file {source} not found; run `tgwatch run` once without --workers to log in."
+        )
+    login = login or _login_worker
+    paths = [source]
+    for index in range(1, count):
+        path = worker_session_path(source, Shard(index, count))
+        if not path.exists():
+            login(config, path, f"worker {index}")
+            logger.info("Logged in worker session %s", path.name)
+        paths.append(path)
+    return paths
+
+
+def _login_worker(config: Config, session_file: Path, role: str) -> None:
+    # Imported here because runner imports this module.
+    from .runner import login_worker_session
+
+    asyncio.run(login_worker_session(config, session_file, role))
+
+
+# Every worker reads and downloads; only the primary delivers to control chats.
+_SHARDED_METHODS = ("get_messages", "download")
+
+
+def shard_rates(count: int) -> Mapping[str, tuple[float, int]]:
+    """Split the per-account read/download budget evenly between `count` workers.
+
+    Send budgets stay whole: non-primary workers only enqueue to the outbox, so
+    the primary is the sole sender and keeps the account's full send rate.
+    """
+    rates = dict(DEFAULT_RATES)
+    for method in _SHARDED_METHODS:
+        rate, burst = rates[method]
+        rates[method] = (rate / count, max(1, burst // count))
+    return rates
+
+
+def run_workers(config_path: Path, config: Config, count: int, *, log_level: str) -> int:
+    """Supervise `count` worker processes until one of them exits.
+
+    A worker that stops (crash or disconnect) stops the others too, so the
+    deployment never keeps running with some targets silently unwatched.
+    """
+    count = max(1, min(count, len(config.targets)))
+    prepare_worker_sessions(config, count)
+    # Migrate the schema once before workers race to do it, and switch to WAL
+    # (persistent in the file) so readers never block the workers' writes.
+    with db_session(config.storage.db_path) as conn:
+        conn.execute("PRAGMA journal_mode=WAL")
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(
+            target=_worker_main,
+            args=(config_path, index, count, log_level),
+            name=f"tgwatch-worker-{index}",
+        )
+        for index in range(count)
+    ]
+    for process in processes:
+        process.start()
+    logger.info("Started %s worker process(es)", count)
+    try:
+        wait([process.sentinel for process in processes])
+    except KeyboardInterrupt:
+        logger.info("Stopping workers")
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        for process in processes:
+            process.join()
+    failed = [
+        process
+        for process in processes
+        if process.exitcode not in (0, None, -signal.SIGTERM)
+    ]
+    for process in failed:
+        logger.error("%s exited with code %s", process.name, process.exitcode)
+    return 1 if failed else 0
+
+
+def _worker_main(config_path: Path, index: int, count: int, log_level: str) -> None:
+    # Imported here because runner imports this module.
+    from .runner import run_daemon
+
+    logging.basicConfig(
+        level=getattr(logging, log_level),
+        format=f"%(asctime)s %(levelname)s [worker {index}] %(name)s %(message)s",
+    )
+    logging.getLogger("telethon").setLevel(logging.WARNING)
+    # The supervisor stops workers with SIGTERM; unwind like Ctrl-C so the
+    # daemon's cleanup (scheduler, outbox, disconnect) still runs.
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    config = load_config(config_path)
+    try:
+        asyncio.run(run_daemon(config, shard=Shard(index, count)))
+    except KeyboardInterrupt:
+        pass
@@ -14,3 +14,29 @@ def test_cleanup_replies_parser_defaults() -> None:
     assert args.command == "cleanup-replies"
     assert args.apply is False
     assert args.no_backup is False
+
+
+def test_bench_parser_needs_no_config() -> None:
+    args = build_parser().parse_args(["bench", "--targets", "10"])
+    assert args.command == "bench"
+    assert args.targets == 10
+    assert args.updates == 200_000
+    assert args.report_messages == 10_000
+
+
+def test_loadtest_parser_defaults() -> None:
+    args = build_parser().parse_args(["loadtest", "--chats", "3"])
+    assert args.command == "loadtest"
+    assert args.chats == 3
+    assert args.rate == 5.0
+    assert args.flood_every == 0
+
+
+def test_trace_parser_and_run_trace_option() -> None:
+    args = build_parser().parse_args(["trace", "trace.jsonl"])
+    assert args.command == "trace"
+    assert str(args.trace_file) == "trace.jsonl"
+    args = build_parser().parse_args(
+        ["run", "--config", "config.toml", "--trace", "data/trace.jsonl"]
+    )
+    assert str(args.trace) == "data/trace.jsonl"
@@ -93,6 +93,7 @@ def test_load_config_resolves_relative_paths(tmp_path):
         [reporting]
         reports_dir = "reports"
         summary_interval_minutes = 60
+        templates_dir = "templates"
         """,
     )
     config = load_config(cfg_path)
@@ -101,6 +102,7 @@ def test_load_config_resolves_relative_paths(tmp_path):
     assert config.storage.db_path.is_absolute()
     assert config.storage.media_dir.is_absolute()
     assert config.reporting.reports_dir.is_absolute()
+    assert config.reporting.templates_dir == (tmp_path / "templates").resolve()
     assert config.telegram.session_file.is_absolute()
     assert config.sender is not None
     assert config.sender.session_file.is_absolute()
@@ -885,3 +887,217 @@ def test_control_group_limit_exceeded(tmp_path):
     )
     with pytest.raises(ConfigError):
         load_config(cfg_path)
+
+
+def test_performance_section_defaults_and_validation(tmp_path):
+    body = """
+        [telegram]
+        api_id = 42
+        api_hash = "abcdefghijk"
+
+        [target]
+        target_chat_id = -1001
+        tracked_user_ids = [123]
+
+        [control]
+        control_chat_id = -1002
+
+        [storage]
+        db_path = "data/app.sqlite3"
+        media_dir = "data/media"
+        """
+    config = load_config(write_config(tmp_path, body))
+    assert config.performance.max_parallel_targets == 4
+    assert config.performance.stall_threshold_ms == 0
+    assert config.performance.report_workers == 0
+
+    config = load_config(
+        write_config(tmp_path, body + "\n[performance]\nmax_parallel_targets = 2\n")
+    )
+    assert config.performance.max_parallel_targets == 2
+
+    with pytest.raises(ConfigError):
+        load_config(write_config(tmp_path, body + "\n[performance]\nmax_parallel_targets = 0\n"))
+    with pytest.raises(ConfigError):
+        load_config(write_config(tmp_path, body + "\n[performance]\nstall_threshold_ms = -1\n"))
+    with pytest.raises(ConfigError):
+        load_config(write_config(tmp_path, body + "\n[performance]\nreport_workers = -1\n"))
+    with pytest.raises(ConfigError, match="performance must be a table"):
+        load_config(write_config(tmp_path, "performance = 5\n" + body))
+
+
+def test_reporting_bundle_parses_and_validates(tmp_path):
+    body = """
+        [telegram]
+        api_id = 42
+        api_hash = "abcdefghijk"
+
+        [target]
+        target_chat_id = -1001
+        tracked_user_ids = [123]
+
+        [control]
+        control_chat_id = -1002
+
+        [storage]
+        db_path = "data/app.sqlite3"
+        media_dir = "data/media"
+        """
+    assert load_config(write_config(tmp_path, body)).reporting.bundle == "none"
+    config = load_config(write_config(tmp_path, body + '\n[reporting]\nbundle = "ZIP"\n'))
+    assert config.reporting.bundle == "zip"
+    with pytest.raises(ConfigError):
+        load_config(write_config(tmp_path, body + '\n[reporting]\nbundle = "tar"\n'))
+
+
+def test_metrics_section_is_optional_and_validated(tmp_path):
+    body = """
+        [telegram]
+        api_id = 42
+        api_hash = "abcdefghijk"
+
+        [target]
+        target_chat_id = -1001
+        tracked_user_ids = [123]
+
+        [control]
+        control_chat_id = -1002
+
+        [storage]
+        db_path = "data/app.sqlite3"
+        media_dir = "data/media"
+        """
+    config = load_config(write_config(tmp_path, body))
+    assert config.metrics.enabled is False
+
+    config = load_config(write_config(tmp_path, body + "\n[metrics]\nport = 9464\n"))
+    assert config.metrics.enabled is True
+    assert (config.metrics.host, config.metrics.port) == ("127.0.0.1", 9464)
+
+    with pytest.raises(ConfigError):
+        load_config(write_config(tmp_path, body + "\n[metrics]\nport = 70000\n"))
+
+
+def test_target_media_mode_parses_and_validates(tmp_path):
+    body = """
+        [telegram]
+        api_id = 42
+        api_hash = "abcdefghijk"
+
+        [[targets]]
+        target_chat_id = -1001
+        tracked_user_ids = [123]
+        media_mode = "{mode}"
+
+        [control]
+        control_chat_id = -1002
+
+        [storage]
+        db_path = "data/app.sqlite3"
+        media_dir = "data/media"
+        """
+    config = load_config(write_config(tmp_path, body.replace("{mode}", "deferred")))
+    assert config.targets[0].media_mode == "deferred"
+    assert config.targets[0].defers_media is True
+
+    with pytest.raises(ConfigError):
+        load_config(write_config(tmp_path, body.replace("{mode}", "lazy")))
+
+
+def test_target_delivery_mode_parses_and_validates(tmp_path):
+    body = """
+        [telegram]
+        api_id = 42
+        api_hash = "abcdefghijk"
+
+        [[targets]]
+        target_chat_id = -1001
+        tracked_user_ids = [123]
+        {line}
+
+        [control]
+        control_chat_id = -1002
+
+        [storage]
+        db_path = "data/app.sqlite3"
+        media_dir = "data/media"
+        """
+    config = load_config(write_config(tmp_path, body.replace("{line}", "")))
+    assert config.targets[0].delivery_mode == "upload"
+    assert config.targets[0].forwards_media is False
+
+    config = load_config(write_config(tmp_path, body.replace("{line}", 'delivery_mode = "forward"')))
+    assert config.targets[0].forwards_media is True
+
+    with pytest.raises(ConfigError):
+        load_config(write_config(tmp_path, body.replace("{line}", 'delivery_mode = "copy"')))
+
+
+def test_limits_are_configurable_and_lookups_are_indexed(tmp_path):
+    # 100 targets x 100 users; neighbouring targets share half their users.
+    targets = "\n\n".join(
+        f"""
+        [[targets]]
+        name = "group-{idx}"
+        target_chat_id = -100{idx:04d}
+        tracked_user_ids = {list(range(idx * 50, idx * 50 + 100))}
+        control_group = "ctl{idx % 10}"
+
+        [targets.tracked_user_aliases]
+        "{idx * 50}" = "first-{idx}"
+        """
+        for idx in range(100)
+    )
+    controls = "\n\n".join(
+        f"""
+        [control_groups.ctl{idx}]
+        control_chat_id = -200{idx}
+        """
+        for idx in range(10)
+    )
+    body = f"""
+        [telegram]
+        api_id = 42
+        api_hash = "abcdefghijk"
+
+        {targets}
+
+        {controls}
+
+        [storage]
+        db_path = "data/app.sqlite3"
+        media_dir = "data/media"
+        """
+    with pytest.raises(ConfigError, match="raise limits"):
+        load_config(write_config(tmp_path, body))
+
+    config = load_config(
+        write_config(
+            tmp_path,
+            "[limits]\nmax_target_groups = 100\nmax_users_per_target = 100\n"
+            "max_control_groups = 10\n" + body,
+        )
+    )
+    assert config.limits.max_target_groups == 100
+    assert len(config.tracked_users_set) == 99 * 50 + 100
+    assert config.tracked_users_set is config.tracked_users_set
+
+    # User 150 is tracked by group-2 and group-3; the first one wins.
+    assert [t.name for t in config.targets_by_user[150]] == ["group-2", "group-3"]
+    assert config.target_for_user(150).name == "group-2"
+    assert config.target_for_user(150, control_key="ctl3").name == "group-3"
+    assert config.target_for_user(150, control_key="ctl7") is None
+    assert config.describe_user(150) == "first-3 (150)"
+    assert config.describe_user(150, target=config.target_for_name("group-2")) == "150"
+
+    ctl0 = config.tracked_ids_for_control("ctl0")
+    assert isinstance(ctl0, frozenset)
+    assert ctl0 == frozenset(
+        user_id
+        for idx in range(0, 100, 10)
+        for user_id in range(idx * 50, idx * 50 + 100)
+    )
+    assert config.tracked_ids_for_control("missing") == frozenset()
+
+    with pytest.raises(ConfigError):
+        load_config(write_config(tmp_path, "[limits]\nmax_target_groups = 0\n" + body))
@@ -360,3 +360,48 @@ def test_render_toml_quotes_control_group_key() -> None:
     assert '[control_groups."main group"]' in toml_text
     assert parsed["control_groups"]["main group"]["control_chat_id"] == -2001
     assert parsed["control_groups"]["main group"]["topic_target_map"]["-1001"]["123"] == 9001
+
+
+def test_render_toml_preserves_performance_section() -> None:
+    normalized = {
+        "config_version": 1.0,
+        "telegram": {"api_id": 42, "api_hash": "abcdefghijk", "session_file": "data/tgwatch.session"},
+        "sender": {"enabled": False, "session_file": ""},
+        "targets": [
+            {
+                "name": "group-1",
+                "target_chat_id": -1001,
+                "tracked_user_ids": [123],
+                "tracked_user_aliases": {},
+                "summary_interval_minutes": None,
+                "control_group": "main",
+            }
+        ],
+        "control_groups": [
+            {
+                "key": "main",
+                "control_chat_id": -2001,
+                "is_forum": False,
+                "topic_routing_enabled": False,
+                "topic_target_map": [],
+            }
+        ],
+        "storage": {"db_path": "data/tgwatch.sqlite3", "media_dir": "data/media"},
+        "reporting": {
+            "reports_dir": "reports",
+            "summary_interval_minutes": 120,
+            "timezone": "UTC",
+            "retention_days": 30,
+        },
+        "display": {"show_ids": True, "time_format": "%Y.%m.%d %H:%M:%S (%Z)"},
+        "notifications": {"bark_key": ""},
+    }
+
+    toml_text = _render_toml(
+        normalized,
+        {"performance": {"max_parallel_targets": 2}, "reporting": {"templates_dir": "templates"}},
+    )
+    parsed = tomllib.loads(toml_text)
+
+    assert parsed["performance"]["max_parallel_targets"] == 2
+    assert parsed["reporting"]["templates_dir"] == "templates"
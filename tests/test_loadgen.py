@@ -0,0 +1,39 @@
+import pytest
+
+from telegram_watch import runner
+from telegram_watch.fakes import FakeTelegramClient
+from telegram_watch.loadgen import format_load_result, run_load
+from telegram_watch.ratelimit import AccountRateLimiter
+from telegram_watch.storage import db_session, fetch_recent_messages
+
+
+@pytest.mark.asyncio
+async def test_fake_client_injected_floodwait_goes_through_limiter():
+    clock = [0.0]
+
+    async def fake_sleep(delay):
+        clock[0] += delay
+
+    client = FakeTelegramClient()
+    limiter = AccountRateLimiter("fake", clock=lambda: clock[0], sleep=fake_sleep)
+    setattr(client, runner._RATE_LIMITER_ATTR, limiter)
+    client.inject_flood_wait("send_message", 3)
+
+    await runner._with_floodwait(client.send_message, -100123, "hello")
+
+    assert client.calls["send_message"] == 2
+    assert [item.payload for item in client.sent] == ["hello"]
+    assert clock[0] >= 4
+    assert limiter.stats()["send_message"].flood_waits == 1
+
+
+@pytest.mark.asyncio
+async def test_load_run_captures_every_message(tmp_path):
+    result = await run_load(chats=3, rate=20, duration=0.5, workdir=tmp_path)
+
+    assert result.sent == 30
+    assert result.captured == result.sent
+    assert 0 < result.latency_p50_ms <= result.latency_p99_ms
+    assert "30/30 messages" in format_load_result(result)
+    with db_session(tmp_path / "load.sqlite3") as conn:
+        assert fetch_recent_messages(conn, 10_000, 100)
@@ -0,0 +1,53 @@
+import asyncio
+
+import pytest
+
+from telegram_watch.metrics import MetricsServer, Registry
+
+
+def test_registry_renders_counters_and_histograms():
+    registry = Registry()
+    sent = registry.counter("tgwatch_sent_total", "Things sent.", ("kind",))
+    latency = registry.histogram("tgwatch_latency_seconds", "Latency.")
+    sent.inc(kind="message")
+    sent.inc(3, kind="file")
+    latency.observe(0.003)
+    latency.observe(0.2)
+    latency.observe(120)
+
+    text = registry.render()
+
+    assert "# TYPE tgwatch_sent_total counter" in text
+    assert 'tgwatch_sent_total{kind="file"} 3' in text
+    assert 'tgwatch_sent_total{kind="message"} 1' in text
+    assert 'tgwatch_latency_seconds_bucket{le="0.005"} 1' in text
+    assert 'tgwatch_latency_seconds_bucket{le="0.25"} 2' in text
+    assert 'tgwatch_latency_seconds_bucket{le="+Inf"} 3' in text
+    assert "tgwatch_latency_seconds_count 3" in text
+    assert latency.count() == 3
+
+    registry.reset()
+    assert sent.value(kind="file") == 0
+
+
+@pytest.mark.asyncio
+async def test_metrics_server_serves_exposition_text():
+    registry = Registry()
+    registry.counter("tgwatch_updates_received_total", "Updates.", ("chat_id",)).inc(chat_id=-100)
+    server = MetricsServer("127.0.0.1", 0, registry=registry, lag_interval=0.01)
+    await server.start()
+    try:
+        async def fetch(path: str) -> bytes:
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+            await writer.drain()
+            data = await reader.read()
+            writer.close()
+            return data
+
+        response = await fetch("/metrics")
+        assert response.startswith(b"HTTP/1.1 200 OK")
+        assert b'tgwatch_updates_received_total{chat_id="-100"} 1' in response
+        assert (await fetch("/")).startswith(b"HTTP/1.1 404")
+    finally:
+        await server.stop()
@@ -0,0 +1,64 @@
+import tracemalloc
+
+import pytest
+
+from telegram_watch import profiling, runner
+from telegram_watch.fakes import FakeEvent, FakeTelegramClient
+from telegram_watch.loadgen import build_fake_config
+from telegram_watch.profiling import Profiler
+
+
+def _busy_loop(seconds: float) -> int:
+    import time
+
+    end = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < end:
+        total += 1
+    return total
+
+
+def test_cpu_profile_writes_collapsed_stacks(tmp_path):
+    profiler = Profiler("cpu", tmp_path, sample_interval=0.001).start()
+    _busy_loop(0.2)
+    folded, summary = profiler.stop()
+
+    assert profiler.samples > 0
+    assert "_busy_loop (test_profiling.py" in folded.read_text()
+    assert "_busy_loop" in summary.read_text()
+
+
+def test_memory_profile_writes_loadable_snapshots(tmp_path):
+    profiler = Profiler("memory", tmp_path).start()
+    blob = [bytearray(1024) for _ in range(1000)]
+    snapshot_path, summary = profiler.stop()
+    del blob
+
+    assert not tracemalloc.is_tracing()
+    assert tracemalloc.Snapshot.load(str(snapshot_path)).traces
+    assert "top allocations:" in summary.read_text()
+
+
+@pytest.mark.asyncio
+async def test_profile_command_toggles_live_profile(tmp_path):
+    config = build_fake_config(tmp_path, {-100123: (42,)}, {-100123: -100999})
+    client = FakeTelegramClient(self_id=7)
+    handler = runner._ControlHandler(config, client, client, 7, runner._ActivityTracker())
+
+    async def command(text: str) -> str:
+        message = client.make_message(-100999, 7, text)
+        await handler.handle(FakeEvent(chat_id=-100999, message=message))
+        return client.sent[-1].payload
+
+    try:
+        assert "Started cpu profile" in await command("/profile cpu")
+        assert profiling.active_profile() is not None
+        assert "already running" in await command("/profile memory")
+        reply = await command("/profile stop")
+        assert "Profile written" in reply
+        assert ".folded" in reply
+        assert profiling.active_profile() is None
+        assert "No profile running" in await command("/profile")
+    finally:
+        profiling.stop_profile()
+    assert list((tmp_path / "profiles").glob("cpu-*.folded"))
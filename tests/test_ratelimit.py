@@ -0,0 +1,58 @@
+import pytest
+
+from telegram_watch.ratelimit import AccountRateLimiter
+
+
+def make_limiter(**kwargs):
+    clock = [0.0]
+
+    async def fake_sleep(delay):
+        clock[0] += delay
+
+    limiter = AccountRateLimiter("test", clock=lambda: clock[0], sleep=fake_sleep, **kwargs)
+    return limiter, clock
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_allows_burst_then_paces():
+    limiter, clock = make_limiter(rates={"send_message": (2.0, 3)})
+
+    for _ in range(3):
+        await limiter.acquire("send_message")
+    assert clock[0] == 0.0
+
+    await limiter.acquire("send_message")
+    assert clock[0] == pytest.approx(0.5)
+    assert limiter.stats()["send_message"].calls == 4
+    assert limiter.stats()["send_message"].waited_seconds == pytest.approx(0.5)
+
+
+@pytest.mark.asyncio
+async def test_flood_wait_pauses_account_and_adapts_rate():
+    limiter, clock = make_limiter()
+    base = limiter.current_rate("send_file")
+
+    limiter.record_flood_wait("send_file", 30)
+    assert limiter.current_rate("send_file") == pytest.approx(base / 2)
+
+    await limiter.acquire("get_messages")
+    assert clock[0] == pytest.approx(30)
+
+    for _ in range(10):
+        limiter.record_flood_wait("send_file", 1)
+    assert limiter.current_rate("send_file") == pytest.approx(base / 16)
+
+    for _ in range(200):
+        limiter.record_success("send_file")
+    assert limiter.current_rate("send_file") == pytest.approx(base)
+
+    stats = limiter.stats()["send_file"]
+    assert stats.flood_waits == 11
+    assert stats.flood_wait_seconds == pytest.approx(40)
+
+
+@pytest.mark.asyncio
+async def test_unknown_method_uses_other_bucket():
+    limiter, _clock = make_limiter()
+    await limiter.acquire("get_entity")
+    assert limiter.stats()["other"].calls == 1
@@ -0,0 +1,72 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from telegram_watch.fakes import FakeTelegramClient
+from telegram_watch.loadgen import build_fake_config
+from telegram_watch.recording import UpdateRecorder, load_recording
+from telegram_watch.replay import parse_speed, replay_recording
+from telegram_watch.runner import run_daemon
+
+TARGET = -1001
+CONTROL = -2001
+OWNER = 7
+
+
+@pytest.mark.asyncio
+async def test_recorded_stream_replays_through_the_daemon(tmp_path):
+    config = build_fake_config(tmp_path / "live", {TARGET: (11, 12)}, {TARGET: CONTROL})
+    client = FakeTelegramClient(self_id=OWNER)
+    log_path = tmp_path / "updates.jsonl.gz"
+    daemon = asyncio.create_task(
+        run_daemon(config, client_factory=lambda *_: client, record=log_path)
+    )
+    await asyncio.wait_for(client.started.wait(), timeout=5)
+    client.emit(client.make_message(TARGET, 11, "secret text", message_id=100))
+    client.emit(client.make_message(TARGET, 99, "untracked", message_id=101))
+    client.emit(
+        client.make_message(TARGET, 12, "reply", message_id=102, reply_to=100, media_size=2048)
+    )
+    client.emit(client.make_message(CONTROL, OWNER, "/help", message_id=500))
+    await client.drain()
+    await client.disconnect()
+    await daemon
+
+    recording = load_recording(log_path)
+    assert recording.owner_id == OWNER
+    assert recording.targets == {TARGET: (11, 12)}
+    assert recording.target_controls == {TARGET: CONTROL}
+    first, _untracked, reply, command = recording.updates
+    assert first.text is None and first.text_length == len("secret text")
+    assert reply.reply_to == 100 and reply.media_size == 2048
+    assert command.text == "/help"
+
+    result = await replay_recording(recording, speed=100, workdir=tmp_path / "replay")
+    assert result.updates == 4
+    assert result.control_updates == 1
+    assert result.captured == 2
+    assert result.target_p99_ms >= result.target_p50_ms > 0
+
+
+def test_recorder_appends_sessions_to_the_same_log(tmp_path):
+    config = build_fake_config(tmp_path / "live", {TARGET: (11,)}, {TARGET: CONTROL})
+    log_path = tmp_path / "updates.jsonl.gz"
+    for message_id, offset in ((100, 2.0), (200, 1.0)):
+        ticks = iter((0.0, offset))
+        recorder = UpdateRecorder(log_path, config, owner_id=OWNER, clock=lambda: next(ticks))
+        message = SimpleNamespace(id=message_id, sender_id=11, raw_text="hi", media=None)
+        recorder.record(SimpleNamespace(chat_id=TARGET, message=message))
+        recorder.close()
+
+    recording = load_recording(log_path)
+    assert [update.message_id for update in recording.updates] == [100, 200]
+    assert [update.offset for update in recording.updates] == [2.0, 3.0]
+    assert recording.targets == {TARGET: (11,)}
+
+
+def test_parse_speed():
+    assert parse_speed("10x") == 10
+    assert parse_speed("0.5") == 0.5
+    with pytest.raises(ValueError):
+        parse_speed("0x")
@@ -0,0 +1,480 @@
+import gzip
+import pickle
+import re
+import zipfile
+from dataclasses import replace
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from types import MappingProxyType
+
+import pytest
+
+from telegram_watch import reporting
+from telegram_watch.config import (
+    Config,
+    ControlGroupConfig,
+    DisplayConfig,
+    NotificationConfig,
+    PerformanceConfig,
+    ReportingConfig,
+    StorageConfig,
+    TargetGroupConfig,
+    TelegramConfig,
+)
+from telegram_watch.storage import DbMedia, DbMessage
+
+
+def build_config(tmp_path: Path) -> Config:
+    target = TargetGroupConfig(
+        name="default",
+        target_chat_id=-1001,
+        tracked_user_ids=(111,),
+        tracked_user_aliases=MappingProxyType({111: "Alice"}),
+        summary_interval_minutes=120,
+        control_group="default",
+    )
+    control = ControlGroupConfig(
+        key="default",
+        control_chat_id=-456,
+        is_forum=False,
+        topic_routing_enabled=False,
+        topic_target_map=MappingProxyType({}),
+    )
+    return Config(
+        config_version=1.0,
+        telegram=TelegramConfig(api_id=1, api_hash="abcdefghijk", session_file=tmp_path / "session"),
+        sender=None,
+        targets=(target,),
+        control_groups=MappingProxyType({"default": control}),
+        target_by_chat_id=MappingProxyType({target.target_chat_id: target}),
+        target_by_name=MappingProxyType({target.name: target}),
+        control_by_chat_id=MappingProxyType({control.control_chat_id: control}),
+        targets_by_control=MappingProxyType({"default": (target,)}),
+        storage=StorageConfig(db_path=tmp_path / "db.sqlite3", media_dir=tmp_path / "media"),
+        reporting=ReportingConfig(
+            reports_dir=tmp_path / "reports",
+            summary_interval_minutes=120,
+            timezone=timezone.utc,
+            retention_days=30,
+        ),
+        display=DisplayConfig(show_ids=True, time_format="%Y.%m.%d %H:%M:%S (%Z)"),
+        notifications=NotificationConfig(bark_key=None),
+    )
+
+
+def _message(media: list[DbMedia]) -> DbMessage:
+    return DbMessage(
+        chat_id=-1001,
+        message_id=10,
+        sender_id=111,
+        date=datetime(2026, 2, 1, 12, 0, tzinfo=timezone.utc),
+        text="photo",
+        reply_to_msg_id=None,
+        replied_sender_id=None,
+        replied_date=None,
+        replied_text=None,
+        media=media,
+    )
+
+
+def test_report_inlines_thumbnail_linked_to_original(tmp_path: Path):
+    config = build_config(tmp_path)
+    original = tmp_path / "media" / "10.jpg"
+    original.parent.mkdir()
+    original.write_bytes(b"O" * 50_000)
+    thumb = tmp_path / "media" / "10_thumb.jpg"
+    thumb.write_bytes(b"T" * 100)
+    media = DbMedia(
+        media_index=0,
+        file_path=str(original),
+        mime_type="image/jpeg",
+        file_size=50_000,
+        is_reply=False,
+        thumb_path=str(thumb),
+    )
+    since = datetime(2026, 2, 1, 11, 0, tzinfo=timezone.utc)
+    report = reporting.generate_report(
+        [_message([media])],
+        config,
+        since,
+        since + timedelta(hours=2),
+        report_dir=tmp_path / "reports",
+    )
+    html = report.read_text(encoding="utf-8")
+
+    assert 'href="../media/10.jpg"' in html
+    assert html.count("data:image/jpeg;base64,") == 1
+    assert len(html) < 10_000
+
+
+def test_report_marks_deferred_media(tmp_path: Path):
+    config = build_config(tmp_path)
+    media = DbMedia(
+        media_index=0,
+        file_path="",
+        mime_type="video/mp4",
+        file_size=10_000_000,
+        is_reply=False,
+        media_kind="video",
+    )
+    since = datetime(2026, 2, 1, 11, 0, tzinfo=timezone.utc)
+    report = reporting.generate_report(
+        [_message([media])],
+        config,
+        since,
+        since + timedelta(hours=2),
+        report_dir=tmp_path / "reports",
+    )
+    assert "video (not downloaded)" in report.read_text(encoding="utf-8")
+
+
+def test_report_streams_large_images_with_bounded_memory(tmp_path: Path):
+    import tracemalloc
+
+    config = replace(
+        build_config(tmp_path),
+        performance=PerformanceConfig(report_inline_max_kb=0, report_encode_cache_mb=0),
+    )
+    image = tmp_path / "media" / "big.jpg"
+    image.parent.mkdir()
+    image.write_bytes(b"\xff" * 4_000_000)
+    messages = (
+        DbMessage(
+            chat_id=-1001,
+            message_id=index,
+            sender_id=111,
+            date=datetime(2026, 2, 1, 12, 0, tzinfo=timezone.utc),
+            text=f"photo {index}",
+            reply_to_msg_id=None,
+            replied_sender_id=None,
+            replied_date=None,
+            replied_text=None,
+            media=[
+                DbMedia(
+                    media_index=0,
+                    file_path=str(image),
+                    mime_type="image/jpeg",
+                    file_size=4_000_000,
+                    is_reply=False,
+                )
+            ],
+        )
+        for index in range(5)
+    )
+    since = datetime(2026, 2, 1, 11, 0, tzinfo=timezone.utc)
+
+    tracemalloc.start()
+    try:
+        report = reporting.generate_report(
+            messages, config, since, since + timedelta(hours=2), report_dir=tmp_path / "reports"
+        )
+        _current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    # Five inlined 4 MB images make a ~27 MB report; rendering must not hold it.
+    assert report.stat().st_size > 26_000_000
+    assert peak < 2_000_000
+    assert not list(report.parent.glob("*.part"))
+
+
+def test_report_caps_inline_size_and_reuses_encodings(tmp_path: Path):
+    config = replace(build_config(tmp_path), performance=PerformanceConfig(report_inline_max_kb=1))
+    media_dir = tmp_path / "media"
+    media_dir.mkdir()
+    small = media_dir / "small.jpg"
+    small.write_bytes(b"S" * 600)
+    large = media_dir / "large.jpg"
+    large.write_bytes(b"L" * 5000)
+    media = [
+        DbMedia(media_index=0, file_path=str(small), mime_type="image/jpeg", file_size=600, is_reply=False),
+        DbMedia(media_index=1, file_path=str(large), mime_type="image/jpeg", file_size=5000, is_reply=False),
+    ]
+    since = datetime(2026, 2, 1, 11, 0, tzinfo=timezone.utc)
+    reporting.ENCODING_CACHE.clear()
+
+    html = reporting.generate_report(
+        [_message(media)], config, since, since + timedelta(hours=2), report_dir=tmp_path / "a"
+    ).read_text(encoding="utf-8")
+    reporting.generate_report(
+        [_message(media)], config, since, since + timedelta(hours=2), report_dir=tmp_path / "b"
+    )
+
+    assert html.count("data:image/jpeg;base64,") == 1
+    assert '<a href="../media/large.jpg" target="_blank"><img src="../media/large.jpg"' in html
+    assert html.count('loading="lazy"') == 2
+    assert (reporting.ENCODING_CACHE.misses, reporting.ENCODING_CACHE.hits) == (1, 1)
+
+    small.write_bytes(b"s" * 601)
+    reporting.generate_report(
+        [_message(media)], config, since, since + timedelta(hours=2), report_dir=tmp_path / "c"
+    )
+    assert reporting.ENCODING_CACHE.misses == 2
+
+
+def test_encoding_cache_evicts_least_recently_used(tmp_path: Path):
+    cache = reporting.EncodingCache(max_bytes=4000)
+    paths = []
+    for index in range(5):
+        path = tmp_path / f"{index}.jpg"
+        path.write_bytes(bytes([index]) * 600)
+        paths.append(path)
+
+    def encode(index: int) -> str:
+        return "".join(cache.data_uri(reporting._open_image(paths[index], "image/jpeg")))
+
+    # Each encoded image is ~820 bytes, so four fit in the budget.
+    first = encode(0)
+    for index in (1, 2, 3, 0, 4, 0, 1):
+        encode(index)
+
+    assert first.startswith("data:image/jpeg;base64,")
+    assert (cache.hits, cache.misses) == (2, 6)
+
+
+def test_report_template_escapes_text_and_marks_deferred_media(tmp_path: Path):
+    config = build_config(tmp_path)
+    message = replace(
+        _message(
+            [
+                DbMedia(
+                    media_index=0,
+                    file_path="",
+                    mime_type="video/mp4",
+                    file_size=None,
+                    is_reply=False,
+                    media_kind="video",
+                )
+            ]
+        ),
+        text='<script>alert("x")</script>',
+        replied_sender_id=111,
+        replied_text="earlier & <b>bold</b>",
+    )
+    since = datetime(2026, 2, 1, 11, 0, tzinfo=timezone.utc)
+
+    html = reporting.generate_report(
+        [message], config, since, since + timedelta(hours=2), report_dir=tmp_path / "reports"
+    ).read_text(encoding="utf-8")
+
+    assert "<pre>&lt;script&gt;alert(&#34;x&#34;)&lt;/script&gt;</pre>" in html
+    assert "Reply to Alice (111)" in html
+    assert "earlier &amp; &lt;b&gt;bold&lt;/b&gt;" in html
+    assert '<span class="media-deferred">video (not downloaded)</span>' in html
+    assert 'font-family: -apple-system, BlinkMacSystemFont, "Segoe UI"' in html
+
+
+def test_report_templates_can_be_overridden(tmp_path: Path):
+    templates = tmp_path / "templates"
+    templates.mkdir()
+    (templates / "report.css").write_text("body { color: red; }", encoding="utf-8")
+    config = build_config(tmp_path)
+    config = replace(config, reporting=replace(config.reporting, templates_dir=templates))
+    since = datetime(2026, 2, 1, 11, 0, tzinfo=timezone.utc)
+
+    html = reporting.generate_report(
+        [_message([])], config, since, since + timedelta(hours=2), report_dir=tmp_path / "a"
+    ).read_text(encoding="utf-8")
+
+    assert "body { color: red; }" in html
+    assert "Segoe UI" not in html
+    assert "<pre>photo</pre>" in html
+
+    # Each templates_dir gets its own compiled environment.
+    other = tmp_path / "other"
+    other.mkdir()
+    (other / "report.html.j2").write_text(
+        "{% for section in sections %}{{ section.label }}:"
+        "{% for message in section.messages %} {{ message.id }}{% endfor %}{% endfor %}",
+        encoding="utf-8",
+    )
+    config = replace(config, reporting=replace(config.reporting, templates_dir=other))
+    text = reporting.generate_report(
+        [_message([])], config, since, since + timedelta(hours=2), report_dir=tmp_path / "b"
+    ).read_text(encoding="utf-8")
+    assert text == "Alice (111): 10"
+
+
+def test_generate_reports_renders_user_reports_in_one_pass(tmp_path: Path):
+    config = build_config(tmp_path)
+    photo = tmp_path / "media" / "photo.jpg"
+    photo.parent.mkdir()
+    photo.write_bytes(b"p" * 300)
+    media = DbMedia(
+        media_index=0, file_path=str(photo), mime_type="image/jpeg", file_size=300, is_reply=False
+    )
+    messages = [
+        _message([media]),
+        replace(_message([]), message_id=11, sender_id=222, text="from bob"),
+    ]
+    since = datetime(2026, 2, 1, 11, 0, tzinfo=timezone.utc)
+    until = since + timedelta(hours=2)
+    reporting.ENCODING_CACHE.clear()
+
+    reports = reporting.generate_reports(
+        messages,
+        config,
+        since,
+        until,
+        report_dir=tmp_path / "reports",
+        user_report_name=lambda user_id: f"user_{user_id}.html",
+    )
+
+    assert sorted(reports.user_paths) == [111, 222]
+    # The photo is encoded once for the combined report and Alice's report.
+    assert (reporting.ENCODING_CACHE.misses, reporting.ENCODING_CACHE.hits) == (1, 1)
+    alice = reports.user_paths[111].read_text(encoding="utf-8")
+    assert alice == reporting.generate_report(
+        [messages[0]], config, since, until, report_dir=tmp_path / "single"
+    ).read_text(encoding="utf-8")
+    combined = reports.path.read_text(encoding="utf-8")
+    assert "<pre>photo</pre>" in combined and "<pre>from bob</pre>" in combined
+    assert "from bob" not in alice
+
+
+def test_config_survives_pickling(tmp_path: Path):
+    config = build_config(tmp_path)
+    restored = pickle.loads(pickle.dumps(config))
+    assert restored == config
+    assert isinstance(restored.target_by_chat_id, MappingProxyType)
+    assert isinstance(restored.targets[0].tracked_user_aliases, MappingProxyType)
+    assert restored.tracked_users == config.tracked_users
+    # Importing config must not change how pickle treats other proxies.
+    with pytest.raises(TypeError):
+        pickle.dumps(MappingProxyType({}))
+
+
+@pytest.mark.asyncio
+async def test_render_pool_renders_in_worker_process(tmp_path: Path):
+    config = build_config(tmp_path)
+    since = datetime(2026, 2, 1, 11, 0, tzinfo=timezone.utc)
+    pool = reporting.RenderPool(2)
+    try:
+        paths = [
+            await pool.run(
+                reporting.generate_report,
+                [_message([])],
+                config,
+                since,
+                since + timedelta(hours=2),
+                report_dir=tmp_path / name,
+            )
+            for name in ("a", "b")
+        ]
+    finally:
+        pool.close()
+
+    assert [path.parent.name for path in paths] == ["a", "b"]
+    assert "<pre>photo</pre>" in paths[0].read_text(encoding="utf-8")
+
+
+def test_zip_bundle_stores_deduplicated_media_files(tmp_path: Path):
+    config = build_config(tmp_path)
+    config = replace(config, reporting=replace(config.reporting, bundle="zip"))
+    media_dir = tmp_path / "media"
+    media_dir.mkdir()
+    first = media_dir / "a.jpg"
+    first.write_bytes(b"same photo")
+    copy = media_dir / "b.jpg"
+    copy.write_bytes(b"same photo")
+    other = media_dir / "c.jpg"
+    other.write_bytes(b"other photo")
+
+    def image(path: Path, index: int = 0) -> DbMedia:
+        return DbMedia(
+            media_index=index,
+            file_path=str(path),
+            mime_type="image/jpeg",
+            file_size=path.stat().st_size,
+            is_reply=False,
+        )
+
+    messages = [
+        _message([image(first), image(copy, 1)]),
+        replace(_message([image(other)]), message_id=11, sender_id=222),
+    ]
+    since = datetime(2026, 2, 1, 11, 0, tzinfo=timezone.utc)
+
+    reports = reporting.generate_reports(
+        messages,
+        config,
+        since,
+        since + timedelta(hours=2),
+        report_dir=tmp_path / "reports",
+        user_report_name=lambda user_id: f"user_{user_id}.html",
+    )
+
+    assert reports.path.name == "index.zip"
+    with zipfile.ZipFile(reports.path) as archive:
+        names = sorted(archive.namelist())
+        html = archive.read("index.html").decode("utf-8")
+    assert names[0] == "index.html" and len(names) == 3
+    assert "base64" not in html
+    for name in names[1:]:
+        assert f'<img src="{name}"' in html
+    with zipfile.ZipFile(reports.user_paths[111]) as archive:
+        assert len(archive.namelist()) == 2
+        assert archive.read(archive.namelist()[1]) == b"same photo"
+
+
+def test_bundled_reports_link_only_to_files_they_contain(tmp_path: Path):
+    config = build_config(tmp_path)
+    config = replace(config, performance=replace(config.performance, report_inline_max_kb=1))
+    media_dir = tmp_path / "media"
+    media_dir.mkdir()
+    original = media_dir / "photo.jpg"
+    original.write_bytes(b"original photo")
+    thumb = media_dir / "photo.thumb.jpg"
+    thumb.write_bytes(b"thumbnail")
+    large = media_dir / "large.jpg"
+    large.write_bytes(b"x" * 2048)
+    media = [
+        DbMedia(
+            media_index=0,
+            file_path=str(original),
+            mime_type="image/jpeg",
+            file_size=original.stat().st_size,
+            is_reply=False,
+            thumb_path=str(thumb),
+        ),
+        DbMedia(
+            media_index=1,
+            file_path=str(large),
+            mime_type="image/jpeg",
+            file_size=large.stat().st_size,
+            is_reply=False,
+        ),
+    ]
+    since = datetime(2026, 2, 1, 11, 0, tzinfo=timezone.utc)
+    until = since + timedelta(hours=2)
+
+    zipped = replace(config, reporting=replace(config.reporting, bundle="zip"))
+    path = reporting.generate_report([_message(media)], zipped, since, until, report_dir=tmp_path / "zip")
+    with zipfile.ZipFile(path) as archive:
+        names = set(archive.namelist())
+        html = archive.read("index.html").decode("utf-8")
+        links = re.findall(r'(?:href|src)="(?!https://t.me/)([^"]+)"', html)
+        assert len(links) == 4
+        for link in links:
+            assert link in names
+        contents = {archive.read(link) for link in links}
+    assert contents == {b"original photo", b"thumbnail", b"x" * 2048}
+
+    gzipped = replace(config, reporting=replace(config.reporting, bundle="gzip"))
+    path = reporting.generate_report([_message(media)], gzipped, since, until, report_dir=tmp_path / "gz")
+    html = gzip.decompress(path.read_bytes()).decode("utf-8")
+    assert re.findall(r'(?:href|src)="(?!https://t.me/)(?!data:)([^"]+)"', html) == []
+    assert "(not in bundle)" in html
+
+
+def test_gzip_bundle_matches_plain_report(tmp_path: Path):
+    config = build_config(tmp_path)
+    since = datetime(2026, 2, 1, 11, 0, tzinfo=timezone.utc)
+    until = since + timedelta(hours=2)
+    plain = reporting.generate_report([_message([])], config, since, until, report_dir=tmp_path / "a")
+
+    config = replace(config, reporting=replace(config.reporting, bundle="gzip"))
+    packed = reporting.generate_report([_message([])], config, since, until, report_dir=tmp_path / "b")
+
+    assert packed.name == "index.html.gz"
+    assert gzip.decompress(packed.read_bytes()).decode("utf-8") == plain.read_text(encoding="utf-8")
@@ -1,6 +1,8 @@
 from __future__ import annotations
 
+import asyncio
 from contextlib import contextmanager
+from dataclasses import replace
 from datetime import datetime, timedelta, timezone
 import logging
 from pathlib import Path
@@ -14,12 +16,22 @@ from telegram_watch.config import (
     ControlGroupConfig,
     DisplayConfig,
     NotificationConfig,
+    PerformanceConfig,
     ReportingConfig,
+    SenderConfig,
     StorageConfig,
     TargetGroupConfig,
     TelegramConfig,
 )
-from telegram_watch.storage import DbMedia, DbMessage
+from telegram_watch.storage import (
+    DbMedia,
+    DbMessage,
+    StoredMedia,
+    StoredMessage,
+    db_session,
+    fetch_messages_by_id,
+    persist_message,
+)
 from telegram_watch.timeutils import utc_now
 
 
@@ -636,8 +648,7 @@ async def test_reply_media_caption_uses_target_scoped_alias(monkeypatch, tmp_pat
     assert "Original sender: 999" in sent[0]
 
 
-@pytest.mark.asyncio
-async def test_topic_report_filenames_include_target_chat_id(monkeypatch, tmp_path: Path):
+def test_topic_report_filenames_include_target_chat_id(monkeypatch, tmp_path: Path):
     config = build_multi_target_config(tmp_path)
     control = config.control_groups["default"]
     since = datetime.now(timezone.utc) - timedelta(hours=1)
@@ -675,52 +686,75 @@ async def test_topic_report_filenames_include_target_chat_id(monkeypatch, tmp_pa
         report_names.append(report_name)
         return kwargs["report_dir"] / report_name
 
-    async def fake_send_file_with_fallback(
-        _client,
-        _fallback_client,
-        _chat_id,
-        _file_path,
-        *,
-        caption=None,
-        reply_to=None,
-    ):
-        return None
-
     monkeypatch.setattr(runner, "generate_report", fake_generate_report)
-    monkeypatch.setattr(runner, "_send_file_with_fallback", fake_send_file_with_fallback)
 
-    await runner._send_topic_reports(
-        object(),
-        config,
-        control,
-        config.targets[0],
-        [message_a],
-        since,
-        until,
-        report_dir,
-    )
-    await runner._send_topic_reports(
-        object(),
-        config,
-        control,
-        config.targets[1],
-        [message_b],
-        since,
-        until,
-        report_dir,
-    )
+    steps = [
+        step
+        for target, message in zip(config.targets, (message_a, message_b))
+        for step in runner._plan_topic_reports(
+            config, control, target, [message], since, until, report_dir
+        )
+    ]
 
+    assert [step.files[0].name for step in steps] == report_names
     assert report_names == ["index_-1001_777.html", "index_-1002_777.html"]
 
 
+def test_topic_reports_render_with_main_report_and_are_reused(monkeypatch, tmp_path: Path):
+    config = build_multi_target_config(tmp_path)
+    target = config.targets[0]
+    control = replace(
+        config.control_groups["default"], is_forum=True, topic_routing_enabled=True
+    )
+    until = datetime.now(timezone.utc)
+    since = until - timedelta(hours=1)
+    messages = [
+        DbMessage(
+            chat_id=target.target_chat_id,
+            message_id=index,
+            sender_id=sender_id,
+            date=until,
+            text=f"m{index}",
+            reply_to_msg_id=None,
+            replied_sender_id=None,
+            replied_date=None,
+            replied_text=None,
+            media=[],
+        )
+        for index, sender_id in enumerate((777, 888, 777), start=1)
+    ]
+
+    reports = runner._render_reports(
+        config, control, target, messages, since, until, report_dir=tmp_path / "reports"
+    )
+
+    assert sorted(path.name for path in reports.user_paths.values()) == [
+        "index_-1001_777.html",
+        "index_-1001_888.html",
+    ]
+    own = reports.user_paths[777].read_text(encoding="utf-8")
+    assert "m1" in own and "m3" in own and "m2" not in own
+
+    def fail_generate_report(*_args, **_kwargs):
+        raise AssertionError("topic reports should not be rendered again")
+
+    monkeypatch.setattr(runner, "generate_report", fail_generate_report)
+    plan = runner._plan_report_bundle(
+        config, control, target, messages, since, until, reports.path, reports.user_paths
+    )
+    assert [step.files for step in plan.steps[:2]] == [
+        [reports.user_paths[777]],
+        [reports.user_paths[888]],
+    ]
+
+
 @pytest.mark.asyncio
-async def test_summary_loop_passes_tracker_and_bark_context(monkeypatch, tmp_path: Path):
+async def test_summary_job_passes_tracker_and_bark_context(monkeypatch, tmp_path: Path):
     config = build_config(tmp_path)
     target = config.targets[0]
     control = config.control_groups["default"]
     tracker = runner._ActivityTracker()
-    loop = runner._SummaryLoop(config, target, control, client=object(), tracker=tracker)
-    loop._last_summary = utc_now() - timedelta(minutes=120)
+    job = runner._SummaryJob(config, target, control, client=object(), tracker=tracker)
 
     sample_message = DbMessage(
         chat_id=target.target_chat_id,
@@ -764,6 +798,8 @@ async def test_summary_loop_passes_tracker_and_bark_context(monkeypatch, tmp_pat
         tracker=None,
         bark_context=None,
         fallback_client=None,
+        outbox=None,
+        user_reports=None,
     ):
         captured["tracker"] = tracker
         captured["bark_context"] = bark_context
@@ -775,7 +811,8 @@ async def test_summary_loop_passes_tracker_and_bark_context(monkeypatch, tmp_pat
     monkeypatch.setattr(runner, "_send_report_bundle", fake_send_report_bundle)
     monkeypatch.setattr(runner, "_purge_old_reports", lambda *_args, **_kwargs: None)
 
-    await loop._send_summary()
+    now = utc_now()
+    await job.run(now - timedelta(minutes=120), now)
 
     assert captured["messages"] == [sample_message]
     assert captured["tracker"] is tracker
@@ -783,27 +820,22 @@ async def test_summary_loop_passes_tracker_and_bark_context(monkeypatch, tmp_pat
     assert captured_report_name["report_name"] == "index_-123.html"
 
 
-@pytest.mark.asyncio
-async def test_summary_loop_continues_after_send_exception(monkeypatch, tmp_path: Path, caplog):
-    config = build_config(tmp_path)
-    target = config.targets[0]
-    control = config.control_groups["default"]
-    tracker = runner._ActivityTracker()
-
-    # Force immediate timeout so _run enters the summary path without waiting.
-    object.__setattr__(target, "summary_interval_minutes", 0)
-    loop = runner._SummaryLoop(config, target, control, client=object(), tracker=tracker)
-
-    async def fake_send_summary() -> None:
-        loop._stop.set()
-        raise RuntimeError("send failed")
-
-    monkeypatch.setattr(loop, "_send_summary", fake_send_summary)
-
-    with caplog.at_level(logging.ERROR):
-        await loop._run()
-
-    assert "Summary send failed for target 'default' (chat_id=-123)" in caplog.text
+def test_build_scheduler_staggers_summary_jobs(tmp_path: Path):
+    config = build_multi_target_config(tmp_path)
+    scheduler = runner._build_scheduler(
+        config,
+        object(),
+        object(),
+        runner._ActivityTracker(),
+        fallback_client=None,
+        media_fetcher=None,
+        outbox=None,
+    )
+    jobs = scheduler._jobs
+    assert {"backfill", "retention", "heartbeat"} <= set(jobs)
+    offsets = [jobs[f"summary:{target.target_chat_id}"].offset for target in config.targets]
+    assert offsets == [timedelta(0), timedelta(seconds=20)]
+    assert jobs["backfill"].priority < jobs[f"summary:{config.targets[0].target_chat_id}"].priority
 
 
 # --- _format_report_caption / _extract_time_format tests ---
@@ -851,3 +883,760 @@ def test_extract_time_format_strips_date() -> None:
     assert runner._extract_time_format("%m-%d %H:%M") == "%H:%M"
     # No time code at all — returns full format
     assert runner._extract_time_format("%Y.%m.%d") == "%Y.%m.%d"
+
+
+@pytest.mark.asyncio
+async def test_run_once_collects_targets_concurrently(monkeypatch, tmp_path: Path):
+    config = build_multi_target_config(tmp_path)
+    since = datetime.now(timezone.utc) - timedelta(hours=1)
+    in_flight = 0
+    peak = 0
+
+    class DummyClient:
+        async def disconnect(self) -> None:
+            return None
+
+    @contextmanager
+    def fake_db_session(_path: Path):
+        yield object()
+
+    async def fake_start_client(_client, _role):
+        return None
+
+    async def fake_collect_window(_client, _config, _target, _since):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return []
+
+    monkeypatch.setattr(runner, "_build_client", lambda _config: DummyClient())
+    monkeypatch.setattr(runner, "_start_client", fake_start_client)
+    monkeypatch.setattr(runner, "_collect_window", fake_collect_window)
+    monkeypatch.setattr(runner, "db_session", fake_db_session)
+    monkeypatch.setattr(runner, "fetch_messages_between", lambda *_args, **_kwargs: [])
+    monkeypatch.setattr(
+        runner,
+        "generate_report",
+        lambda _messages, _config, _since, _until, **kwargs: kwargs["report_dir"] / kwargs["report_name"],
+    )
+
+    await runner.run_once(config, since, push=False)
+    assert peak == 2
+
+    config = replace(config, performance=PerformanceConfig(max_parallel_targets=1))
+    peak = 0
+    await runner.run_once(config, since, push=False)
+    assert peak == 1
+
+
+@pytest.mark.asyncio
+async def test_floodwait_pauses_every_call_on_the_same_account():
+    from telethon import errors
+
+    from telegram_watch.ratelimit import AccountRateLimiter
+
+    clock = [0.0]
+    calls: list[tuple[str, float]] = []
+
+    async def fake_sleep(delay):
+        clock[0] += delay
+
+    class Client:
+        async def send_message(self, *_args, **_kwargs):
+            calls.append(("send_message", clock[0]))
+            if len(calls) == 1:
+                raise errors.FloodWaitError(request=None, capture=5)
+            return "sent"
+
+        async def get_messages(self, *_args, **_kwargs):
+            calls.append(("get_messages", clock[0]))
+            return "fetched"
+
+    client = Client()
+    limiter = AccountRateLimiter("test", clock=lambda: clock[0], sleep=fake_sleep)
+    client._tgwatch_rate_limiter = limiter
+
+    assert await runner._with_floodwait(client.send_message, "x") == "sent"
+    assert await runner._with_floodwait(client.get_messages, 1) == "fetched"
+
+    # The retry and the unrelated read both waited out the 6s account pause.
+    assert calls[1][1] >= 6 and calls[2][1] >= 6
+    assert limiter.stats()["send_message"].flood_waits == 1
+    assert limiter.current_rate("send_message") < 1.0
+
+
+@pytest.mark.asyncio
+async def test_download_media_deferred_stores_metadata_only(tmp_path: Path):
+    message = SimpleNamespace(
+        id=12,
+        media=object(),
+        file=SimpleNamespace(mime_type="video/mp4", size=50_000_000, width=640, height=360),
+        photo=None,
+        video=True,
+        document=SimpleNamespace(id=987, file_reference=b"ref"),
+    )
+
+    class NoDownloadClient:
+        async def download_media(self, *_args, **_kwargs):
+            raise AssertionError("deferred capture must not download")
+
+    items = await runner._download_media(
+        NoDownloadClient(), tmp_path, message, -123, deferred=True
+    )
+
+    assert len(items) == 1
+    assert items[0].file_path == ""
+    assert items[0].media_kind == "video"
+    assert items[0].file_size == 50_000_000
+    assert items[0].telegram_media_id == 987
+    assert items[0].source_message_id == 12
+
+
+@pytest.mark.asyncio
+async def test_media_fetcher_downloads_small_items_and_respects_force(monkeypatch, tmp_path: Path):
+    config = build_config(tmp_path)
+    downloads: list[int] = []
+    marked: list[tuple[int, int, int, str]] = []
+
+    class Client:
+        async def get_messages(self, _chat_id, ids):
+            return [SimpleNamespace(id=msg_id, media=object()) for msg_id in ids]
+
+        async def download_media(self, message, file):
+            downloads.append(message.id)
+            path = Path(f"{file}.bin")
+            path.write_bytes(b"x" * 10)
+            return str(path)
+
+    @contextmanager
+    def fake_db_session(_path: Path):
+        yield object()
+
+    monkeypatch.setattr(runner, "db_session", fake_db_session)
+    monkeypatch.setattr(runner, "find_media_paths", lambda _conn, _media_id: [])
+    monkeypatch.setattr(
+        runner,
+        "mark_media_downloaded",
+        lambda _conn, chat_id, message_id, index, path, _size: marked.append(
+            (chat_id, message_id, index, path)
+        ),
+    )
+
+    def make_message(message_id: int, size: int) -> DbMessage:
+        return DbMessage(
+            chat_id=-123,
+            message_id=message_id,
+            sender_id=111,
+            date=datetime.now(timezone.utc),
+            text=None,
+            reply_to_msg_id=None,
+            replied_sender_id=None,
+            replied_date=None,
+            replied_text=None,
+            media=[
+                DbMedia(
+                    media_index=0,
+                    file_path="",
+                    mime_type="image/jpeg",
+                    file_size=size,
+                    is_reply=False,
+                    source_message_id=message_id,
+                    telegram_media_id=message_id,
+                )
+            ],
+        )
+
+    small = make_message(1, 1024)
+    large = make_message(2, 500 * 1024 * 1024)
+    fetcher = runner._MediaFetcher(Client(), config)
+
+    assert await fetcher.ensure([small, large]) == 1
+    assert downloads == [1]
+    assert small.media[0].is_deferred is False
+    assert large.media[0].is_deferred is True
+
+    assert await fetcher.ensure([small, large], force=True) == 1
+    assert downloads == [1, 2]
+    assert [entry[1] for entry in marked] == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_media_fetcher_reuses_files_recorded_in_database(tmp_path: Path):
+    config = build_config(tmp_path)
+    existing = tmp_path / "already.jpg"
+    existing.write_bytes(b"jpeg")
+    when = datetime.now(timezone.utc)
+
+    def stored(message_id: int, file_path: str) -> None:
+        with db_session(config.storage.db_path) as conn:
+            persist_message(
+                conn,
+                StoredMessage(-123, message_id, 111, when, None, None, None, None, None),
+                [
+                    StoredMedia(
+                        chat_id=-123,
+                        message_id=message_id,
+                        file_path=file_path,
+                        mime_type="image/jpeg",
+                        file_size=4,
+                        media_index=0,
+                        telegram_media_id=42,
+                    )
+                ],
+            )
+
+    stored(1, str(existing))
+    stored(2, "")
+
+    class Client:
+        async def get_messages(self, _chat_id, ids):
+            return [SimpleNamespace(id=msg_id, media=object()) for msg_id in ids]
+
+        async def download_media(self, message, file):
+            raise AssertionError("media already on disk must not be downloaded again")
+
+    # A fresh fetcher, as after a restart or in `once`.
+    fetcher = runner._MediaFetcher(Client(), config)
+    with db_session(config.storage.db_path) as conn:
+        pending = fetch_messages_by_id(conn, 2)
+
+    assert await fetcher.ensure(pending) == 1
+    assert pending[0].media[0].file_path == str(existing)
+
+
+def test_control_message_lists_deferred_media(tmp_path: Path):
+    config = build_config(tmp_path)
+    message = DbMessage(
+        chat_id=-123,
+        message_id=77,
+        sender_id=111,
+        date=datetime.now(timezone.utc),
+        text="clip",
+        reply_to_msg_id=None,
+        replied_sender_id=None,
+        replied_date=None,
+        replied_text=None,
+        media=[
+            DbMedia(
+                media_index=0,
+                file_path="",
+                mime_type="video/mp4",
+                file_size=3 * 1024 * 1024,
+                is_reply=False,
+                media_kind="video",
+            )
+        ],
+    )
+    text = runner._format_control_message(message, config, config.targets[0])
+    assert "Attachments:" not in text
+    assert "video 3.0 MB" in text
+    assert "/media 77" in text
+
+
+def test_pick_thumbnail_prefers_smallest_adequate_size():
+    small = SimpleNamespace(type="s", w=90, h=67)
+    medium = SimpleNamespace(type="m", w=320, h=240)
+    large = SimpleNamespace(type="x", w=800, h=600)
+    original = SimpleNamespace(type="y", w=1280, h=960)
+    stripped = SimpleNamespace(type="i", bytes=b"...")
+
+    photo_msg = SimpleNamespace(
+        photo=SimpleNamespace(sizes=[stripped, small, original, large, medium]),
+        document=None,
+    )
+    assert runner._pick_thumbnail(photo_msg) is medium
+
+    tiny_photo = SimpleNamespace(photo=SimpleNamespace(sizes=[small]), document=None)
+    assert runner._pick_thumbnail(tiny_photo) is None
+
+    video_msg = SimpleNamespace(photo=None, document=SimpleNamespace(thumbs=[small]))
+    assert runner._pick_thumbnail(video_msg) is small
+
+    assert runner._pick_thumbnail(SimpleNamespace(photo=None, document=None)) is None
+
+
+def test_delivery_plan_merges_texts_and_groups_albums(tmp_path: Path):
+    config = build_config(tmp_path)
+    control = replace(
+        config.control_groups["default"],
+        is_forum=True,
+        topic_routing_enabled=True,
+        topic_target_map=MappingProxyType({-123: MappingProxyType({111: 9001})}),
+    )
+    messages = []
+    for idx in range(30):
+        media = []
+        for media_idx in range(2):
+            path = tmp_path / f"{idx}_{media_idx}.jpg"
+            path.write_bytes(b"x")
+            media.append(
+                DbMedia(
+                    media_index=media_idx,
+                    file_path=str(path),
+                    mime_type="image/jpeg",
+                    file_size=1,
+                    is_reply=False,
+                    media_kind="photo",
+                )
+            )
+        messages.append(
+            DbMessage(
+                chat_id=-123,
+                message_id=idx + 1,
+                sender_id=111,
+                date=datetime.now(timezone.utc),
+                text="x" * 300,
+                reply_to_msg_id=None,
+                replied_sender_id=None,
+                replied_date=None,
+                replied_text=None,
+                media=media,
+            )
+        )
+
+    plan = runner._plan_control_delivery(config, control, config.targets[0], messages)
+
+    assert plan.naive_calls == 90
+    texts = [step for step in plan.steps if isinstance(step, runner._TextStep)]
+    albums = [step for step in plan.steps if isinstance(step, runner._AlbumStep)]
+    assert all(len(step.text) <= 4096 for step in texts)
+    assert sum(step.text.count("<b>Content:</b>") for step in texts) == 30
+    assert all(len(step.files) <= 10 for step in albums)
+    assert sum(len(step.files) for step in albums) == 60
+    assert {step.reply_to for step in plan.steps} == {9001}
+    assert len(plan.steps) < 20
+    # Every step carries the keys of the messages in its batch, for tracing.
+    assert {key for step in plan.steps for key in step.trace} == {
+        (-123, idx + 1) for idx in range(30)
+    }
+    assert all(step.trace for step in plan.steps)
+
+
+def test_plan_control_delivery_splits_texts_over_the_limit(tmp_path: Path):
+    config = build_config(tmp_path)
+    control = config.control_groups["default"]
+    message = DbMessage(
+        chat_id=-123,
+        message_id=1,
+        sender_id=111,
+        date=datetime.now(timezone.utc),
+        text="a & b " * 2000,
+        reply_to_msg_id=None,
+        replied_sender_id=None,
+        replied_date=None,
+        replied_text=None,
+        media=[],
+    )
+
+    plan = runner._plan_control_delivery(config, control, config.targets[0], [message])
+
+    texts = [step.text for step in plan.steps]
+    assert len(texts) == 5
+    assert all(len(text) <= 4096 for text in texts)
+    # Cuts never split an escaped entity.
+    assert all(text.count("&") == text.count("&amp;") for text in texts)
+    assert "".join(texts).count("&amp;") == 2000
+    assert all(step.trace == [(-123, 1)] for step in plan.steps)
+
+
+def test_split_control_message_keeps_long_reply_quote_balanced(tmp_path: Path):
+    config = build_config(tmp_path)
+    control = config.control_groups["default"]
+    message = DbMessage(
+        chat_id=-123,
+        message_id=1,
+        sender_id=111,
+        date=datetime.now(timezone.utc),
+        text="a" * 3000,
+        reply_to_msg_id=5,
+        replied_sender_id=222,
+        replied_date=None,
+        replied_text="\n".join(["quoted <line> & more"] * 400),
+        media=[],
+    )
+
+    plan = runner._plan_control_delivery(config, control, config.targets[0], [message])
+
+    texts = [step.text for step in plan.steps]
+    assert len(texts) > 2
+    for text in texts:
+        assert len(text) <= 4096
+        for tag in ("b", "i", "a", "blockquote"):
+            assert text.count(f"<{tag}>") + text.count(f"<{tag} ") == text.count(f"</{tag}>")
+    combined = "".join(texts)
+    assert combined.count("quoted &lt;line&gt; &amp; more") == 400
+
+
+@pytest.mark.asyncio
+async def test_report_bundle_logs_batching_when_queued_to_outbox(caplog, tmp_path: Path):
+    config = build_config(tmp_path)
+    report = tmp_path / "index.html"
+    report.write_text("<html></html>", encoding="utf-8")
+    until = datetime.now(timezone.utc)
+    messages = [
+        DbMessage(
+            chat_id=-123,
+            message_id=index,
+            sender_id=111,
+            date=until,
+            text=f"m{index}",
+            reply_to_msg_id=None,
+            replied_sender_id=None,
+            replied_date=None,
+            replied_text=None,
+            media=[],
+        )
+        for index in range(1, 4)
+    ]
+    queued: list[int] = []
+
+    class Outbox:
+        async def enqueue(self, _chat_id, steps, **_kwargs):
+            queued.append(len(steps))
+            return len(steps)
+
+    with caplog.at_level(logging.INFO, logger="telegram_watch.runner"):
+        await runner._send_report_bundle(
+            object(),
+            config,
+            config.control_groups["default"],
+            config.targets[0],
+            messages,
+            until - timedelta(hours=1),
+            until,
+            report,
+            outbox=Outbox(),
+        )
+
+    assert queued == [2]
+    assert "in 2 API call(s) (4 without batching)" in caplog.text
+
+
+def test_chunk_albums_keeps_unalbumable_media_separate(tmp_path: Path):
+    items = [
+        (tmp_path / "a.jpg", "a", "visual"),
+        (tmp_path / "b.mp4", "b", "visual"),
+        (tmp_path / "c.ogg", "c", None),
+        (tmp_path / "d.pdf", "d", "document"),
+        (tmp_path / "e.jpg", "e", "visual"),
+    ]
+    albums = runner._chunk_albums(items)
+    assert [[caption for _path, caption, _kind in album] for album in albums] == [
+        ["a", "b"],
+        ["c"],
+        ["d"],
+        ["e"],
+    ]
+
+
+@pytest.mark.asyncio
+async def test_send_file_reuses_uploaded_handle(tmp_path: Path):
+    from telethon import errors
+    from telethon.tl import types
+
+    from telegram_watch.ratelimit import AccountRateLimiter
+    from telegram_watch.uploads import UploadCache
+
+    media_file = tmp_path / "photo.jpg"
+    media_file.write_bytes(b"jpeg-bytes")
+    sent_files: list[object] = []
+    reject_handles = False
+
+    class Client:
+        _tgwatch_self_id = 5
+        _tgwatch_upload_cache = UploadCache(tmp_path / "db.sqlite3")
+        _tgwatch_rate_limiter = AccountRateLimiter(rates={"send_file": (100.0, 10)})
+
+        async def get_input_entity(self, entity):
+            return entity
+
+        async def send_file(self, _entity, *, file, **_kwargs):
+            sent_files.append(file)
+            if reject_handles and isinstance(file, types.InputMediaPhoto):
+                raise errors.FileReferenceExpiredError(request=None)
+            photo = SimpleNamespace(id=10 + len(sent_files), access_hash=99, file_reference=b"r")
+            return SimpleNamespace(photo=photo, document=None)
+
+    client = Client()
+    await runner._send_file_with_backoff(client, -456, media_file, caption="a")
+    await runner._send_file_with_backoff(client, -456, media_file, caption="b")
+
+    assert sent_files[0] == media_file
+    assert isinstance(sent_files[1], types.InputMediaPhoto)
+    assert sent_files[1].id.id == 11
+    stats = client._tgwatch_upload_cache.stats
+    assert (stats.uploads, stats.reuses) == (1, 1)
+    assert stats.bytes_saved == len(b"jpeg-bytes")
+
+    # A fresh cache (e.g. after restart) still finds the persisted handle.
+    fresh = UploadCache(tmp_path / "db.sqlite3")
+    digest = await fresh.digest(media_file)
+    assert fresh.lookup(5, digest) is not None
+
+    reject_handles = True
+    await runner._send_file_with_backoff(client, -456, media_file, caption="c")
+    assert sent_files[-1] == media_file
+    assert stats.uploads == 2
+
+
+def test_sender_client_uses_client_factory(tmp_path: Path):
+    config = replace(
+        build_config(tmp_path), sender=SenderConfig(session_file=tmp_path / "sender.session")
+    )
+    built: list[Path] = []
+
+    def factory(_config, session_path):
+        built.append(session_path)
+        return SimpleNamespace()
+
+    client = runner._build_sender_client(config, factory=factory)
+
+    assert built == [tmp_path / "sender.session"]
+    assert isinstance(client, SimpleNamespace)
+
+
+@pytest.mark.asyncio
+async def test_upload_cache_skips_files_outside_media_dir(tmp_path: Path):
+    from telegram_watch.uploads import UploadCache
+
+    media_dir = tmp_path / "media"
+    media_dir.mkdir()
+    report = tmp_path / "reports" / "index.html"
+    report.parent.mkdir()
+    report.write_text("<html></html>", encoding="utf-8")
+    cache = UploadCache(tmp_path / "db.sqlite3", media_dir=media_dir, max_entries=2)
+    sent_files: list[object] = []
+
+    class Client:
+        _tgwatch_self_id = 5
+        _tgwatch_upload_cache = cache
+
+        async def get_input_entity(self, entity):
+            return entity
+
+        async def send_file(self, _entity, *, file, **_kwargs):
+            sent_files.append(file)
+            document = SimpleNamespace(id=1, access_hash=99, file_reference=b"r")
+            return SimpleNamespace(photo=None, document=document)
+
+    await runner._send_file_with_backoff(Client(), -456, report, caption="Report")
+
+    assert sent_files == [report]
+    assert (cache.stats.uploads, cache.stats.reuses) == (0, 0)
+    assert cache.accepts(media_dir / "1" / "photo.jpg")
+
+    for index in range(3):
+        photo = media_dir / f"{index}.jpg"
+        photo.write_bytes(bytes([index]))
+        await cache.digest(photo)
+    assert len(cache._digests) == 2
+
+
+@pytest.mark.asyncio
+async def test_forward_delivery_forwards_and_falls_back_to_upload(monkeypatch, tmp_path: Path):
+    from telethon import errors
+
+    config = build_config(tmp_path)
+    target = replace(config.targets[0], delivery_mode="forward")
+    control = config.control_groups["default"]
+    photo = tmp_path / "photo.jpg"
+    photo.write_bytes(b"x")
+    message = DbMessage(
+        chat_id=-123,
+        message_id=7,
+        sender_id=111,
+        date=datetime.now(timezone.utc),
+        text="look",
+        reply_to_msg_id=3,
+        replied_sender_id=222,
+        replied_date=None,
+        replied_text="earlier",
+        media=[
+            DbMedia(media_index=0, file_path=str(photo), mime_type="image/jpeg", file_size=1, is_reply=False, media_kind="photo"),
+            DbMedia(media_index=1, file_path="", mime_type="video/mp4", file_size=9, is_reply=True, source_message_id=3, media_kind="video"),
+        ],
+    )
+
+    plan = runner._plan_control_delivery(config, control, target, [message])
+    forwards = [step for step in plan.steps if isinstance(step, runner._ForwardStep)]
+    assert len(forwards) == 1
+    assert forwards[0].source_chat_id == -123
+    assert forwards[0].message_ids == [7, 3]
+    assert [path for path, _caption, _kind in forwards[0].fallback] == [photo]
+    assert not any(isinstance(step, runner._AlbumStep) for step in plan.steps)
+    assert "Not downloaded" not in runner._format_control_message(message, config, target)
+
+    uploaded: list[object] = []
+    forward_ok = True
+
+    async def fake_forward(*_args, **_kwargs):
+        if not forward_ok:
+            raise errors.ChatForwardsRestrictedError(request=None)
+
+    async def fake_send_file(_client, _fallback, _chat_id, file_path, **_kwargs):
+        uploaded.append(file_path)
+
+    async def fake_send_message(*_args, **_kwargs):
+        return None
+
+    monkeypatch.setattr(runner, "_forward_with_fallback", fake_forward)
+    monkeypatch.setattr(runner, "_send_file_with_fallback", fake_send_file)
+    monkeypatch.setattr(runner, "_send_message_with_fallback", fake_send_message)
+
+    await runner._execute_delivery_plan(object(), -456, plan)
+    assert uploaded == []
+
+    forward_ok = False
+    await runner._execute_delivery_plan(object(), -456, plan)
+    assert uploaded == [photo]
+
+
+@pytest.mark.asyncio
+async def test_resolve_entity_uses_persistent_cache(tmp_path: Path):
+    from telethon.tl import types
+
+    from telegram_watch.entities import EntityCache
+
+    lookups: list[object] = []
+
+    class Client:
+        _tgwatch_self_id = 5
+
+        def __init__(self, cache):
+            self._tgwatch_entity_cache = cache
+
+        async def get_input_entity(self, entity):
+            lookups.append(entity)
+            return types.InputPeerChannel(channel_id=1234, access_hash=77)
+
+    client = Client(EntityCache(tmp_path / "db.sqlite3"))
+    first = await runner._resolve_entity(client, -1001234)
+    second = await runner._resolve_entity(client, -1001234)
+    assert first == second
+    assert lookups == [-1001234]
+
+    # After a restart the peer comes from SQLite; another account must resolve its own.
+    restarted = Client(EntityCache(tmp_path / "db.sqlite3"))
+    peer = await runner._resolve_entity(restarted, -1001234)
+    assert peer == types.InputPeerChannel(channel_id=1234, access_hash=77)
+    assert lookups == [-1001234]
+
+    other_account = Client(restarted._tgwatch_entity_cache)
+    other_account._tgwatch_self_id = 6
+    await runner._resolve_entity(other_account, -1001234)
+    assert lookups == [-1001234, -1001234]
+
+
+@pytest.mark.asyncio
+async def test_resolve_user_refreshes_expired_and_untracked_usernames(tmp_path: Path):
+    from telegram_watch.entities import EntityCache
+    from telegram_watch.storage import db_session
+
+    lookups: list[str] = []
+    owners = {"@alice": 101}
+
+    class Client:
+        def __init__(self, cache):
+            self._tgwatch_entity_cache = cache
+
+        async def get_entity(self, username):
+            lookups.append(username)
+            return SimpleNamespace(id=owners[username])
+
+    handler = SimpleNamespace(client=Client(EntityCache(tmp_path / "db.sqlite3")))
+    resolve = runner._ControlHandler._resolve_user
+    assert await resolve(handler, "@alice", {101}) == 101
+    assert await resolve(handler, "@Alice", {101}) == 101
+    assert lookups == ["@alice"]
+
+    # The username moved to another account: the cached id is dropped and looked up again.
+    owners["@alice"] = 202
+    assert await resolve(handler, "@alice", {202}) == 202
+    assert lookups == ["@alice", "@alice"]
+
+    # Entries older than the TTL are looked up again, also after a restart.
+    with db_session(tmp_path / "db.sqlite3") as conn, conn:
+        conn.execute("UPDATE username_cache SET resolved_at = ?", ((utc_now() - timedelta(days=8)).isoformat(),))
+    restarted = SimpleNamespace(client=Client(EntityCache(tmp_path / "db.sqlite3")))
+    assert await resolve(restarted, "@alice") == 202
+    assert lookups == ["@alice", "@alice", "@alice"]
+    assert await resolve(restarted, "@alice") == 202
+    assert len(lookups) == 3
+
+
+@pytest.mark.asyncio
+async def test_outbox_retries_in_order_and_resumes_after_restart(monkeypatch, tmp_path: Path):
+    from telegram_watch.storage import db_session
+
+    config = build_config(tmp_path)
+    report = tmp_path / "report.html"
+    report.write_text("<html></html>", encoding="utf-8")
+    steps = [
+        runner._AlbumStep(reply_to=None, files=[report], captions=["Report"]),
+        runner._TextStep(reply_to=None, text="first"),
+        runner._TextStep(reply_to=None, text="second"),
+    ]
+    delivered: list[str] = []
+    fail_next = True
+
+    async def fake_execute(_client, _chat_id, plan, **_kwargs):
+        nonlocal fail_next
+        step = plan.steps[0]
+        label = step.text if isinstance(step, runner._TextStep) else "report"
+        if label == "first" and fail_next:
+            fail_next = False
+            raise RuntimeError("network down")
+        delivered.append(label)
+
+    monkeypatch.setattr(runner, "_execute_delivery_plan", fake_execute)
+    notified: list[tuple[str, str]] = []
+
+    async def fake_bark(_config, title, body):
+        notified.append((title, body))
+
+    monkeypatch.setattr(runner, "send_bark_notification", fake_bark)
+
+    worker = runner._OutboxWorker(config, client=object())
+    notify = ("Report Ready", "3 messages")
+    assert await worker.enqueue(-456, steps, key_prefix="-123:1-2", notify=notify) == 3
+    # Re-queueing the same window is a no-op.
+    assert await worker.enqueue(-456, steps, key_prefix="-123:1-2", notify=notify) == 0
+
+    await worker.drain()
+    assert delivered == ["report"]
+    assert notified == []
+
+    # A fresh worker (restart) picks up the pending entries once they are due.
+    with db_session(config.storage.db_path) as conn:
+        conn.execute("UPDATE outbox SET next_attempt_at = '2000-01-01T00:00:00+00:00'")
+        conn.commit()
+    restarted = runner._OutboxWorker(config, client=object())
+    await restarted.drain()
+    assert delivered == ["report", "first", "second"]
+    assert notified == [notify]
+
+    with db_session(config.storage.db_path) as conn:
+        statuses = [row["status"] for row in conn.execute("SELECT status FROM outbox ORDER BY id")]
+    assert statuses == ["sent", "sent", "sent"]
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_routes_by_chat_id(tmp_path: Path):
+    config = build_config(tmp_path)
+    seen: list[tuple[str, int]] = []
+
+    class Handler:
+        def __init__(self, name):
+            self.name = name
+
+        async def handle(self, event):
+            seen.append((self.name, event.chat_id))
+
+    dispatcher = runner._Dispatcher.for_config(config, {-123: Handler("target")}, Handler("control"))
+    assert sorted(dispatcher.chat_ids) == [-456, -123]
+
+    for chat_id in (-123, -456, -999):
+        await dispatcher.dispatch(SimpleNamespace(chat_id=chat_id))
+    assert seen == [("target", -123), ("control", -456)]
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import logging
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from telegram_watch.scheduler import Job, Scheduler
+
+
+class FakeClock:
+    def __init__(self, now: datetime) -> None:
+        self.now = now
+
+    def __call__(self) -> datetime:
+        return self.now
+
+
+def test_next_run_aligns_to_wall_clock_with_offset(tmp_path):
+    clock = FakeClock(datetime(2026, 3, 1, 10, 7, tzinfo=timezone.utc))
+    job = Job("summary", timedelta(minutes=30), _noop, offset=timedelta(seconds=20))
+    scheduler = Scheduler(tmp_path / "db.sqlite3", [job], timezone=timezone.utc, clock=clock)
+
+    assert scheduler.next_run_after(job, clock.now) == datetime(
+        2026, 3, 1, 10, 30, 20, tzinfo=timezone.utc
+    )
+    assert scheduler.next_run_after(job, datetime(2026, 3, 1, 10, 30, 20, tzinfo=timezone.utc)) == (
+        datetime(2026, 3, 1, 11, 0, 20, tzinfo=timezone.utc)
+    )
+
+
+@pytest.mark.asyncio
+async def test_missed_windows_run_once_after_restart(tmp_path):
+    db_path = tmp_path / "db.sqlite3"
+    start = datetime(2026, 3, 1, 10, 0, tzinfo=timezone.utc)
+    clock = FakeClock(start)
+    windows: list[tuple[datetime, datetime]] = []
+
+    async def summary(since, until):
+        windows.append((since, until))
+
+    job = Job("summary", timedelta(minutes=10), summary)
+    scheduler = Scheduler(db_path, [job], timezone=timezone.utc, clock=clock)
+    scheduler.load()
+    clock.now = start + timedelta(minutes=10)
+    await scheduler.run_due()
+    assert windows == [(start, start + timedelta(minutes=10))]
+
+    # Down for 45 minutes: a fresh scheduler runs one combined window.
+    clock.now = start + timedelta(minutes=55)
+    restarted = Scheduler(db_path, [job], timezone=timezone.utc, clock=clock)
+    restarted.load()
+    await restarted.run_due()
+    assert windows[1] == (start + timedelta(minutes=10), start + timedelta(minutes=55))
+    assert len(windows) == 2
+    assert restarted._heap[0][0] == start + timedelta(minutes=60)
+
+
+@pytest.mark.asyncio
+async def test_failed_job_keeps_window_and_runs_in_priority_order(tmp_path, caplog):
+    clock = FakeClock(datetime(2026, 3, 1, 10, 0, tzinfo=timezone.utc))
+    calls: list[str] = []
+    windows: list[datetime] = []
+
+    async def backfill(_since, _until):
+        calls.append("backfill")
+
+    async def summary(since, _until):
+        calls.append("summary")
+        windows.append(since)
+        if len(windows) == 1:
+            raise RuntimeError("send failed")
+
+    jobs = [
+        Job("summary", timedelta(minutes=5), summary),
+        Job("backfill", timedelta(minutes=5), backfill, priority=0),
+    ]
+    scheduler = Scheduler(tmp_path / "db.sqlite3", jobs, timezone=timezone.utc, clock=clock)
+    scheduler.load()
+
+    clock.now += timedelta(minutes=5)
+    with caplog.at_level(logging.ERROR):
+        await scheduler.run_due()
+    assert calls == ["backfill", "summary"]
+    assert "Scheduled job 'summary' failed" in caplog.text
+
+    clock.now += timedelta(minutes=5)
+    await scheduler.run_due()
+    assert windows[0] == windows[1]
+
+
+async def _noop(_since, _until):
+    return None
@@ -270,3 +270,85 @@ def test_reply_snapshot_candidate_and_cleanup(tmp_path):
     assert cleaned.replied_text is None
     assert len(cleaned.media) == 1
     assert cleaned.media[0].is_reply is False
+
+
+def test_deferred_media_metadata_and_download_marker(tmp_path):
+    db_path = tmp_path / "tgwatch.sqlite3"
+    conn = storage.connect(db_path)
+    storage.ensure_schema(conn)
+
+    now = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    msg = storage.StoredMessage(
+        chat_id=-1001,
+        message_id=7,
+        sender_id=123,
+        date=now,
+        text=None,
+        reply_to_msg_id=None,
+        replied_sender_id=None,
+        replied_date=None,
+        replied_text=None,
+    )
+    media = [
+        storage.StoredMedia(
+            chat_id=-1001,
+            message_id=7,
+            file_path="",
+            mime_type="video/mp4",
+            file_size=300_000_000,
+            media_index=0,
+            source_message_id=7,
+            media_kind="video",
+            width=1920,
+            height=1080,
+            telegram_media_id=555,
+        )
+    ]
+    storage.persist_message(conn, msg, media)
+
+    stored = storage.fetch_messages_by_id(conn, 7, chat_ids=[-1001])[0].media[0]
+    assert stored.is_deferred is True
+    assert (stored.media_kind, stored.width, stored.height) == ("video", 1920, 1080)
+    assert stored.telegram_media_id == 555
+
+    storage.mark_media_downloaded(conn, -1001, 7, 0, str(tmp_path / "7.mp4"), 1234)
+    stored = storage.fetch_messages_by_id(conn, 7)[0].media[0]
+    assert stored.is_deferred is False
+    assert stored.file_size == 1234
+    assert storage.fetch_messages_by_id(conn, 7, chat_ids=[-2002]) == []
+    assert storage.find_media_paths(conn, 555) == [str(tmp_path / "7.mp4")]
+
+    # A re-capture still sees the media as deferred; the download is kept.
+    storage.persist_message(conn, msg, media)
+    stored = storage.fetch_messages_by_id(conn, 7)[0].media[0]
+    assert stored.file_path == str(tmp_path / "7.mp4")
+    assert stored.file_size == 1234
+
+    storage.persist_message(conn, msg, [])
+    assert storage.fetch_messages_by_id(conn, 7)[0].media == []
+
+
+def test_uploaded_file_roundtrip(tmp_path):
+    conn = storage.connect(tmp_path / "tgwatch.sqlite3")
+    storage.ensure_schema(conn)
+    record = storage.UploadedFile(
+        account_id=5,
+        sha256="abc",
+        kind="document",
+        media_id=10,
+        access_hash=20,
+        file_reference=b"ref",
+        file_size=123,
+    )
+    stored_at = datetime(2026, 1, 10, tzinfo=timezone.utc)
+    storage.store_uploaded_file(conn, record, stored_at)
+    assert storage.fetch_uploaded_file(conn, 5, "abc") == record
+    assert storage.fetch_uploaded_file(conn, 6, "abc") is None
+    storage.delete_uploaded_file(conn, 5, "abc")
+    assert storage.fetch_uploaded_file(conn, 5, "abc") is None
+
+    storage.store_uploaded_file(conn, record, stored_at)
+    assert storage.purge_uploaded_files(conn, stored_at) == 0
+    assert storage.purge_uploaded_files(conn, stored_at + timedelta(days=1)) == 1
+    assert storage.fetch_uploaded_file(conn, 5, "abc") is None
+    conn.close()
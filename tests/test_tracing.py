@@ -0,0 +1,58 @@
+import json
+
+import pytest
+
+from telegram_watch import runner
+from telegram_watch.fakes import FakeTelegramClient
+from telegram_watch.loadgen import build_fake_config
+from telegram_watch.tracing import TRACER, format_trace_summary, summarize_trace
+
+
+@pytest.mark.asyncio
+async def test_trace_follows_message_from_capture_to_delivery(tmp_path):
+    config = build_fake_config(tmp_path, {-100123: (42,)}, {-100123: -100999})
+    client = FakeTelegramClient()
+    trace_path = tmp_path / "trace.jsonl"
+    TRACER.open(trace_path)
+    try:
+        message = client.make_message(-100123, 42, "hello", media_size=2048)
+        client.emit(message)
+        await runner._capture_message(client, config, message)
+        plan = runner._DeliveryPlan(
+            steps=[runner._TextStep(None, "hello", trace=[(-100123, message.id)])]
+        )
+        await runner._execute_delivery_plan(client, -100999, plan)
+    finally:
+        TRACER.close()
+
+    spans = [json.loads(line) for line in trace_path.read_text().splitlines()]
+    assert [span["stage"] for span in spans] == [
+        "reply_snapshot",
+        "download_media",
+        "capture",
+        "deliver",
+    ]
+    assert all(span["keys"] == [[-100123, message.id]] for span in spans)
+
+    summary = {item.stage: item for item in summarize_trace(trace_path)}
+    assert summary["end_to_end"].count == 1
+    assert summary["end_to_end"].max_ms >= summary["deliver"].max_ms
+    assert "download_media" in format_trace_summary(list(summary.values()))
+
+
+def test_delivery_plan_and_outbox_keep_trace_keys(tmp_path):
+    step = runner._TextStep(5, "text", trace=[(-100123, 7), (-100123, 8)])
+    entry = runner._outbox_entry(step, -100999, "key:0")
+    assert runner._outbox_step(entry).trace == [(-100123, 7), (-100123, 8)]
+
+    untraced = runner._outbox_entry(runner._TextStep(None, "text"), -100999, "key:1")
+    assert "trace" not in untraced.payload
+    assert runner._outbox_step(untraced).trace == []
+
+
+def test_spans_are_noops_when_tracing_is_off():
+    assert not TRACER.enabled
+    before = TRACER.count
+    with TRACER.bind(1, 2), TRACER.span("capture"):
+        pass
+    assert TRACER.count == before
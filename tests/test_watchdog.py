@@ -0,0 +1,63 @@
+import asyncio
+import logging
+import time
+
+import pytest
+
+from telegram_watch import metrics
+from telegram_watch.watchdog import StallWatchdog, task_context
+
+
+def _blocking_call(seconds: float) -> None:
+    time.sleep(seconds)
+
+
+@pytest.mark.asyncio
+async def test_watchdog_attributes_stall_to_blocking_call(caplog):
+    metrics.LOOP_STALLS.reset()
+    watchdog = StallWatchdog(0.05, tick_interval=0.01)
+    watchdog.start()
+    try:
+        await asyncio.sleep(0.03)
+        with caplog.at_level(logging.WARNING, logger="telegram_watch.watchdog"):
+            with task_context("update chat -100 message 7"):
+                _blocking_call(0.3)
+            await asyncio.sleep(0.05)
+    finally:
+        await watchdog.stop()
+
+    assert watchdog.stalls == 1
+    sites = [key[0] for key in metrics.LOOP_STALLS._values]
+    assert len(sites) == 1 and "_blocking_call" in sites[0]
+    assert "test_watchdog.py" in sites[0]
+    report = caplog.records[0].getMessage()
+    assert "update chat -100 message 7" in report
+    assert "time.sleep" in report or "_blocking_call" in report
+
+
+@pytest.mark.asyncio
+async def test_watchdog_names_unlabelled_task_from_its_stack(caplog):
+    watchdog = StallWatchdog(0.05, tick_interval=0.01)
+    watchdog.start()
+    try:
+        await asyncio.sleep(0.03)
+        with caplog.at_level(logging.WARNING, logger="telegram_watch.watchdog"):
+            _blocking_call(0.3)
+            await asyncio.sleep(0.05)
+    finally:
+        await watchdog.stop()
+
+    report = caplog.records[0].getMessage()
+    assert "(task test_watchdog_names_unlabelled_task_from_its_stack)" in report
+
+
+@pytest.mark.asyncio
+async def test_watchdog_ignores_cooperative_work():
+    watchdog = StallWatchdog(0.1, tick_interval=0.01)
+    watchdog.start()
+    try:
+        for _ in range(20):
+            await asyncio.sleep(0.005)
+    finally:
+        await watchdog.stop()
+    assert watchdog.stalls == 0
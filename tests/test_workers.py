@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+from datetime import timezone
+from pathlib import Path
+from types import MappingProxyType
+
+import pytest
+
+from telegram_watch import runner
+from telegram_watch.config import (
+    Config,
+    ControlGroupConfig,
+    DisplayConfig,
+    NotificationConfig,
+    ReportingConfig,
+    StorageConfig,
+    TargetGroupConfig,
+    TelegramConfig,
+)
+from telegram_watch.ratelimit import DEFAULT_RATES
+from telegram_watch.workers import (
+    Shard,
+    partition_targets,
+    prepare_worker_sessions,
+    shard_config,
+    shard_rates,
+    worker_session_path,
+)
+
+
+def _target(index: int, users: int) -> TargetGroupConfig:
+    return TargetGroupConfig(
+        name=f"group-{index}",
+        target_chat_id=-1000 - index,
+        tracked_user_ids=tuple(range(users)),
+        tracked_user_aliases=MappingProxyType({}),
+        summary_interval_minutes=60,
+        control_group="default",
+    )
+
+
+def build_multi_target_config(tmp_path: Path) -> Config:
+    targets = (_target(1, 1), _target(2, 1))
+    control = ControlGroupConfig(
+        key="default",
+        control_chat_id=-456,
+        is_forum=False,
+        topic_routing_enabled=False,
+        topic_target_map=MappingProxyType({}),
+    )
+    return Config(
+        config_version=1.0,
+        telegram=TelegramConfig(
+            api_id=1, api_hash="abcdefghijk", session_file=tmp_path / "data" / "tg.session"
+        ),
+        sender=None,
+        targets=targets,
+        control_groups=MappingProxyType({"default": control}),
+        target_by_chat_id=MappingProxyType({t.target_chat_id: t for t in targets}),
+        target_by_name=MappingProxyType({t.name: t for t in targets}),
+        control_by_chat_id=MappingProxyType({control.control_chat_id: control}),
+        targets_by_control=MappingProxyType({"default": targets}),
+        storage=StorageConfig(db_path=tmp_path / "db.sqlite3", media_dir=tmp_path / "media"),
+        reporting=ReportingConfig(
+            reports_dir=tmp_path / "reports",
+            summary_interval_minutes=120,
+            timezone=timezone.utc,
+            retention_days=30,
+        ),
+        display=DisplayConfig(show_ids=True, time_format="%Y.%m.%d %H:%M:%S (%Z)"),
+        notifications=NotificationConfig(bark_key=None),
+    )
+
+
+def test_partition_balances_tracked_users_and_keeps_config_order():
+    targets = [_target(0, 10), _target(1, 1), _target(2, 6), _target(3, 5)]
+    shards = partition_targets(targets, 2)
+    assert [[t.name for t in shard] for shard in shards] == [
+        ["group-0", "group-1"],
+        ["group-2", "group-3"],
+    ]
+    assert partition_targets(targets, 2) == shards
+    assert sum(len(shard) for shard in partition_targets(targets, 3)) == len(targets)
+
+
+def test_shard_config_narrows_targets_and_indexes(tmp_path: Path):
+    config = build_multi_target_config(tmp_path)
+    first, second = config.targets
+    primary = shard_config(config, Shard(0, 2))
+    worker = shard_config(config, Shard(1, 2))
+
+    assert primary.targets == (first,) and worker.targets == (second,)
+    assert set(worker.target_by_chat_id) == {second.target_chat_id}
+    assert worker.targets_for_control("default") == (second,)
+    assert worker.tracked_users_set == frozenset(second.tracked_user_ids)
+    assert worker.control_by_chat_id == config.control_by_chat_id
+    assert shard_config(config, Shard(0, 1)) is config
+
+
+def test_each_worker_session_gets_its_own_login(tmp_path: Path):
+    config = build_multi_target_config(tmp_path)
+    session = config.telegram.session_file
+    session.parent.mkdir(parents=True, exist_ok=True)
+    session.write_bytes(b"primary")
+    existing = worker_session_path(session, Shard(1, 3))
+    existing.write_bytes(b"worker1")
+    logins: list[tuple[Path, str]] = []
+
+    def login(_config: Config, path: Path, role: str) -> None:
+        logins.append((path, role))
+        path.write_bytes(role.encode())
+
+    paths = prepare_worker_sessions(config, 3, login=login)
+
+    assert paths[0] == session
+    assert paths[2] == worker_session_path(session, Shard(2, 3))
+    assert paths[2].name == f"{session.stem}.worker2{session.suffix}"
+    assert logins == [(paths[2], "worker 2")]
+    assert existing.read_bytes() == b"worker1"
+    assert paths[2].read_bytes() != session.read_bytes()
+
+
+def test_worker_sessions_require_primary_login(tmp_path: Path):
+    config = build_multi_target_config(tmp_path)
+
+    with pytest.raises(FileNotFoundError):
+        prepare_worker_sessions(config, 2, login=lambda *args: None)
+
+
+def test_secondary_shard_schedules_only_its_own_jobs(tmp_path: Path):
+    config = build_multi_target_config(tmp_path)
+    shard = Shard(1, 2)
+    scheduler = runner._build_scheduler(
+        shard_config(config, shard),
+        object(),
+        object(),
+        runner._ActivityTracker(),
+        fallback_client=None,
+        media_fetcher=None,
+        outbox=None,
+        shard=shard,
+    )
+    assert set(scheduler._jobs) == {
+        "backfill:1",
+        f"summary:{config.targets[1].target_chat_id}",
+    }
+
+def test_shard_rates_split_reads_but_keep_full_send_rates() -> None:
+    rates = shard_rates(2)
+    assert rates["send_message"] == DEFAULT_RATES["send_message"]
+    assert rates["send_file"] == DEFAULT_RATES["send_file"]
+    assert rates["get_messages"] == (2.5, 5)
+    assert rates["download"] == (1.5, 3)